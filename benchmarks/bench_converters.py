@@ -0,0 +1,53 @@
+"""
+    Compare ``MessageToDict`` with the converters generated by
+    ``src.ccm.converters`` on Schedules and ScheduleTelemetry of increasing size.
+
+    Usage: python -m benchmarks.bench_converters --sizes 1000 10000 100000
+"""
+import argparse
+
+from google.protobuf.json_format import MessageToDict
+
+from benchmarks.bench_wire import best_of, make_schedule
+from src.ccm.converters import message_to_dict
+from src import schedule_pb2 as objs
+
+
+def make_telemetry(n):
+    telemetry = objs.ScheduleTelemetry(scheduleRunId='bench', start=0, end=86400, totalTaskCount=n, totalAllocatedSeconds=300 * n)
+    system = telemetry.system
+    system.computeSeconds = 12
+    system.customerSuccessScoreMean = 0.5
+    system.customerSuccessScoreMeanTrend = 'up'
+    for i in range(max(n // 100, 1)):
+        user = telemetry.users.add(userId=f'u{i}', score=0.5, giniScore=0.1, totalTaskCount=100, totalAllocatedSeconds=30000)
+        for j in range(20):
+            user.preferenceScores[f'pref-{j}'] = j / 20.0
+        for j in range(20):
+            t = user.bumpedTasks[j]
+            t.taskId, t.userId, t.start, t.end = f't{j}', f'u{i}', 600 * j, 600 * j + 300
+            t.visibilityId, t.noradId, t.siteId, t.added_at_tier = f'v{j}', '40000', 'site-1', 1
+        system.customerSuccessScore[i] = 0.5
+    for i in range(max(n // 50, 1)):
+        telemetry.spacecrafts.add(noradId=str(40000 + i), totalTaskCount=50, totalTaskSeconds=15000, totalAvailableSeconds=40000,
+                                  detectedBufferOverflow=False, maxTimeBetweenContacts=3600, meanTimeBetweenContacts=1800.0, giniScore=0.2)
+    return telemetry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"size":>9} {"message":>18} {"MessageToDict_s":>16} {"generated_s":>12} {"speedup":>8}')
+    for n in args.sizes:
+        for name, message in (('Schedule', make_schedule(n)), ('ScheduleTelemetry', make_telemetry(n))):
+            assert message_to_dict(message, True) == MessageToDict(message, preserving_proto_field_name=True)
+            reference = best_of(lambda: MessageToDict(message, preserving_proto_field_name=True), args.repeat)
+            generated = best_of(lambda: message_to_dict(message, True), args.repeat)
+            print(f'{n:>9} {name:>18} {reference:>16.4f} {generated:>12.4f} {reference / generated:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
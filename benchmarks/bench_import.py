@@ -0,0 +1,60 @@
+"""
+    Measure the cold-start cost of ``src.ccm.api``: the cumulative import time
+    reported by ``python -X importtime`` and the latency of constructing a
+    ``CcmApi``, each in a fresh interpreter.  Exits with status 1 if either
+    exceeds its budget, so it can gate CI.
+
+    Usage: python -m benchmarks.bench_import --runs 10 --max-import-ms 120 --max-construct-ms 5
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONSTRUCT = '''
+import time
+from src.ccm.api import CcmApi
+t0 = time.perf_counter()
+CcmApi('test', api_host='http://localhost/')
+print(time.perf_counter() - t0)
+'''
+
+
+def import_ms():
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import src.ccm.api'],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    match = re.search(r'^import time:\s+\d+ \|\s+(\d+) \| src\.ccm\.api$', out, re.MULTILINE)
+    return int(match.group(1)) / 1000.0
+
+
+def construct_ms():
+    out = subprocess.run([sys.executable, '-c', CONSTRUCT], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return float(out) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-import-ms', type=float, default=120.0)
+    parser.add_argument('--max-construct-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    imports = [import_ms() for i in range(args.runs)]
+    constructs = [construct_ms() for i in range(args.runs)]
+    failed = False
+    print(f'{"measure":>12} {"min_ms":>9} {"median_ms":>10} {"budget_ms":>10}')
+    for name, values, budget in (('import', imports, args.max_import_ms), ('construct', constructs, args.max_construct_ms)):
+        median = statistics.median(values)
+        print(f'{name:>12} {min(values):>9.2f} {median:>10.2f} {budget:>10.2f}')
+        if median > budget:
+            print(f'{name} regressed: median {median:.2f} ms exceeds {budget:.2f} ms')
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
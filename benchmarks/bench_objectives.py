@@ -0,0 +1,59 @@
+"""
+    Time the vectorized objective kernels over a fleet schedule, per spacecraft
+    and per day.
+
+    Usage: python -m benchmarks.bench_objectives --spacecraft 200 --days 30 --contacts-per-day 8
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.ccm.frame import ScheduleFrame
+from src.ccm.objectives import compute_objectives, SECONDS_PER_DAY
+
+
+def make_frame(spacecraft, days, contacts_per_day, seed=0):
+    rng = np.random.default_rng(seed)
+    n = spacecraft * days * contacts_per_day
+    norad = np.repeat(np.arange(spacecraft), days * contacts_per_day)
+    slot = np.tile(np.arange(days * contacts_per_day), spacecraft)
+    slot_seconds = SECONDS_PER_DAY // contacts_per_day
+    start = slot * slot_seconds + rng.integers(0, slot_seconds // 2, n)
+    end = start + rng.integers(300, 900, n)
+    codes = {
+        'taskId': np.arange(n, dtype=np.int32),
+        'userId': np.zeros(n, dtype=np.int32),
+        'siteId': rng.integers(0, 30, n).astype(np.int32),
+        'noradId': norad.astype(np.int32),
+        'visibilityId': np.arange(n, dtype=np.int32),
+    }
+    categories = {
+        'taskId': np.array([f't{i}' for i in range(n)], dtype=object),
+        'userId': np.array(['u'], dtype=object),
+        'siteId': np.array([f'site-{i}' for i in range(30)], dtype=object),
+        'noradId': np.array([str(40000 + i) for i in range(spacecraft)], dtype=object),
+        'visibilityId': np.array([f'v{i}' for i in range(n)], dtype=object),
+    }
+    return ScheduleFrame(start, end, np.ones(n, dtype=np.int64), np.zeros(n, dtype=bool), codes, categories)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--spacecraft', type=int, default=200)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--contacts-per-day', type=int, default=8)
+    args = parser.parse_args()
+
+    frame = make_frame(args.spacecraft, args.days, args.contacts_per_day)
+    horizon = (0, args.days * SECONDS_PER_DAY)
+    for per_day in (False, True):
+        t0 = time.perf_counter()
+        norad_ids, results = compute_objectives(frame, horizon=horizon, per_day=per_day)
+        elapsed = time.perf_counter() - t0
+        label = 'per day' if per_day else 'per spacecraft'
+        print(f'{len(frame)} tasks, {len(results)} objectives {label}: {elapsed * 1000:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+    Compare cold (new connection per call) and warm (pooled keep-alive) latency
+    of ``CcmApi.get_server_version`` against a local stand-in server.
+
+    Usage: python -m benchmarks.bench_session --calls 500
+"""
+import argparse
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.ccm.api import CcmApi
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+
+    def do_GET(self):
+        body = b'{"version": "v1.0.0"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, 'http://127.0.0.1:%d/' % httpd.server_address[1]
+
+
+def timed(fn, calls):
+    samples = []
+    for i in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def report(label, samples):
+    ms = sorted(s * 1000 for s in samples)
+    p99 = ms[int(len(ms) * 0.99) - 1]
+    print(f'{label:<8} mean={statistics.mean(ms):.3f}ms  median={statistics.median(ms):.3f}ms  p99={p99:.3f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=500)
+    args = parser.parse_args()
+
+    httpd, url = start_server()
+    try:
+        report('cold', timed(lambda: requests.get(url), args.calls))
+        with CcmApi('bench', api_host=url) as client:
+            client.get_server_version()
+            report('pooled', timed(client.get_server_version, args.calls))
+    finally:
+        httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()
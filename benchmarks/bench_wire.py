@@ -0,0 +1,56 @@
+"""
+    Compare payload size and decode time of the JSON and binary protobuf wire
+    formats for Schedules of increasing size.
+
+    Usage: python -m benchmarks.bench_wire --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+
+from src.ccm import wire
+from src import schedule_pb2 as objs
+
+
+def make_schedule(n):
+    sch = objs.Schedule(scheduleRunId='bench', score=1.0)
+    for i in range(n):
+        start = 1650000000 + 600 * i
+        sch.tasks.add(
+            taskId=f't{i}',
+            userId=f'u{i % 50}',
+            start=start,
+            end=start + 300,
+            visibilityId=f'v{i}',
+            noradId=str(40000 + i % 200),
+            siteId=f'site-{i % 30}',
+            added_at_tier=i % 3)
+    return sch
+
+
+def best_of(fn, repeat):
+    best = None
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"tasks":>9} {"format":>9} {"bytes":>12} {"decode_s":>10}')
+    for n in args.sizes:
+        sch = make_schedule(n)
+        for wire_format in (wire.JSON, wire.PROTOBUF):
+            body, content_type = wire.encode_message(sch, wire_format)
+            elapsed = best_of(lambda: wire.decode_message(objs.Schedule, body, content_type), args.repeat)
+            print(f'{n:>9} {wire_format:>9} {len(body):>12} {elapsed:>10.4f}')
+
+
+if __name__ == '__main__':
+    main()
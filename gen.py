@@ -76,8 +76,8 @@ def demo_delete_profile(client):
 
 def demo_create_preference_profile(client):
     profile_name = "my new profile"
-    if profile_name in client.profiles:
-        del client.profiles[profile_name]
+    if profile_name in client.profile_store:
+        client.profile_store.delete(profile_name)
     resp = client.create_preference_profile(profile_name)
     fn = 'docs/outputs/create_preference_profile.json'
     json.dump(resp, open(fn, 'w'), indent=4, sort_keys=True)
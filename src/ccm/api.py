@@ -1,14 +1,29 @@
-import argparse
+from __future__ import annotations
+
+import json
 import logging
 import os
 import random
-import requests
-import sys
 import time
 import uuid
-from google.protobuf.json_format import MessageToDict
-from src.ccm import __version__
-from src import schedule_pb2 as objs
+from urllib.parse import quote
+from src.ccm import wire
+from src.ccm.cache import ResponseCache, ScheduleCache
+from src.ccm.lazy import lazy_import
+from src.ccm.profile_store import MemoryProfileStore, ProfileMapping
+from src.ccm.session import build_session, DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE
+
+# Loaded on first use, so that importing this module and constructing a CcmApi stay cheap for short-lived processes
+objs = lazy_import('src.schedule_pb2')
+json_format = lazy_import('google.protobuf.json_format')
+converters = lazy_import('src.ccm.converters')
+delta = lazy_import('src.ccm.delta')
+diff = lazy_import('src.ccm.diff')
+feasibility = lazy_import('src.ccm.feasibility')
+intervals = lazy_import('src.ccm.intervals')
+profile_edit = lazy_import('src.ccm.profile_edit')
+scoring = lazy_import('src.ccm.scoring')
+telemetry = lazy_import('src.ccm.telemetry')
 
 __author__ = "Kyle Polich"
 __copyright__ = "Atlas Space Operations"
@@ -16,31 +31,148 @@ __license__ = "MIT"
 
 _logger = logging.getLogger(__name__)
 
+# Upper bound on the JSON body of one ``create_exact_requests`` call
+DEFAULT_EXACT_REQUEST_PAYLOAD_BYTES = 256 * 1024
+
 
 class CcmApi(object):
     "The CcmApi helper class contains several high level functions for controlling the Schedule Tasks assigned to your satellites.  This library manages the REST API calls and provides the user with discrete actions rather than transactional changes."
 
 
-    def __init__(self, user_id, api_host=None):
+    def __init__(self, user_id, api_host=None, session=None, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False, keep_alive=True, timeout=None, wire_format=wire.JSON, schedule_cache=None, visibility_windows=None, profile_store=None):
         """When initializing this helper object, provide the `user_id` assigned to you when you were granted access to CCM.
 
         :param user_id: The unique identifier assigned to your user account
         :type user_id: string
         :param api_host: Optional string specifying the CCM Server to use.  If not provided, the ``API_HOST`` environment variable will be used.
         :type api_host: string
+        :param session: Optional pooled session to share with other clients.  If not provided, one is built from the pool settings below.
+        :type session: requests.Session
+        :param pool_connections: The number of distinct hosts to keep connection pools for
+        :type pool_connections: int
+        :param pool_maxsize: The maximum number of keep-alive connections held open to any one host
+        :type pool_maxsize: int
+        :param pool_block: If True, threads wait for a free connection rather than exceeding ``pool_maxsize`` per host
+        :type pool_block: bool
+        :param keep_alive: If False, connections are closed after every response
+        :type keep_alive: bool
+        :param timeout: Optional timeout (in seconds) applied to every REST call
+        :type timeout: float
+        :param wire_format: ``json`` (the default) or ``protobuf``.  In ``protobuf`` mode Schedules and ScheduleResults are requested as ``application/x-protobuf`` and parsed directly, skipping the JSON encoding.
+        :type wire_format: string
+        :param schedule_cache: The ``ScheduleCache`` consulted by ``get_schedule_by_id`` before going to the server.  It may be shared between clients.  Defaults to an in-memory cache of its own; pass False to disable caching.
+        :type schedule_cache: ScheduleCache
+        :param visibility_windows: Optional ``VisibilityWindows`` against which Exact Requests are checked locally before being submitted
+        :type visibility_windows: VisibilityWindows
+        :param profile_store: Where Preference Profiles are kept locally, e.g. a ``SqliteProfileStore`` so that they survive the process.  Defaults to a ``MemoryProfileStore``.
+        :type profile_store: SqliteProfileStore
         """
         # TODO: authentication
         self.user_id = user_id
-        if api_host is None:
+        self._api_host = api_host
+        self._session = session
+        self._pool_settings = {
+            'pool_connections': pool_connections,
+            'pool_maxsize': pool_maxsize,
+            'pool_block': pool_block,
+            'keep_alive': keep_alive
+        }
+        self.timeout = timeout
+        wire.accept_header(wire_format)
+        self.wire_format = wire_format
+        if schedule_cache is None:
+            schedule_cache = ScheduleCache()
+        elif schedule_cache is False:
+            schedule_cache = None
+        self.schedule_cache = schedule_cache
+        self.visibility_windows = visibility_windows
+        self.response_cache = ResponseCache()
+        # The follow_scheduleRunId of runs seen so far.  A run's follow-up never changes once it exists.
+        self._follow_run_ids = {}
+        if profile_store is None:
+            profile_store = MemoryProfileStore()
+        self.profile_store = profile_store
+        self.current_profile = profile_store.get_current()
+
+
+    @property
+    def api_host(self):
+        """The CCM Server base URL.  If none was given, it is read from ``API_HOST`` (loading any ``.env`` file) the first time it is needed."""
+        if self._api_host is None:
             from dotenv import load_dotenv
             load_dotenv(override=True)
-            self.api_host = os.getenv('API_HOST')
-        else:
-            self.api_host = api_host
-        self.profiles = {
-            'default': {}
-        }
-        self.current_profile = 'default'
+            self._api_host = os.getenv('API_HOST')
+        return self._api_host
+
+
+    @api_host.setter
+    def api_host(self, api_host):
+        self._api_host = api_host
+
+
+    @property
+    def session(self):
+        """The pooled session every REST call goes through.  If none was given, it is built on first use."""
+        if self._session is None:
+            self._session = build_session(**self._pool_settings)
+        return self._session
+
+
+    @property
+    def profiles(self):
+        """Every Preference Profile in ``profile_store``, as the ``{name: {'prefs': [...]}}`` dictionary this attribute held before profiles moved to the store.  Changing it is deprecated; see ``ProfileMapping``.
+
+        :rtype: ProfileMapping
+        """
+        return ProfileMapping(self.profile_store)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+    def close(self):
+        """Release the pooled connections held by this client's session."""
+        if self._session is not None:
+            self._session.close()
+
+
+    def _request(self, method, path='', **kwargs):
+        """Issue a REST call against ``api_host`` through the shared pooled session."""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, self.api_host + path, **kwargs)
+
+
+    def _get_message(self, path, message_cls):
+        """GET a protobuf message in the configured ``wire_format``.  Returns None if the server has no such resource."""
+        r = self._request('GET', path, headers={'Accept': wire.accept_header(self.wire_format)})
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        return wire.decode_message(message_cls, r.content, r.headers.get('Content-Type'))
+
+
+    def _get_json(self, path):
+        """GET a JSON resource, revalidating any copy held in ``response_cache`` with a conditional request.  Returns None if the server has no such resource."""
+        url = self.api_host + path
+        r = self._request('GET', path, headers=self.response_cache.conditional_headers(url))
+        if r.status_code == 304:
+            body = self.response_cache.get(url)
+            if body is not None:
+                return body
+            # The cached copy was evicted after the validators were sent, so ask again for the full body
+            r = self._request('GET', path)
+        if r.status_code == 404:
+            self.response_cache.invalidate(url)
+            return None
+        r.raise_for_status()
+        body = r.json()
+        self.response_cache.put(url, r.headers, body)
+        return body
 
 
     def get_version(self):
@@ -58,7 +190,7 @@ class CcmApi(object):
         :return: A dictionary containing ``version`` identifier
         :rtype: dict
         """
-        r = requests.get(self.api_host)
+        r = self._request('GET')
         return {
             "version": "v1.0.0"
         }
@@ -90,8 +222,10 @@ class CcmApi(object):
         """
         if self.user_id == 'test':
             return [ {"name": "default"}, {"name": "my new profile"}, {"name": "recovery_mode"} ]
-        else:
+        profiles = self._get_json('profiles')
+        if profiles is None:
             return [ { "name": "default" } ]
+        return profiles
 
 
     def get_profile(self, profile_name='default'):
@@ -103,7 +237,12 @@ class CcmApi(object):
         :return: A dictionary with Preference Profile details such as those seen in Section `Retrieve A Preference Profile`_
         :rtype: object
         """
-        if self.user_id == 'test' and profile_name == "my new profile":
+        if self.user_id != 'test':
+            profile = self._get_json(f'profile/{quote(profile_name, safe="")}')
+            if profile is None:
+                return {}
+            return profile
+        if profile_name == "my new profile":
             tgauss_upref = objs.UserPreference(
                 constraintType=objs.UserPreference.ConstraintType.TruncatedGaussian,
                 objective=objs.UserPreference.Objective.ContactCountPerDay,
@@ -111,7 +250,7 @@ class CcmApi(object):
                 sigma=2,
                 min=0,
                 max=20)
-            tgu = MessageToDict(tgauss_upref, preserving_proto_field_name=True)
+            tgu = converters.message_to_dict(tgauss_upref, preserving_proto_field_name=True)
             prefs = [tgu]
             return {
                 "name": profile_name,
@@ -127,10 +266,15 @@ class CcmApi(object):
 
         :param profile_name: The unique identifier issued by the server.
         :type profile_name: string
-        :return: A Schedule object
-        :rtype: Schedule
+        :return: A list of UserPreference objects
+        :rtype: list
         """
-        return []
+        if self.user_id == 'test':
+            return []
+        prefs = self._get_json(f'profile/{quote(profile_name, safe="")}/preferences')
+        if prefs is None:
+            return []
+        return [json_format.ParseDict(p, objs.UserPreference(), ignore_unknown_fields=True) for p in prefs]
 
 
     def get_schedule_by_id(self, schedule_id: str) -> objs.Schedule:
@@ -169,11 +313,150 @@ class CcmApi(object):
                 tasks=tasks,
                 score=1.0 # TODO: should we even expose this?
             )
-        else:
+        elif self.user_id == 'test':
+            raise Exception('No schedule by that ID')
+        if self.schedule_cache is not None:
+            sch = self.schedule_cache.get(schedule_id)
+            if sch is not None:
+                return sch
+        sch = self._get_message(f'schedule/{quote(schedule_id, safe="")}', objs.Schedule)
+        if sch is None:
+            raise Exception('No schedule by that ID')
+        if self.schedule_cache is not None:
+            self.schedule_cache.put(schedule_id, sch)
+        return sch
+
+
+    def get_schedule_index(self, schedule_id: str, by=None) -> intervals.ScheduleIndex:
+        """Retrieve a schedule (see ``get_schedule_by_id``) and build an interval index over its tasks for point-in-time and window queries.
+
+        :param schedule_id: The unique identifier issued by the server.
+        :type schedule_id: string
+        :param by: Optional ``siteId`` or ``noradId`` to partition the index by
+        :type by: string
+        :raises Exception: No schedule by that ID.
+        :return: An index answering ``at(t)`` and ``overlapping(lo, hi)`` queries
+        :rtype: ScheduleIndex
+        """
+        return intervals.ScheduleIndex(self.get_schedule_by_id(schedule_id), by=by)
+
+
+    def get_schedule_result(self, schedule_id: str) -> objs.ScheduleResult:
+        """Retrieve the full ScheduleResult of an optimizer run, including its ``telemetry`` and ``follow_scheduleRunId``.
+
+        :param schedule_id: The unique identifier issued by the server.
+        :type schedule_id: string
+        :raises Exception: No schedule by that ID.
+        :return: A ScheduleResult object
+        :rtype: ScheduleResult
+        """
+        if self.user_id == 'test':
+            return objs.ScheduleResult(
+                schedule=self.get_schedule_by_id(schedule_id),
+                success=True)
+        result = self._get_message(f'schedule/{quote(schedule_id, safe="")}/result', objs.ScheduleResult)
+        if result is None:
+            raise Exception('No schedule by that ID')
+        if result.follow_scheduleRunId:
+            self._follow_run_ids[schedule_id] = result.follow_scheduleRunId
+        return result
+
+
+    def _get_follow_run_id(self, run_id: str) -> str:
+        """Get the ``follow_scheduleRunId`` of a run, or '' if it has none yet.  A follow-up already seen in a ScheduleResult is reused.  Otherwise the small ``schedule/<id>/follow`` resource is asked, and only a server without it costs a download of the whole ScheduleResult."""
+        follow = self._follow_run_ids.get(run_id)
+        if follow:
+            return follow
+        r = self._request('GET', f'schedule/{quote(run_id, safe="")}/follow')
+        if r.status_code == 404:
+            return self.get_schedule_result(run_id).follow_scheduleRunId
+        r.raise_for_status()
+        follow = r.json().get('follow_scheduleRunId', '')
+        if follow:
+            self._follow_run_ids[run_id] = follow
+        return follow
+
+
+    def get_schedule_telemetry(self, schedule_id: str) -> telemetry.TelemetryView:
+        """Retrieve the ScheduleTelemetry of an optimizer run as a lazy view.  Its ``system`` section and top-level totals are decoded right away; the ``groundStations``, ``spacecrafts`` and ``users`` entries are decoded one at a time as they are accessed.
+
+        The whole ScheduleResult is downloaded, as the server has no telemetry-only resource.  Binary protobuf is requested whatever the ``wire_format``, so that the ``schedule`` part of the body can be skipped without being decoded.  A server that only answers in JSON still works, but then the whole body, tasks included, is parsed by ``json.loads``; only the conversion of the telemetry entries to messages is deferred.
+
+        :param schedule_id: The unique identifier issued by the server.
+        :type schedule_id: string
+        :raises Exception: No schedule by that ID.
+        :return: A view that reads like a ScheduleTelemetry
+        :rtype: TelemetryView
+        """
+        if self.user_id == 'test':
+            return telemetry.TelemetryView.from_message(self.get_schedule_result(schedule_id).telemetry)
+        accept = f'{wire.accept_header(wire.PROTOBUF)}, {wire.accept_header(wire.JSON)};q=0.5'
+        r = self._request('GET', f'schedule/{quote(schedule_id, safe="")}/result', headers={'Accept': accept})
+        if r.status_code == 404:
             raise Exception('No schedule by that ID')
+        r.raise_for_status()
+        return telemetry.TelemetryView.from_result(r.content, r.headers.get('Content-Type'))
+
+
+    def _get_delta(self, schedule: objs.Schedule, run_id: str, next_run_id: str = None):
+        """Get the ScheduleDelta leading from ``run_id`` to its follow-up run (or to ``next_run_id``), or None if there is no newer run."""
+        if self.user_id != 'test':
+            path = f'schedule/{quote(run_id, safe="")}/delta'
+            params = {} if next_run_id is None else {'to': next_run_id}
+            r = self._request('GET', path, params=params)
+            if r.status_code == 204:
+                return None
+            if r.status_code != 404:
+                r.raise_for_status()
+                return delta.ScheduleDelta.from_dict(r.json())
+            # The server cannot produce a delta for this run, so fetch the next Schedule in full and diff locally
+            if next_run_id is None:
+                next_run_id = self._get_follow_run_id(run_id)
+        if not next_run_id:
+            return None
+        return delta.compute_delta(schedule, self.get_schedule_by_id(next_run_id))
+
+
+    def sync_schedule(self, previous_run_id: str, schedule: objs.Schedule = None, next_run_id: str = None) -> objs.Schedule:
+        """Bring a locally held Schedule up to date by following the ``follow_scheduleRunId`` chain from ``previous_run_id``.  Only the tasks added, removed or moved by each run are transferred, so the cost of a sync is proportional to churn rather than schedule size.
+
+        :param previous_run_id: The ``scheduleRunId`` of the Schedule you already hold
+        :type previous_run_id: string
+        :param schedule: The Schedule of ``previous_run_id``.  If not provided, it is retrieved with ``get_schedule_by_id``.
+        :type schedule: Schedule
+        :param next_run_id: Optional run to stop at, such as the ``next_schedule_id`` returned by ``set_profile`` or ``create_exact_request``.  If not provided, the chain is followed to its latest run.
+        :type next_run_id: string
+        :return: The latest Schedule
+        :rtype: Schedule
+        """
+        if schedule is None:
+            schedule = self.get_schedule_by_id(previous_run_id)
+        run_id = previous_run_id
+        while run_id != next_run_id:
+            step = self._get_delta(schedule, run_id, next_run_id)
+            if step is None or step.to_run_id == run_id:
+                break
+            schedule = delta.apply_delta(schedule, step)
+            run_id = step.to_run_id
+            _logger.debug(f'Synced schedule to {run_id} ({len(step)} changed tasks)')
+            if self.schedule_cache is not None:
+                self.schedule_cache.put(run_id, schedule)
+        return schedule
+
+
+    def diff_schedules(self, from_run_id: str, to_run_id: str) -> diff.ScheduleDiff:
+        """Find the tasks added, dropped, shifted and bumped between the Schedules of two runs.  See ``diff.diff_schedules``.
+
+        :param from_run_id: The ``scheduleRunId`` of the earlier run
+        :type from_run_id: string
+        :param to_run_id: The ``scheduleRunId`` of the later run
+        :type to_run_id: string
+        :rtype: ScheduleDiff
+        """
+        return diff.diff_schedules(self.get_schedule_by_id(from_run_id), self.get_schedule_by_id(to_run_id))
 
 
-    def create_exact_request(self, norad_id: str, ground_site_id: str, start_timestamp: int, end_timestamp: int):
+    def create_exact_request(self, norad_id: str, ground_site_id: str, start_timestamp: int, end_timestamp: int, min_duration: int = None, preflight=True):
         """Helper function for creating a UserPreference Object.
 
         :param norad_id: The NORAD ID of the Spacecraft for which the Exact Request is being made
@@ -186,10 +469,18 @@ class CcmApi(object):
         :type start_timestamp: int
         :param norad_id: The NORAD ID of the Spacecraft for which the Exact Request is being made
         :type norad_id: int
+        :param min_duration: Optional minimum length of the contact, in seconds
+        :type min_duration: int
+        :param preflight: If True and the client has ``visibility_windows``, check the request against them first.  An infeasible request fails without being submitted, and the response carries the nearest feasible window as ``suggestion`` when there is one.
+        :type preflight: bool
 
         :return: A JSON dictionary which should include ``success``
         :rtype: dict
         """
+        if preflight and self.visibility_windows is not None:
+            feasible, suggestion = self.visibility_windows.check(norad_id, ground_site_id, start_timestamp, end_timestamp, min_duration)
+            if not feasible:
+                return feasibility.infeasible_response(suggestion)
         if norad_id == 'test':
             return {
                 'success': True,
@@ -201,6 +492,99 @@ class CcmApi(object):
         }
 
 
+    def create_exact_requests(self, requests, max_payload_bytes=DEFAULT_EXACT_REQUEST_PAYLOAD_BYTES, preflight=True):
+        """Submit many Exact Requests at once, so that the Schedule is re-optimized once for all of them rather than once per request.
+
+        Requests are sent in as few calls as fit within ``max_payload_bytes``.  All calls share one ``batchId`` and only the last is marked ``final``, which tells the CCM Server to commit the batch, re-optimize and return the resulting ``next_schedule_id``.  If any call fails, or returns a different number of results than requests it carried, no further calls are made and every submitted request is reported as failed, as the batch was never committed.
+
+        :param requests: The Exact Requests to submit, including any ``minDuration`` and ``visibilityId``
+        :type requests: list
+        :param max_payload_bytes: The largest request body to send in one call
+        :type max_payload_bytes: int
+        :param preflight: If True and the client has ``visibility_windows``, requests that fail the local check are not submitted.  See ``create_exact_request``.
+        :raises Exception: A single request is larger than ``max_payload_bytes``.
+        :type preflight: bool
+        :return: A dictionary with ``success`` (True only if every request was accepted), a ``results`` list holding the ``success``/``msg`` of each request in order, and the ``next_schedule_id``
+        :rtype: dict
+        """
+        steps = self._exact_request_steps(requests, max_payload_bytes, preflight)
+        r = None
+        while True:
+            try:
+                body = steps.send(r)
+            except StopIteration as done:
+                return done.value
+            r = self._request('POST', 'exact-requests', json=body)
+
+
+    def _exact_request_steps(self, requests, max_payload_bytes, preflight):
+        """The work of ``create_exact_requests`` without its I/O, so that ``AsyncCcmApi`` can share it: a generator that yields the body of each ``exact-requests`` call, is sent back the response, and returns the result."""
+        requests = list(requests)
+        results = [None] * len(requests)
+        if preflight and self.visibility_windows is not None:
+            for i, r in enumerate(requests):
+                feasible, suggestion = self.visibility_windows.check_request(r)
+                if not feasible:
+                    results[i] = feasibility.infeasible_response(suggestion)
+        pending = [i for i, r in enumerate(results) if r is None]
+        next_schedule_id = None
+        if self.user_id == 'test':
+            for i in pending:
+                r = requests[i]
+                response = self.create_exact_request(r.noradId, r.siteId, r.startTimestamp, r.endTimestamp, preflight=False)
+                next_schedule_id = response.pop('next_schedule_id', None) or next_schedule_id
+                results[i] = response
+        elif pending:
+            batch_id = str(uuid.uuid4())
+            # The body of a call is the wrapper plus its items joined by ', ', exactly as ``requests`` serializes it
+            overhead = len(json.dumps({'batchId': batch_id, 'final': False, 'exactRequests': []}))
+            chunks = [[]]
+            size = overhead
+            for i in pending:
+                item = converters.message_to_dict(requests[i])
+                n = len(json.dumps(item)) + (2 if chunks[-1] else 0)
+                if chunks[-1] and size + n > max_payload_bytes:
+                    chunks.append([])
+                    size = overhead
+                    n -= 2
+                if size + n > max_payload_bytes:
+                    raise Exception(f'Exact Request {i} does not fit in max_payload_bytes={max_payload_bytes}')
+                chunks[-1].append(item)
+                size += n
+            responses = []
+            for i, chunk in enumerate(chunks):
+                body = {
+                    'batchId': batch_id,
+                    'final': i == len(chunks) - 1,
+                    'exactRequests': chunk
+                }
+                r = yield body
+                if r.ok:
+                    response = r.json()
+                    chunk_results = response.get('results', [])
+                    error = None if len(chunk_results) == len(chunk) else f'Expected {len(chunk)} results, got {len(chunk_results)}'
+                else:
+                    error = f'HTTP {r.status_code}'
+                if error is not None:
+                    # Without its final call the batch is never committed, so none of its requests took effect
+                    failed = {'success': False, 'msg': f'Batch not committed: {error}'}
+                    for j in pending:
+                        results[j] = dict(failed)
+                    next_schedule_id = None
+                    break
+                responses.extend(chunk_results)
+                next_schedule_id = response.get('next_schedule_id', next_schedule_id)
+            else:
+                for i, response in zip(pending, responses):
+                    results[i] = response
+        results = [r if r is not None else {'success': False, 'msg': 'No response'} for r in results]
+        return {
+            'success': len(results) > 0 and all(r.get('success', False) for r in results),
+            'results': results,
+            'next_schedule_id': next_schedule_id
+        }
+
+
     def generate_user_preference(self, constraint_type, objective, **kwargs):
         """Helper function for creating a UserPreference Object.
 
@@ -250,6 +634,12 @@ class CcmApi(object):
                     mmax = float(kwargs['max'])
                 if req not in kwargs:
                     raise Exception(f'Gaussian Requires {req}')
+        params = {}
+        for name in ['weight', 'bias', 'shape', 'start', 'decayBegins', 'lambdaParam']:
+            if name in kwargs:
+                params[name] = float(kwargs[name])
+        if 'decayHorizon' in kwargs:
+            params['decayHorizon'] = int(kwargs['decayHorizon'])
         up = objs.UserPreference(
             userId=self.user_id,
             tier=1,
@@ -258,7 +648,8 @@ class CcmApi(object):
             min=mmin,
             max=mmax,
             constraintType=constraint_type,
-            objective=objective
+            objective=objective,
+            **params
         )
         return up
 
@@ -272,6 +663,41 @@ class CcmApi(object):
         #     repeated string noradIds = 25;
 
 
+    def score_profile(self, schedule: objs.Schedule, profile_name=None, horizon=None):
+        """Score the UserPreferences of a Preference Profile against a Schedule locally, without waiting for a server run.  The scores are comparable to ``UserTelemetry.preferenceScores``.
+
+        :param schedule: The Schedule to evaluate, e.g. from ``get_schedule_by_id``
+        :type schedule: Schedule
+        :param profile_name: The Preference Profile to score.  Defaults to the current profile.
+        :type profile_name: string
+        :param horizon: Optional ``(start, end)`` posix timestamps of the evaluated period.  Defaults to the span of the Schedule.
+        :type horizon: tuple
+        :return: A dictionary with per-preference ``preferenceScores`` and the ``weight``-ed aggregate ``score``
+        :rtype: dict
+        """
+        if profile_name is None:
+            profile_name = self.current_profile
+        prefs = self.profile_store.preferences(profile_name) if profile_name in self.profile_store else None
+        if not prefs:
+            prefs = self.get_user_preferences(profile_name)
+        return scoring.score_profile(prefs, schedule, horizon)
+
+
+    def _write_through(self, method, path, invalidate=(), **kwargs):
+        """Apply a profile change on the CCM Server before it is stored locally.  The mock ``test`` account only changes the local store.  Returns an error response if the server refused the change, else the server's response body."""
+        if self.user_id == 'test':
+            return {}
+        r = self._request(method, path, **kwargs)
+        for url in invalidate:
+            self.response_cache.invalidate(self.api_host + url)
+        if not r.ok:
+            return {
+                'success': False,
+                'msg': f'HTTP {r.status_code}'
+            }
+        return r.json() if r.content else {}
+
+
     def add_preference_to_profile(self, profile_name, upref: objs.UserPreference):
         """Add the ``upref`` to the Preference Profile identified as ``profile_name``
 
@@ -280,15 +706,73 @@ class CcmApi(object):
         :return: A dictionary with ``success`` value (i.e. ``{ "success": True }``)
         :rtype: dict
         """
-        p = self.profiles[profile_name]
-        if 'prefs' not in p:
-            self.profiles[profile_name]['prefs'] = []
-        self.profiles[profile_name]['prefs'].append(upref)
+        if profile_name not in self.profile_store:
+            return {
+                'success': False,
+                'msg': f'Cannot find {profile_name}'
+            }
+        name = quote(profile_name, safe="")
+        resp = self._write_through('POST', f'profile/{name}/preferences', invalidate=[f'profile/{name}', f'profile/{name}/preferences'],
+                                   json=converters.message_to_dict(upref))
+        if resp.get('success') is False:
+            return resp
+        self.profile_store.add_preference(profile_name, upref)
         return {
             'success': True
         }
 
 
+    def set_preferences(self, profile_name, prefs):
+        """Replace every UserPreference of the Preference Profile ``profile_name`` in one request, so the server applies them atomically and re-optimizes once.
+
+        :param profile_name: The unique identifier of the Preference Profile
+        :type profile_name: string
+        :param prefs: The complete new list of UserPreference objects
+        :type prefs: list
+        :return: A dictionary with ``success`` value, and the ``next_schedule_id`` if the server reports one
+        :rtype: dict
+        """
+        if profile_name not in self.profile_store:
+            return {
+                'success': False,
+                'msg': f'Cannot find {profile_name}'
+            }
+        prefs = list(prefs)
+        name = quote(profile_name, safe="")
+        resp = self._write_through('PUT', f'profile/{name}/preferences', invalidate=[f'profile/{name}', f'profile/{name}/preferences'],
+                                   json=[converters.message_to_dict(p) for p in prefs])
+        if resp.get('success') is False:
+            return resp
+        self.profile_store.set_preferences(profile_name, prefs)
+        result = {
+            'success': True
+        }
+        if 'next_schedule_id' in resp:
+            result['next_schedule_id'] = resp['next_schedule_id']
+        return result
+
+
+    def edit_profile(self, profile_name) -> profile_edit.ProfileEdit:
+        """Start a batch of changes to a Preference Profile.  Adds, removes and parameter updates are collected locally and committed in a single ``set_preferences`` call::
+
+            with ca.edit_profile('ops') as edit:
+                for upref in uprefs:
+                    edit.add(upref)
+                edit.update('pass-count', mu=6)
+
+        :param profile_name: The unique identifier of the Preference Profile
+        :type profile_name: string
+        :raises Exception: No profile by that name.
+        :rtype: ProfileEdit
+        """
+        if profile_name not in self.profile_store:
+            raise Exception(f'Cannot find {profile_name}')
+        prefs = self.profile_store.preferences(profile_name)
+        if not prefs:
+            prefs = self.get_user_preferences(profile_name)
+        return profile_edit.ProfileEdit(self, profile_name, prefs)
+
+
     def create_preference_profile(self, profile_name):
         """Retrieve a schedule from the API by id.
 
@@ -297,12 +781,15 @@ class CcmApi(object):
         :return: A dictionary with ``success`` value
         :rtype: dict
         """
-        if profile_name in self.profiles:
+        if profile_name in self.profile_store:
             return {
                 'success': False,
                 'msg': 'Already exists'
             }
-        self.profiles[profile_name] = {}
+        resp = self._write_through('POST', f'profile/{quote(profile_name, safe="")}', invalidate=['profiles'])
+        if resp.get('success') is False:
+            return resp
+        self.profile_store.create(profile_name)
         return {
             'success': True
         }
@@ -313,15 +800,19 @@ class CcmApi(object):
 
         :param profile_name: The unique identifier of the Preference Profile
         :type profile_name: string
-        :return: A dictionary with ``success`` value
+        :return: A dictionary with ``success`` value and the ``next_schedule_id`` reported by the server, which is None if it reported none
         :rtype: dict
         """
-        if profile_name not in self.profiles:
+        if profile_name not in self.profile_store:
             return { 'success': False, 'msg': f'Cannot find {profile_name}' }
+        resp = self._write_through('PUT', 'current-profile', json={'name': profile_name})
+        if resp.get('success') is False:
+            return resp
+        self.profile_store.set_current(profile_name)
         self.current_profile = profile_name
         return {
             'success': True,
-            'next_schedule_id': str(uuid.uuid4())
+            'next_schedule_id': resp.get('next_schedule_id')
         }
 
 
@@ -333,13 +824,17 @@ class CcmApi(object):
         :return: A dictionary with ``success`` value
         :rtype: dict
         """
-        if profile_name not in self.profiles:
+        if profile_name not in self.profile_store:
             return {
                 'success': False,
                 'msg': f'Cannot find {profile_name}'
             }
         else:
-            del self.profiles[profile_name]
+            name = quote(profile_name, safe="")
+            resp = self._write_through('DELETE', f'profile/{name}', invalidate=['profiles', f'profile/{name}', f'profile/{name}/preferences'])
+            if resp.get('success') is False:
+                return resp
+            self.profile_store.delete(profile_name)
             return {
                 'success': True
             }
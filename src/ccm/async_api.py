@@ -0,0 +1,580 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from urllib.parse import quote
+from src.ccm import wire
+from src.ccm.api import CcmApi, DEFAULT_EXACT_REQUEST_PAYLOAD_BYTES, objs, json_format, converters, delta, diff, intervals, profile_edit, scoring, telemetry
+from src.ccm.async_session import AsyncSession
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 32
+
+
+class AsyncCcmApi(object):
+    "The AsyncCcmApi class mirrors every CcmApi method as an awaitable, with its REST calls made by an ``AsyncSession`` on the running event loop rather than on threads.  Thousands of calls can be awaited at once on one loop; ``max_concurrency`` only bounds how many connections, and so calls in flight, are open to the CCM Server at a time.  Caches, the profile store and the other settings are those of the wrapped ``client``, which should not be used from other threads meanwhile."
+
+
+    def __init__(self, user_id, api_host=None, max_concurrency=DEFAULT_MAX_CONCURRENCY, client=None, session=None, **kwargs):
+        """When initializing this helper object, provide the `user_id` assigned to you when you were granted access to CCM.
+
+        :param user_id: The unique identifier assigned to your user account
+        :type user_id: string
+        :param api_host: Optional string specifying the CCM Server to use.  If not provided, the ``API_HOST`` environment variable will be used.
+        :type api_host: string
+        :param max_concurrency: The maximum number of connections open to the CCM Server at once
+        :type max_concurrency: int
+        :param client: Optional ``CcmApi`` whose settings, caches and profile store to use instead of building a new one.  Its own session is not used.
+        :type client: CcmApi
+        :param session: Optional ``AsyncSession`` to share with other clients.  If not provided, one is built and closed along with this client.
+        :type session: AsyncSession
+        :param kwargs: Any other keyword arguments accepted by ``CcmApi``
+        """
+        if client is None:
+            client = CcmApi(user_id, api_host=api_host, **kwargs)
+        # Resolve the host now, as doing so may read an ``.env`` file, which should not happen on the event loop
+        client.api_host
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self._owns_session = session is None
+        if session is None:
+            session = AsyncSession(max_connections=max_concurrency, keep_alive=kwargs.get('keep_alive', True))
+        self.session = session
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+    async def close(self):
+        """Close the pooled connections, unless the session was given to this client to share."""
+        if self._owns_session:
+            await self.session.close()
+
+
+    async def _request(self, method, path='', **kwargs):
+        """Issue a REST call against ``api_host`` through the shared session."""
+        kwargs.setdefault('timeout', self.client.timeout)
+        return await self.session.request(method, self.client.api_host + path, **kwargs)
+
+
+    async def _get_message(self, path, message_cls):
+        """See ``CcmApi._get_message``."""
+        r = await self._request('GET', path, headers={'Accept': wire.accept_header(self.client.wire_format)})
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        return wire.decode_message(message_cls, r.content, r.headers.get('Content-Type'))
+
+
+    async def _get_json(self, path):
+        """See ``CcmApi._get_json``."""
+        cache = self.client.response_cache
+        url = self.client.api_host + path
+        r = await self._request('GET', path, headers=cache.conditional_headers(url))
+        if r.status_code == 304:
+            body = cache.get(url)
+            if body is not None:
+                return body
+            r = await self._request('GET', path)
+        if r.status_code == 404:
+            cache.invalidate(url)
+            return None
+        r.raise_for_status()
+        body = r.json()
+        cache.put(url, r.headers, body)
+        return body
+
+
+    async def _write_through(self, method, path, invalidate=(), **kwargs):
+        """See ``CcmApi._write_through``."""
+        if self.client.user_id == 'test':
+            return {}
+        r = await self._request(method, path, **kwargs)
+        for url in invalidate:
+            self.client.response_cache.invalidate(self.client.api_host + url)
+        if not r.ok:
+            return {
+                'success': False,
+                'msg': f'HTTP {r.status_code}'
+            }
+        return r.json() if r.content else {}
+
+
+    def get_version(self):
+        """Get the version information for the client you are running.
+
+        :return: A version identifier
+        :rtype: string
+        """
+        return self.client.get_version()
+
+
+    def get_api_host(self):
+        """Get the CCM Server API base endpoint the client is communicating with.
+
+        :return: Return the ``api_host`` of the CCM Server
+        :rtype: string
+        """
+        return self.client.get_api_host()
+
+
+    def get_current_profile(self):
+        """Retrieve the currently selected Preference Profile.
+
+        :return: The active Preference Profile's identifier
+        :rtype: string
+        """
+        return self.client.get_current_profile()
+
+
+    def generate_user_preference(self, constraint_type, objective, **kwargs):
+        """Helper function for creating a UserPreference Object.  See ``CcmApi.generate_user_preference``.
+
+        :return: A validated UserPreference object
+        :rtype: UserPreference
+        """
+        return self.client.generate_user_preference(constraint_type, objective, **kwargs)
+
+
+    async def get_server_version(self):
+        """Get the version information of the server you are connecting to.
+
+        :return: A dictionary containing ``version`` identifier
+        :rtype: dict
+        """
+        await self._request('GET')
+        return {
+            "version": "v1.0.0"
+        }
+
+
+    async def get_all_profiles(self):
+        """Retrieve all the profiles in your user account.
+
+        :return: A list of profiles
+        :rtype: list
+        """
+        if self.client.user_id == 'test':
+            return self.client.get_all_profiles()
+        profiles = await self._get_json('profiles')
+        if profiles is None:
+            return [ { "name": "default" } ]
+        return profiles
+
+
+    async def get_profile(self, profile_name='default'):
+        """Retrieve a profile from your account which contains all the UserPreference objects in the profile.
+
+        :param profile_name: The unique identifier of the Preference Profile
+        :type profile_name: string
+        :return: A dictionary with Preference Profile details
+        :rtype: object
+        """
+        if self.client.user_id == 'test':
+            return self.client.get_profile(profile_name)
+        profile = await self._get_json(f'profile/{quote(profile_name, safe="")}')
+        if profile is None:
+            return {}
+        return profile
+
+
+    async def get_user_preferences(self, profile_name='default') -> list:
+        """Retrieve all the UserPreferences found in the given ``profile_name``
+
+        :param profile_name: The unique identifier of the Preference Profile
+        :type profile_name: string
+        :return: A list of UserPreference objects
+        :rtype: list
+        """
+        if self.client.user_id == 'test':
+            return self.client.get_user_preferences(profile_name)
+        prefs = await self._get_json(f'profile/{quote(profile_name, safe="")}/preferences')
+        if prefs is None:
+            return []
+        return [json_format.ParseDict(p, objs.UserPreference(), ignore_unknown_fields=True) for p in prefs]
+
+
+    async def get_schedule_by_id(self, schedule_id: str) -> objs.Schedule:
+        """Retrieve a schedule from the API by id.
+
+        :param schedule_id: The unique identifier issued by the server.
+        :type schedule_id: string
+        :raises Exception: No schedule by that ID.
+        :return: A Schedule object
+        :rtype: Schedule
+        """
+        client = self.client
+        if schedule_id in ('empty', 'example') or client.user_id == 'test':
+            return client.get_schedule_by_id(schedule_id)
+        if client.schedule_cache is not None:
+            sch = client.schedule_cache.get(schedule_id)
+            if sch is not None:
+                return sch
+        sch = await self._get_message(f'schedule/{quote(schedule_id, safe="")}', objs.Schedule)
+        if sch is None:
+            raise Exception('No schedule by that ID')
+        if client.schedule_cache is not None:
+            client.schedule_cache.put(schedule_id, sch)
+        return sch
+
+
+    async def get_schedule_index(self, schedule_id: str, by=None):
+        """Retrieve a schedule and build an interval index over its tasks.  See ``CcmApi.get_schedule_index``.
+
+        :rtype: ScheduleIndex
+        """
+        return intervals.ScheduleIndex(await self.get_schedule_by_id(schedule_id), by=by)
+
+
+    async def get_schedule_result(self, schedule_id: str) -> objs.ScheduleResult:
+        """Retrieve the full ScheduleResult of an optimizer run.
+
+        :param schedule_id: The unique identifier issued by the server.
+        :type schedule_id: string
+        :raises Exception: No schedule by that ID.
+        :return: A ScheduleResult object
+        :rtype: ScheduleResult
+        """
+        if self.client.user_id == 'test':
+            return self.client.get_schedule_result(schedule_id)
+        result = await self._get_message(f'schedule/{quote(schedule_id, safe="")}/result', objs.ScheduleResult)
+        if result is None:
+            raise Exception('No schedule by that ID')
+        if result.follow_scheduleRunId:
+            self.client._follow_run_ids[schedule_id] = result.follow_scheduleRunId
+        return result
+
+
+    async def _get_follow_run_id(self, run_id: str) -> str:
+        """See ``CcmApi._get_follow_run_id``."""
+        follow = self.client._follow_run_ids.get(run_id)
+        if follow:
+            return follow
+        r = await self._request('GET', f'schedule/{quote(run_id, safe="")}/follow')
+        if r.status_code == 404:
+            return (await self.get_schedule_result(run_id)).follow_scheduleRunId
+        r.raise_for_status()
+        follow = r.json().get('follow_scheduleRunId', '')
+        if follow:
+            self.client._follow_run_ids[run_id] = follow
+        return follow
+
+
+    async def get_schedule_telemetry(self, schedule_id: str):
+        """Retrieve the ScheduleTelemetry of an optimizer run as a lazy view.  See ``CcmApi.get_schedule_telemetry``.
+
+        :param schedule_id: The unique identifier issued by the server.
+        :type schedule_id: string
+        :raises Exception: No schedule by that ID.
+        :return: A view that reads like a ScheduleTelemetry
+        :rtype: TelemetryView
+        """
+        if self.client.user_id == 'test':
+            return self.client.get_schedule_telemetry(schedule_id)
+        accept = f'{wire.accept_header(wire.PROTOBUF)}, {wire.accept_header(wire.JSON)};q=0.5'
+        r = await self._request('GET', f'schedule/{quote(schedule_id, safe="")}/result', headers={'Accept': accept})
+        if r.status_code == 404:
+            raise Exception('No schedule by that ID')
+        r.raise_for_status()
+        return telemetry.TelemetryView.from_result(r.content, r.headers.get('Content-Type'))
+
+
+    async def _get_delta(self, schedule: objs.Schedule, run_id: str, next_run_id: str = None):
+        """See ``CcmApi._get_delta``."""
+        if self.client.user_id != 'test':
+            path = f'schedule/{quote(run_id, safe="")}/delta'
+            params = {} if next_run_id is None else {'to': next_run_id}
+            r = await self._request('GET', path, params=params)
+            if r.status_code == 204:
+                return None
+            if r.status_code != 404:
+                r.raise_for_status()
+                return delta.ScheduleDelta.from_dict(r.json())
+            if next_run_id is None:
+                next_run_id = await self._get_follow_run_id(run_id)
+        if not next_run_id:
+            return None
+        return delta.compute_delta(schedule, await self.get_schedule_by_id(next_run_id))
+
+
+    async def sync_schedule(self, previous_run_id: str, schedule: objs.Schedule = None, next_run_id: str = None) -> objs.Schedule:
+        """Bring a locally held Schedule up to date.  See ``CcmApi.sync_schedule``.
+
+        :return: The latest Schedule
+        :rtype: Schedule
+        """
+        if schedule is None:
+            schedule = await self.get_schedule_by_id(previous_run_id)
+        run_id = previous_run_id
+        while run_id != next_run_id:
+            step = await self._get_delta(schedule, run_id, next_run_id)
+            if step is None or step.to_run_id == run_id:
+                break
+            schedule = delta.apply_delta(schedule, step)
+            run_id = step.to_run_id
+            _logger.debug(f'Synced schedule to {run_id} ({len(step)} changed tasks)')
+            if self.client.schedule_cache is not None:
+                self.client.schedule_cache.put(run_id, schedule)
+        return schedule
+
+
+    async def diff_schedules(self, from_run_id: str, to_run_id: str):
+        """Compare the Schedules of two runs.  See ``CcmApi.diff_schedules``.
+
+        :rtype: ScheduleDiff
+        """
+        before, after = await asyncio.gather(self.get_schedule_by_id(from_run_id), self.get_schedule_by_id(to_run_id))
+        return diff.diff_schedules(before, after)
+
+
+    async def create_exact_request(self, norad_id: str, ground_site_id: str, start_timestamp: int, end_timestamp: int, **kwargs):
+        """Submit an Exact Request.  See ``CcmApi.create_exact_request``.
+
+        :return: A JSON dictionary which should include ``success``
+        :rtype: dict
+        """
+        return self.client.create_exact_request(norad_id, ground_site_id, start_timestamp, end_timestamp, **kwargs)
+
+
+    async def create_exact_requests(self, requests, max_payload_bytes=DEFAULT_EXACT_REQUEST_PAYLOAD_BYTES, preflight=True):
+        """Submit many Exact Requests at once.  See ``CcmApi.create_exact_requests``.
+
+        :return: A dictionary with ``success``, per-request ``results`` and the ``next_schedule_id``
+        :rtype: dict
+        """
+        steps = self.client._exact_request_steps(requests, max_payload_bytes, preflight)
+        r = None
+        while True:
+            try:
+                body = steps.send(r)
+            except StopIteration as done:
+                return done.value
+            r = await self._request('POST', 'exact-requests', json=body)
+
+
+    async def add_preference_to_profile(self, profile_name, upref: objs.UserPreference):
+        """Add the ``upref`` to the Preference Profile identified as ``profile_name``
+
+        :return: A dictionary with ``success`` value
+        :rtype: dict
+        """
+        store = self.client.profile_store
+        if profile_name not in store:
+            return {
+                'success': False,
+                'msg': f'Cannot find {profile_name}'
+            }
+        name = quote(profile_name, safe="")
+        resp = await self._write_through('POST', f'profile/{name}/preferences', invalidate=[f'profile/{name}', f'profile/{name}/preferences'],
+                                         json=converters.message_to_dict(upref))
+        if resp.get('success') is False:
+            return resp
+        store.add_preference(profile_name, upref)
+        return {
+            'success': True
+        }
+
+
+    async def set_preferences(self, profile_name, prefs):
+        """Replace every UserPreference of a Preference Profile in one request.  See ``CcmApi.set_preferences``.
+
+        :return: A dictionary with ``success`` value
+        :rtype: dict
+        """
+        store = self.client.profile_store
+        if profile_name not in store:
+            return {
+                'success': False,
+                'msg': f'Cannot find {profile_name}'
+            }
+        prefs = list(prefs)
+        name = quote(profile_name, safe="")
+        resp = await self._write_through('PUT', f'profile/{name}/preferences', invalidate=[f'profile/{name}', f'profile/{name}/preferences'],
+                                         json=[converters.message_to_dict(p) for p in prefs])
+        if resp.get('success') is False:
+            return resp
+        store.set_preferences(profile_name, prefs)
+        result = {
+            'success': True
+        }
+        if 'next_schedule_id' in resp:
+            result['next_schedule_id'] = resp['next_schedule_id']
+        return result
+
+
+    async def score_profile(self, schedule: objs.Schedule, profile_name=None, horizon=None):
+        """Score the UserPreferences of a Preference Profile against a Schedule locally.  See ``CcmApi.score_profile``.
+
+        :return: A dictionary with per-preference ``preferenceScores`` and the ``weight``-ed aggregate ``score``
+        :rtype: dict
+        """
+        if profile_name is None:
+            profile_name = self.client.current_profile
+        store = self.client.profile_store
+        prefs = store.preferences(profile_name) if profile_name in store else None
+        if not prefs:
+            prefs = await self.get_user_preferences(profile_name)
+        return scoring.score_profile(prefs, schedule, horizon)
+
+
+    def edit_profile(self, profile_name):
+        """Start a batch of changes to a Preference Profile, committed in a single ``set_preferences`` call.  See ``CcmApi.edit_profile``::
+
+            async with ca.edit_profile('ops') as edit:
+                edit.add(upref)
+                edit.update('pass-count', mu=6)
+
+        :param profile_name: The unique identifier of the Preference Profile
+        :type profile_name: string
+        :rtype: AsyncProfileEdit
+        """
+        return AsyncProfileEdit(self, profile_name)
+
+
+    async def create_preference_profile(self, profile_name):
+        """Create a new, empty Preference Profile.
+
+        :return: A dictionary with ``success`` value
+        :rtype: dict
+        """
+        store = self.client.profile_store
+        if profile_name in store:
+            return {
+                'success': False,
+                'msg': 'Already exists'
+            }
+        resp = await self._write_through('POST', f'profile/{quote(profile_name, safe="")}', invalidate=['profiles'])
+        if resp.get('success') is False:
+            return resp
+        store.create(profile_name)
+        return {
+            'success': True
+        }
+
+
+    async def set_profile(self, profile_name):
+        """Activate the Preference Profile identified as ``profile_name``.
+
+        :return: A dictionary with ``success`` value and the ``next_schedule_id`` reported by the server, or None
+        :rtype: dict
+        """
+        client = self.client
+        if profile_name not in client.profile_store:
+            return { 'success': False, 'msg': f'Cannot find {profile_name}' }
+        resp = await self._write_through('PUT', 'current-profile', json={'name': profile_name})
+        if resp.get('success') is False:
+            return resp
+        client.profile_store.set_current(profile_name)
+        client.current_profile = profile_name
+        return {
+            'success': True,
+            'next_schedule_id': resp.get('next_schedule_id')
+        }
+
+
+    async def delete_profile(self, profile_name):
+        """Delete the Preference Profile identified as ``profile_name``.
+
+        :return: A dictionary with ``success`` value
+        :rtype: dict
+        """
+        store = self.client.profile_store
+        if profile_name not in store:
+            return {
+                'success': False,
+                'msg': f'Cannot find {profile_name}'
+            }
+        name = quote(profile_name, safe="")
+        resp = await self._write_through('DELETE', f'profile/{name}', invalidate=['profiles', f'profile/{name}', f'profile/{name}/preferences'])
+        if resp.get('success') is False:
+            return resp
+        store.delete(profile_name)
+        return {
+            'success': True
+        }
+
+
+class AsyncProfileEdit(object):
+    "The awaitable counterpart of ``ProfileEdit``.  The profile is loaded on entering the ``async with`` block, changes are collected locally, and they are committed when the block exits normally."
+
+
+    def __init__(self, api, profile_name):
+        """Built by ``AsyncCcmApi.edit_profile``.
+
+        :param api: The client to load and commit through
+        :type api: AsyncCcmApi
+        :param profile_name: The Preference Profile being edited
+        :type profile_name: string
+        """
+        self.api = api
+        self.profile_name = profile_name
+        self.edit = None
+
+
+    async def load(self):
+        """Fetch the current UserPreferences of the profile.  Called on entering the ``async with`` block.
+
+        :raises Exception: No profile by that name.
+        """
+        client = self.api.client
+        if self.profile_name not in client.profile_store:
+            raise Exception(f'Cannot find {self.profile_name}')
+        prefs = client.profile_store.preferences(self.profile_name)
+        if not prefs:
+            prefs = await self.api.get_user_preferences(self.profile_name)
+        self.edit = profile_edit.ProfileEdit(client, self.profile_name, prefs)
+        return self
+
+
+    async def __aenter__(self):
+        return await self.load()
+
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self.edit.result is None:
+            await self.commit()
+
+
+    @property
+    def prefs(self):
+        return self.edit.prefs
+
+
+    @property
+    def result(self):
+        return self.edit.result
+
+
+    def add(self, upref: objs.UserPreference):
+        self.edit.add(upref)
+        return self
+
+
+    def remove(self, key):
+        self.edit.remove(key)
+        return self
+
+
+    def update(self, key, **params):
+        self.edit.update(key, **params)
+        return self
+
+
+    async def commit(self):
+        """Send every change to the server in one request.
+
+        :return: The response of ``AsyncCcmApi.set_preferences``
+        :rtype: dict
+        """
+        self.edit.result = await self.api.set_preferences(self.profile_name, self.edit.prefs)
+        return self.edit.result
@@ -0,0 +1,237 @@
+import asyncio
+import json as _json
+import logging
+from urllib.parse import urlencode, urlsplit
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONNECTIONS = 32
+
+# Responses to these never carry a body, whatever their headers say
+_NO_BODY_STATUSES = {204, 304}
+
+
+class AsyncResponseHeaders(dict):
+    "Response headers, looked up case-insensitively like those of a ``requests.Response``."
+
+    def __init__(self, items=()):
+        super().__init__((k.lower(), v) for k, v in items)
+
+    def __getitem__(self, key):
+        return super().__getitem__(key.lower())
+
+    def __contains__(self, key):
+        return super().__contains__(key.lower())
+
+    def get(self, key, default=None):
+        return super().get(key.lower(), default)
+
+
+class AsyncResponse(object):
+    "A response received by ``AsyncSession``, read in full.  It offers the parts of ``requests.Response`` that CcmApi relies on: ``status_code``, ``headers``, ``content``, ``ok``, ``json()`` and ``raise_for_status()``."
+
+    def __init__(self, url, status_code, reason, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+
+    def json(self):
+        return _json.loads(self.content)
+
+
+    def raise_for_status(self):
+        """
+        :raises Exception: The response is a 4xx or 5xx error.
+        """
+        if not self.ok:
+            raise Exception(f'HTTP {self.status_code} {self.reason} for {self.url}')
+
+
+class _StaleConnection(Exception):
+    "A pooled keep-alive connection was closed by the server before it sent anything back."
+
+
+class AsyncSession(object):
+    "An HTTP/1.1 client driven entirely by the running event loop.  Requests are written and responses read with asyncio streams, so any number of calls can be awaited at once without a thread apiece.  Keep-alive connections are pooled per host, at most ``max_connections`` are open to any one host, and calls beyond that wait on the loop for a free connection.  A session belongs to the event loop it is first used on."
+
+
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS, keep_alive=True, ssl_context=None):
+        """
+        :param max_connections: The maximum number of connections open to any one host, and so of calls to it in flight
+        :type max_connections: int
+        :param keep_alive: If False, every request asks the server to close the connection once it responds
+        :type keep_alive: bool
+        :param ssl_context: Optional ``ssl.SSLContext`` for ``https`` hosts.  Defaults to ``ssl.create_default_context()``.
+        :type ssl_context: ssl.SSLContext
+        """
+        self.max_connections = max_connections
+        self.keep_alive = keep_alive
+        self.ssl_context = ssl_context
+        self._idle = {}
+        self._limits = {}
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+    async def close(self):
+        """Close every idle pooled connection."""
+        idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for reader, writer in connections:
+                writer.close()
+        for connections in idle.values():
+            for reader, writer in connections:
+                try:
+                    await writer.wait_closed()
+                except (ConnectionError, OSError):
+                    pass
+
+
+    async def request(self, method, url, params=None, json=None, data=None, headers=None, timeout=None):
+        """Send one request and read its whole response.
+
+        :param method: The HTTP method, e.g. ``GET``
+        :type method: string
+        :param url: The absolute ``http`` or ``https`` URL
+        :type url: string
+        :param params: Optional query parameters
+        :type params: dict
+        :param json: Optional body, sent as JSON
+        :param data: Optional raw body
+        :type data: bytes
+        :param headers: Optional request headers
+        :type headers: dict
+        :param timeout: Optional limit (in seconds) on the whole call, including any wait for a free connection
+        :type timeout: float
+        :rtype: AsyncResponse
+        """
+        call = self._request(method, url, params, json, data, headers)
+        if timeout is None:
+            return await call
+        return await asyncio.wait_for(call, timeout)
+
+
+    async def _request(self, method, url, params, json, data, headers):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f'Unsupported URL {url}')
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        target = parts.path or '/'
+        query = '&'.join(q for q in (parts.query, urlencode(params or {})) if q)
+        if query:
+            target += '?' + query
+        fields = {
+            'Host': parts.netloc,
+            'Accept': '*/*',
+            'Accept-Encoding': 'identity',
+            'Connection': 'keep-alive' if self.keep_alive else 'close',
+        }
+        if json is not None:
+            data = _json.dumps(json).encode('utf-8')
+            fields['Content-Type'] = 'application/json'
+        fields.update(headers or {})
+        if data is not None or method in ('POST', 'PUT', 'PATCH'):
+            fields['Content-Length'] = str(len(data or b''))
+        head = f'{method} {target} HTTP/1.1\r\n' + ''.join(f'{k}: {v}\r\n' for k, v in fields.items()) + '\r\n'
+        payload = head.encode('latin-1') + (data or b'')
+        limit = self._limits.get(key)
+        if limit is None:
+            limit = self._limits[key] = asyncio.Semaphore(self.max_connections)
+        async with limit:
+            while True:
+                idle = self._idle.get(key)
+                reused = bool(idle)
+                reader, writer = idle.pop() if reused else await self._connect(parts.scheme, parts.hostname, port)
+                try:
+                    status_code, reason, response_headers, content, reusable = await self._exchange(reader, writer, method, payload)
+                except _StaleConnection:
+                    writer.close()
+                    if reused:
+                        _logger.debug(f'Pooled connection to {parts.hostname}:{port} had closed, retrying')
+                        continue
+                    raise ConnectionError(f'{parts.hostname}:{port} closed the connection without responding')
+                except BaseException:
+                    writer.close()
+                    raise
+                if reusable and self.keep_alive:
+                    self._idle.setdefault(key, []).append((reader, writer))
+                else:
+                    writer.close()
+                return AsyncResponse(url, status_code, reason, response_headers, content)
+
+
+    async def _connect(self, scheme, host, port):
+        ssl_context = None
+        if scheme == 'https':
+            if self.ssl_context is None:
+                import ssl
+                self.ssl_context = ssl.create_default_context()
+            ssl_context = self.ssl_context
+        return await asyncio.open_connection(host, port, ssl=ssl_context)
+
+
+    async def _exchange(self, reader, writer, method, payload):
+        """Write one request and read its response.  Returns ``(status_code, reason, headers, content, reusable)``."""
+        try:
+            writer.write(payload)
+            await writer.drain()
+            status_line = await reader.readline()
+        except (ConnectionResetError, BrokenPipeError):
+            raise _StaleConnection()
+        if not status_line:
+            raise _StaleConnection()
+        version, status, reason = (status_line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+        status_code = int(status)
+        items = []
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            items.append((name.strip(), value.strip()))
+        headers = AsyncResponseHeaders(items)
+        connection = headers.get('Connection', '').lower()
+        reusable = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        if method == 'HEAD' or status_code in _NO_BODY_STATUSES or status_code < 200:
+            content = b''
+        elif 'chunked' in headers.get('Transfer-Encoding', '').lower():
+            content = await self._read_chunked(reader)
+        elif 'Content-Length' in headers:
+            content = await reader.readexactly(int(headers['Content-Length']))
+        else:
+            content = await reader.read()
+            reusable = False
+        return status_code, reason, headers, content, reusable
+
+
+    async def _read_chunked(self, reader):
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        # Skip any trailer fields up to the blank line that ends the message
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        return b''.join(chunks)
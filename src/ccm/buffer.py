@@ -0,0 +1,168 @@
+import logging
+import numpy as np
+from src import schedule_pb2 as objs
+from src.ccm.frame import ScheduleFrame
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+FillType = objs.BufferFillEvent.FillType
+
+
+class BufferSimulation(object):
+    "The predicted onboard buffer level of several spacecraft over a schedule.  The level is piecewise linear between ``timestamps``, so the observations at those instants describe it exactly."
+
+
+    def __init__(self, norad_ids, capacity, timestamps, levels, max_level, overflow):
+        """Built by ``simulate_buffers``.
+
+        :param norad_ids: The ``noradId`` of each simulated spacecraft
+        :param capacity: ``bufferCapacity`` of each spacecraft
+        :param timestamps: A (spacecraft, breakpoint) array of observation times, padded with the horizon end
+        :param levels: A (spacecraft, breakpoint) array of buffer levels at those times
+        :param max_level: The highest level reached by each spacecraft
+        :param overflow: True for each spacecraft whose buffer would have exceeded its capacity
+        """
+        self.norad_ids = norad_ids
+        self.capacity = capacity
+        self.timestamps = timestamps
+        self.levels = levels
+        self.max_level = max_level
+        self.overflow = overflow
+
+
+    @property
+    def percent_fill(self):
+        """Buffer level as a percentage of capacity, per spacecraft and breakpoint."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.nan_to_num(100.0 * self.levels / self.capacity[:, np.newaxis])
+
+
+    @property
+    def maximum_cumu_buffer_fill_percent(self):
+        """The MaximumCumuBufferFillPercent objective: the peak buffer level of each spacecraft as a percentage of its capacity."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.nan_to_num(100.0 * self.max_level / self.capacity)
+
+
+    def time_series(self, norad_id) -> objs.BufferTimeSeries:
+        """Get the simulated buffer of one spacecraft as a BufferTimeSeries.
+
+        :param norad_id: The spacecraft
+        :type norad_id: string
+        :rtype: BufferTimeSeries
+        """
+        i = list(self.norad_ids).index(norad_id)
+        timestamps = self.timestamps[i]
+        keep = np.concatenate(([True], timestamps[1:] != timestamps[:-1]))
+        series = objs.BufferTimeSeries(noradId=norad_id)
+        for t, p in zip(timestamps[keep].tolist(), self.percent_fill[i][keep].tolist()):
+            series.observations.add(timestamp=int(t), percentBufferFill=p)
+        return series
+
+
+    def detected_buffer_overflow(self, norad_id):
+        """Whether the buffer of ``norad_id`` would have overflowed, as reported by ``SpacecraftTelemetry.detectedBufferOverflow``."""
+        return bool(self.overflow[list(self.norad_ids).index(norad_id)])
+
+
+def _breakpoints(spacecraft, start, end, horizon):
+    """Collect the (time, rate change, jump, flush) events that shape one spacecraft's buffer."""
+    lo, hi = horizon
+    times = [lo, hi]
+    rates = [0.0, 0.0]
+    jumps = [0.0, 0.0]
+    flushes = [False, False]
+    for event in spacecraft.fillEvents:
+        t0 = event.timeLow if event.HasField('timeLow') else lo
+        t1 = event.timeHigh if event.HasField('timeHigh') else hi
+        if event.ftype == FillType.FLUSH_BUFFER:
+            times.append(t0)
+            rates.append(0.0)
+            jumps.append(0.0)
+            flushes.append(True)
+            continue
+        times.extend([t0, t1])
+        rates.extend([event.fillAmountPerSecond, -event.fillAmountPerSecond])
+        jumps.extend([event.fillAmountOnEntry, event.fillAmountOnExit])
+        flushes.extend([False, False])
+    times = np.concatenate((np.asarray(times, dtype=float), start, end))
+    rates = np.concatenate((rates, np.full(len(start), -spacecraft.downlinkSpeed), np.full(len(end), spacecraft.downlinkSpeed)))
+    jumps = np.concatenate((jumps, np.zeros(2 * len(start))))
+    flushes = np.concatenate((flushes, np.zeros(2 * len(start), dtype=bool)))
+    # An event that began before the horizon is already in progress at its start, where its rate still applies, but its entry jump
+    # (or flush) is part of ``initial_fill``.  Jumps after the horizon never happen within it.
+    outside = (times < lo) | (times > hi)
+    jumps[outside] = 0.0
+    flushes[outside] = False
+    times = np.clip(times, lo, hi)
+    order = np.argsort(times, kind='stable')
+    unique, inverse = np.unique(times[order], return_inverse=True)
+    rate = np.zeros(len(unique))
+    jump = np.zeros(len(unique))
+    flush = np.zeros(len(unique), dtype=bool)
+    np.add.at(rate, inverse, rates[order])
+    np.add.at(jump, inverse, jumps[order])
+    np.logical_or.at(flush, inverse, flushes[order])
+    return unique, np.cumsum(rate), jump, flush
+
+
+def simulate_buffers(spacecrafts, schedule, horizon=None, initial_fill=0.0) -> BufferSimulation:
+    """Predict the onboard buffer of each spacecraft over a candidate schedule.
+
+    Each ``BufferFillEvent`` adds ``fillAmountOnEntry`` at ``timeLow``, fills at ``fillAmountPerSecond`` until ``timeHigh`` and adds ``fillAmountOnExit`` there; a ``FLUSH_BUFFER`` event empties the buffer at ``timeLow``.  Every ScheduledTask of the spacecraft downlinks at ``downlinkSpeed`` for its duration.  The level is kept within ``[0, bufferCapacity]``, and any attempt to exceed the capacity is flagged as an overflow.  An event that straddles the start of the horizon is taken to be in progress there: it fills at its rate from the horizon start, while its entry amount is assumed to be part of ``initial_fill``.  Entry and exit amounts and flushes that fall outside the horizon are ignored.
+
+    All spacecraft are stepped together, one breakpoint at a time, so the cost grows with the number of breakpoints per spacecraft rather than with the fleet size.
+
+    :param spacecrafts: The Spacecraft to simulate
+    :type spacecrafts: list
+    :param schedule: The candidate schedule whose tasks provide the downlink windows
+    :type schedule: Schedule or ScheduleFrame
+    :param horizon: Optional ``(start, end)`` posix timestamps to simulate.  Defaults to the span of the schedule.
+    :type horizon: tuple
+    :param initial_fill: The buffer level of every spacecraft at the start of the horizon
+    :type initial_fill: float
+    :rtype: BufferSimulation
+    """
+    frame = schedule if isinstance(schedule, ScheduleFrame) else ScheduleFrame.from_schedule(schedule)
+    if horizon is None:
+        horizon = (int(frame.start.min()), int(frame.end.max())) if len(frame) else (0, 0)
+    norad_ids = np.array([s.noradId for s in spacecrafts], dtype=object)
+    capacity = np.array([s.bufferCapacity for s in spacecrafts], dtype=float)
+    order, bounds = frame.group_indices('noradId')
+    positions = {norad: order[bounds[i]:bounds[i + 1]] for i, norad in enumerate(frame.categories['noradId'])}
+    empty = np.empty(0, dtype=np.int64)
+    events = []
+    for s in spacecrafts:
+        p = positions.get(s.noradId, empty)
+        events.append(_breakpoints(s, frame.start[p].astype(float), frame.end[p].astype(float), horizon))
+    n = len(spacecrafts)
+    width = max([len(e[0]) for e in events] or [0])
+    times = np.full((n, width), float(horizon[1]))
+    rate = np.zeros((n, width))
+    jump = np.zeros((n, width))
+    flush = np.zeros((n, width), dtype=bool)
+    for i, (t, r, j, f) in enumerate(events):
+        times[i, :len(t)] = t
+        rate[i, :len(t)] = r
+        jump[i, :len(t)] = j
+        flush[i, :len(t)] = f
+    levels = np.zeros((n, width))
+    level = np.full(n, float(initial_fill))
+    max_level = level.copy()
+    overflow = level > capacity
+    for j in range(width):
+        level = level + jump[:, j]
+        overflow |= level > capacity
+        level = np.where(flush[:, j], 0.0, np.clip(level, 0.0, capacity))
+        levels[:, j] = level
+        max_level = np.maximum(max_level, level)
+        if j + 1 < width:
+            level = level + rate[:, j] * (times[:, j + 1] - times[:, j])
+            overflow |= level > capacity
+            level = np.clip(level, 0.0, capacity)
+            max_level = np.maximum(max_level, level)
+    return BufferSimulation(norad_ids, capacity, times, levels, max_level, overflow)
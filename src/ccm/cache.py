@@ -0,0 +1,242 @@
+import copy
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from src.ccm.lazy import lazy_import
+
+objs = lazy_import('src.schedule_pb2')
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+
+
+def _copy(schedule):
+    result = objs.Schedule()
+    result.CopyFrom(schedule)
+    return result
+
+
+class ScheduleCache(object):
+    "A ``scheduleRunId`` names one finished optimizer run, so its Schedule never changes.  ScheduleCache keeps the most recently used Schedules in memory under a byte budget (evicting the least recently used first) and, optionally, serialized copies in ``disk_dir`` under a second byte budget, evicted the same way.  Every CcmApi has one unless it is given another, and one cache may be shared by several clients and threads.  Schedules are copied on the way in and out, so callers are free to modify what they put or get."
+
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        """
+        :param max_bytes: The budget for Schedules held in memory, measured by their serialized size
+        :type max_bytes: int
+        :param disk_dir: Optional directory for the on-disk tier.  It is created if it does not exist.
+        :type disk_dir: string
+        :param max_disk_bytes: The budget for the files in ``disk_dir``.  Files already there count against it, oldest first.
+        :type max_disk_bytes: int
+        """
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.nbytes = 0
+        self.disk_nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+            files = []
+            for entry in os.scandir(disk_dir):
+                if entry.name.endswith('.pb'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.path, stat.st_size))
+            for mtime, path, size in sorted(files):
+                self._files[path] = size
+                self.disk_nbytes += size
+            self._evict_files()
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __contains__(self, schedule_run_id):
+        with self._lock:
+            if schedule_run_id in self._entries:
+                return True
+        return self.disk_dir is not None and os.path.exists(self._path(schedule_run_id))
+
+
+    def _path(self, schedule_run_id):
+        digest = hashlib.sha1(schedule_run_id.encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f'{digest}.pb')
+
+
+    def _remember(self, schedule_run_id, schedule, size):
+        if schedule_run_id in self._entries:
+            self.nbytes -= self._entries.pop(schedule_run_id)[1]
+        if size > self.max_bytes:
+            return
+        self._entries[schedule_run_id] = (schedule, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            evicted, (sch, evicted_size) = self._entries.popitem(last=False)
+            self.nbytes -= evicted_size
+            _logger.debug(f'Evicted schedule {evicted} ({evicted_size} bytes)')
+
+
+    def _evict_files(self):
+        """Delete the least recently used files of the on-disk tier until it is within ``max_disk_bytes``.  Call with ``_lock`` held."""
+        while self.disk_nbytes > self.max_disk_bytes and self._files:
+            path, size = self._files.popitem(last=False)
+            self.disk_nbytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            _logger.debug(f'Evicted {path} from disk ({size} bytes)')
+
+
+    def _touch_file(self, path, size):
+        """Record a file of the on-disk tier as the most recently used.  Call with ``_lock`` held."""
+        self.disk_nbytes -= self._files.pop(path, 0)
+        self._files[path] = size
+        self.disk_nbytes += size
+
+
+    def get(self, schedule_run_id, copy=True):
+        """Look up a Schedule, checking memory first and then the on-disk tier.
+
+        :param schedule_run_id: The identifier of the optimizer run
+        :type schedule_run_id: string
+        :param copy: If False, return the Schedule held by the cache itself, which saves a copy but must then be treated as read-only
+        :type copy: bool
+        :return: The cached Schedule, or None on a miss
+        :rtype: Schedule
+        """
+        with self._lock:
+            entry = self._entries.get(schedule_run_id)
+            if entry is not None:
+                self._entries.move_to_end(schedule_run_id)
+                self.hits += 1
+                schedule = entry[0]
+        if entry is not None:
+            return _copy(schedule) if copy else schedule
+        if self.disk_dir is not None:
+            path = self._path(schedule_run_id)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                data = None
+            if data is not None:
+                schedule = objs.Schedule.FromString(data)
+                with self._lock:
+                    self._remember(schedule_run_id, schedule, len(data))
+                    self._touch_file(path, len(data))
+                    self.hits += 1
+                return _copy(schedule) if copy else schedule
+        with self._lock:
+            self.misses += 1
+        return None
+
+
+    def put(self, schedule_run_id, schedule):
+        """Store a Schedule in memory and, if configured, on disk.
+
+        :param schedule_run_id: The identifier of the optimizer run
+        :type schedule_run_id: string
+        :param schedule: The Schedule produced by that run
+        :type schedule: Schedule
+        """
+        data = schedule.SerializePartialToString()
+        with self._lock:
+            self._remember(schedule_run_id, _copy(schedule), len(data))
+        if self.disk_dir is not None and len(data) <= self.max_disk_bytes:
+            path = self._path(schedule_run_id)
+            fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+            with self._lock:
+                self._touch_file(path, len(data))
+                self._evict_files()
+
+
+    def clear(self):
+        """Drop every Schedule held in memory.  The on-disk tier is left untouched."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+class ResponseCache(object):
+    "ResponseCache remembers the validators (``ETag`` and ``Last-Modified``) and decoded body of each resource the client has read, so that later reads can be sent as conditional requests and a ``304 Not Modified`` can be answered from memory."
+
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def conditional_headers(self, url):
+        """Get the ``If-None-Match``/``If-Modified-Since`` headers to send for ``url``.
+
+        :param url: The full resource URL
+        :type url: string
+        :return: A (possibly empty) dictionary of request headers
+        :rtype: dict
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+        headers = {}
+        if entry is not None:
+            etag, last_modified, body = entry
+            if etag is not None:
+                headers['If-None-Match'] = etag
+            if last_modified is not None:
+                headers['If-Modified-Since'] = last_modified
+        return headers
+
+
+    def get(self, url):
+        """Get a copy of the body last stored for ``url``, or None."""
+        with self._lock:
+            entry = self._entries.get(url)
+        return None if entry is None else copy.deepcopy(entry[2])
+
+
+    def put(self, url, headers, body):
+        """Store ``body`` for ``url`` if the response carried a validator.
+
+        :param url: The full resource URL
+        :type url: string
+        :param headers: The response headers
+        :type headers: dict
+        :param body: The decoded response body
+        """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        with self._lock:
+            if etag is None and last_modified is None:
+                self._entries.pop(url, None)
+            else:
+                self._entries[url] = (etag, last_modified, body)
+
+
+    def invalidate(self, url=None):
+        """Forget the stored body for ``url``, or for every resource if ``url`` is None."""
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(url, None)
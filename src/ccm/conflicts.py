@@ -0,0 +1,91 @@
+import logging
+import numpy as np
+from src.ccm.frame import ScheduleFrame
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class Conflicts(object):
+    "Pairs of tasks that overlap in time on the same resource, held as columns.  ``first[i]`` and ``second[i]`` are positions into ``Schedule.tasks`` of a pair that both use ``resource[i]``, with ``first`` starting no later than ``second``, and ``overlap[i]`` is how many seconds they share."
+
+
+    def __init__(self, by, resource, first, second, overlap):
+        self.by = by
+        self.resource = resource
+        self.first = first
+        self.second = second
+        self.overlap = overlap
+
+
+    def __len__(self):
+        return len(self.first)
+
+
+    def grouped(self):
+        """The conflicting pairs of each resource.
+
+        :return: A dictionary from each ``siteId``/``noradId`` with a conflict to its ``(first, second)`` position arrays
+        :rtype: dict
+        """
+        groups = {}
+        if len(self) == 0:
+            return groups
+        order = np.argsort(self.resource, kind='stable')
+        resource = self.resource[order]
+        bounds = np.concatenate(([0], np.flatnonzero(resource[1:] != resource[:-1]) + 1, [len(resource)]))
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            groups[resource[lo]] = (self.first[order[lo:hi]], self.second[order[lo:hi]])
+        return groups
+
+
+def find_conflicts(schedule, by='siteId') -> Conflicts:
+    """Find every pair of tasks that overlap in time on the same ``siteId`` or ``noradId``.
+
+    Tasks are sorted once by (resource, start, end).  A task then conflicts with exactly the tasks that follow it in that order up to the first one of its resource starting at or after its end, which one binary search finds, so the whole sweep is O(n log n + k) for k conflicting pairs and runs in NumPy without a Python loop over tasks.  Tasks are half-open, so one ending exactly when the next begins is not a conflict.
+
+    :param schedule: The schedule to check
+    :type schedule: Schedule or ScheduleFrame
+    :param by: ``siteId`` or ``noradId``
+    :type by: string
+    :rtype: Conflicts
+    """
+    if by not in ('siteId', 'noradId'):
+        raise ValueError(f'Cannot find conflicts by {by}')
+    frame = schedule if isinstance(schedule, ScheduleFrame) else ScheduleFrame.from_schedule(schedule)
+    n = len(frame)
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return Conflicts(by, np.empty(0, dtype=object), empty, empty, empty)
+    codes = frame.codes[by].astype(np.int64)
+    order = np.lexsort((frame.end, frame.start, codes))
+    codes = codes[order]
+    start = frame.start[order]
+    end = frame.end[order]
+    base = int(min(start.min(), end.min()))
+    span = int(max(start.max(), end.max())) - base + 1
+    key = codes * span + (start - base)
+    hi = np.searchsorted(key, codes * span + (np.maximum(end, start) - base), side='left')
+    counts = np.maximum(hi - np.arange(n) - 1, 0)
+    total = int(counts.sum())
+    first = np.repeat(np.arange(n), counts)
+    second = first + 1 + (np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts))
+    overlap = np.minimum(end[first], end[second]) - start[second]
+    return Conflicts(by, frame.categories[by][codes[first]], order[first], order[second], overlap)
+
+
+def find_all_conflicts(schedule, by=('siteId', 'noradId')):
+    """Find conflicting tasks on each kind of resource.  See ``find_conflicts``.
+
+    :param schedule: The schedule to check
+    :type schedule: Schedule or ScheduleFrame
+    :param by: The resource columns to check
+    :type by: tuple
+    :return: A dictionary from each column in ``by`` to its Conflicts
+    :rtype: dict
+    """
+    frame = schedule if isinstance(schedule, ScheduleFrame) else ScheduleFrame.from_schedule(schedule)
+    return {column: find_conflicts(frame, column) for column in by}
@@ -0,0 +1,192 @@
+import base64
+import functools
+import logging
+import math
+import google.protobuf
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.internal import api_implementation, type_checkers
+from google.protobuf.json_format import MessageToDict, SerializeToJsonError
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+_INT64_TYPES = (FieldDescriptor.CPPTYPE_INT64, FieldDescriptor.CPPTYPE_UINT64)
+
+# The generated code relies on protobuf internals (``type_checkers.ToShortestFloat`` and, on the pure-python runtime, a message's
+# ``_fields`` dictionary), so it is only used with the protobuf releases it has been checked against.  Anything else goes through
+# ``MessageToDict``.
+_SUPPORTED_MAJOR_VERSIONS = (3, 4)
+
+
+def _supported(version):
+    """Whether the generated converters can be used with protobuf ``version``, e.g. ``'3.20.3'``."""
+    try:
+        major = int(version.split('.')[0])
+    except ValueError:
+        return False
+    return major in _SUPPORTED_MAJOR_VERSIONS and hasattr(type_checkers, 'ToShortestFloat')
+
+
+def _has_field_dict():
+    from src import schedule_pb2 as objs
+    return isinstance(getattr(objs.ScheduleTelemetry(), '_fields', None), dict)
+
+
+_FAST = _supported(google.protobuf.__version__)
+
+# With the pure-python protobuf runtime, reading a message's field dictionary directly is several times faster than HasField
+_DIRECT = _FAST and api_implementation.Type() == 'python' and _has_field_dict()
+
+_converters = {}
+
+
+def _special_float(value):
+    if math.isnan(value):
+        return 'NaN'
+    return '-Infinity' if value < 0 else 'Infinity'
+
+
+def _float(value):
+    if value - value == 0:
+        return type_checkers.ToShortestFloat(value)
+    return _special_float(value)
+
+
+def _enum_name(names, value):
+    name = names.get(value)
+    if name is None:
+        raise SerializeToJsonError('Enum field contains an integer value which can not mapped to an enum value.')
+    return name
+
+
+def _bytes(value):
+    return base64.b64encode(value).decode('utf-8')
+
+
+def _bool_key(key):
+    return 'true' if key else 'false'
+
+
+class _Generator(object):
+    "Writes the source of one converter function per message type reachable from a root descriptor."
+
+
+    def __init__(self, preserving_proto_field_name):
+        self.preserving_proto_field_name = preserving_proto_field_name
+        self.names = {}
+        self.namespace = {
+            '_special_float': _special_float,
+            '_float': _float,
+            '_enum_name': _enum_name,
+            '_bytes': _bytes,
+            '_bool_key': _bool_key,
+        }
+        self.sources = []
+
+
+    def function(self, descriptor):
+        if descriptor.full_name not in self.names:
+            self.names[descriptor.full_name] = f'_m{len(self.names)}'
+            self.sources.append(self._message(descriptor))
+        return self.names[descriptor.full_name]
+
+
+    def _value(self, field, var):
+        """An expression converting the value held in ``var`` like ``MessageToDict`` would."""
+        cpp_type = field.cpp_type
+        if cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+            return f'{self.function(field.message_type)}({var})'
+        if cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+            name = f'_e_{field.enum_type.full_name.replace(".", "_")}'
+            self.namespace[name] = {v.number: v.name for v in field.enum_type.values}
+            return f'_enum_name({name}, {var})'
+        if field.type == FieldDescriptor.TYPE_BYTES:
+            return f'_bytes({var})'
+        if cpp_type in _INT64_TYPES:
+            return f'str({var})'
+        if cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+            return f'({var} if {var} - {var} == 0 else _special_float({var}))'
+        if cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+            return f'_float({var})'
+        return var
+
+
+    def _message(self, descriptor):
+        lines = [f'def {self.names[descriptor.full_name]}(m):', '    d = {}']
+        if _DIRECT:
+            lines.append('    f = m._fields')
+        for field in sorted(descriptor.fields, key=lambda f: f.number):
+            key = field.name if self.preserving_proto_field_name else field.json_name
+            fd = f'_f{len(self.namespace)}'
+            self.namespace[fd] = field
+            if field.message_type is not None and field.message_type.GetOptions().map_entry:
+                key_field = field.message_type.fields_by_name['key']
+                value_field = field.message_type.fields_by_name['value']
+                if key_field.cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+                    map_key = '_bool_key(k)'
+                elif key_field.cpp_type == FieldDescriptor.CPPTYPE_STRING:
+                    map_key = 'k'
+                else:
+                    map_key = 'str(k)'
+                lines.append(f'    v = f.get({fd})' if _DIRECT else f'    v = m.{field.name}')
+                lines.append('    if v:')
+                lines.append(f'        d[{key!r}] = {{{map_key}: {self._value(value_field, "x")} for k, x in v.items()}}')
+            elif field.label == FieldDescriptor.LABEL_REPEATED:
+                value = self._value(field, 'x')
+                lines.append(f'    v = f.get({fd})' if _DIRECT else f'    v = m.{field.name}')
+                lines.append('    if v:')
+                lines.append(f'        d[{key!r}] = ' + ('list(v)' if value == 'x' else f'[{value} for x in v]'))
+            elif field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE or not _DIRECT:
+                # Singular sub-messages are created on first read, so only HasField tells whether one is really present
+                lines.append(f'    if m.HasField({field.name!r}):')
+                lines.append(f'        v = m.{field.name}')
+                lines.append(f'        d[{key!r}] = {self._value(field, "v")}')
+            else:
+                lines.append(f'    v = f.get({fd})')
+                lines.append('    if v is not None:')
+                lines.append(f'        d[{key!r}] = {self._value(field, "v")}')
+        lines.append('    return d')
+        return '\n'.join(lines)
+
+
+def _build(descriptor, preserving_proto_field_name):
+    generator = _Generator(preserving_proto_field_name)
+    generator.function(descriptor)
+    exec(compile('\n\n'.join(generator.sources), f'<converters for {descriptor.full_name}>', 'exec'), generator.namespace)
+    for full_name, name in generator.names.items():
+        _converters.setdefault((full_name, preserving_proto_field_name), generator.namespace[name])
+    return _converters[(descriptor.full_name, preserving_proto_field_name)]
+
+
+def get_converter(descriptor, preserving_proto_field_name=False):
+    """Get the converter function for a message type, generating it from the descriptor on first use.
+
+    The generated function reads each field directly and converts it with the rule ``MessageToDict`` would pick for that field's type, so none of the per-field reflection happens at conversion time.  With a protobuf release the generated code has not been checked against, this is ``MessageToDict`` itself.
+
+    :param descriptor: The message type, e.g. ``Schedule.DESCRIPTOR``
+    :type descriptor: Descriptor
+    :param preserving_proto_field_name: Use the field names of ``schedule.proto`` rather than their lowerCamelCase JSON names
+    :type preserving_proto_field_name: bool
+    :return: A function from a message of that type to a dict
+    :rtype: function
+    """
+    if not _FAST:
+        return functools.partial(MessageToDict, preserving_proto_field_name=preserving_proto_field_name)
+    converter = _converters.get((descriptor.full_name, preserving_proto_field_name))
+    if converter is None:
+        converter = _build(descriptor, preserving_proto_field_name)
+    return converter
+
+
+def message_to_dict(message, preserving_proto_field_name=False):
+    """A drop-in replacement for ``google.protobuf.json_format.MessageToDict`` (with its default options other than ``preserving_proto_field_name``) that produces the same dict using a converter generated for the message type.
+
+    :param message: Any message of ``schedule.proto``
+    :param preserving_proto_field_name: Use the field names of ``schedule.proto`` rather than their lowerCamelCase JSON names
+    :type preserving_proto_field_name: bool
+    :rtype: dict
+    """
+    return get_converter(message.DESCRIPTOR, preserving_proto_field_name)(message)
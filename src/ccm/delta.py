@@ -0,0 +1,119 @@
+import logging
+from google.protobuf.json_format import ParseDict
+from src.ccm.converters import message_to_dict
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class ScheduleDelta(object):
+    "The tasks added, removed or moved between two consecutive optimizer runs.  Applying the delta of run ``a`` to ``b`` to the Schedule of run ``a`` yields the Schedule of run ``b``."
+
+
+    def __init__(self, from_run_id, to_run_id, added=None, removed=None, moved=None, score=None):
+        """
+        :param from_run_id: The ``scheduleRunId`` the delta applies to
+        :type from_run_id: string
+        :param to_run_id: The ``scheduleRunId`` the delta produces
+        :type to_run_id: string
+        :param added: ScheduledTasks present only in the newer run
+        :type added: list
+        :param removed: The ``taskId`` of every task present only in the older run
+        :type removed: list
+        :param moved: The new version of every ScheduledTask whose times or resources changed
+        :type moved: list
+        :param score: The ``score`` of the newer run
+        :type score: float
+        """
+        self.from_run_id = from_run_id
+        self.to_run_id = to_run_id
+        self.added = added or []
+        self.removed = removed or []
+        self.moved = moved or []
+        self.score = score
+
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.moved)
+
+
+    def is_empty(self):
+        return self.from_run_id == self.to_run_id and len(self) == 0
+
+
+    def to_dict(self):
+        """Convert to the JSON representation used by the ``schedule/<id>/delta`` endpoint."""
+        return {
+            'previousRunId': self.from_run_id,
+            'scheduleRunId': self.to_run_id,
+            'added': [message_to_dict(t, preserving_proto_field_name=True) for t in self.added],
+            'removed': list(self.removed),
+            'moved': [message_to_dict(t, preserving_proto_field_name=True) for t in self.moved],
+            'score': self.score,
+        }
+
+
+    @classmethod
+    def from_dict(cls, d):
+        """Build a ScheduleDelta from its JSON representation.  Fields this client does not know are ignored, so that newer servers can add them."""
+        return cls(
+            d['previousRunId'],
+            d['scheduleRunId'],
+            added=[ParseDict(t, objs.ScheduledTask(), ignore_unknown_fields=True) for t in d.get('added', [])],
+            removed=list(d.get('removed', [])),
+            moved=[ParseDict(t, objs.ScheduledTask(), ignore_unknown_fields=True) for t in d.get('moved', [])],
+            score=d.get('score'))
+
+
+def compute_delta(old: objs.Schedule, new: objs.Schedule) -> ScheduleDelta:
+    """Compute the delta between two Schedules by joining their tasks on ``taskId``.
+
+    :param old: The Schedule of the earlier run
+    :type old: Schedule
+    :param new: The Schedule of the later run
+    :type new: Schedule
+    :return: The tasks added, removed and moved
+    :rtype: ScheduleDelta
+    """
+    before = {t.taskId: t for t in old.tasks}
+    added = []
+    moved = []
+    seen = set()
+    for task in new.tasks:
+        seen.add(task.taskId)
+        prev = before.get(task.taskId)
+        if prev is None:
+            added.append(task)
+        elif prev != task:
+            moved.append(task)
+    removed = [tid for tid in before if tid not in seen]
+    return ScheduleDelta(old.scheduleRunId, new.scheduleRunId, added, removed, moved, new.score)
+
+
+def apply_delta(schedule: objs.Schedule, delta: ScheduleDelta) -> objs.Schedule:
+    """Apply ``delta`` to a locally held Schedule.  The input is left unmodified.
+
+    :param schedule: The Schedule of run ``delta.from_run_id``
+    :type schedule: Schedule
+    :param delta: The changes to apply
+    :type delta: ScheduleDelta
+    :raises Exception: The delta does not apply to this Schedule.
+    :return: The Schedule of run ``delta.to_run_id``
+    :rtype: Schedule
+    """
+    if schedule.scheduleRunId != delta.from_run_id:
+        raise Exception(f'Delta applies to {delta.from_run_id}, not {schedule.scheduleRunId}')
+    removed = set(delta.removed)
+    moved = {t.taskId: t for t in delta.moved}
+    tasks = []
+    for task in schedule.tasks:
+        if task.taskId in removed:
+            continue
+        tasks.append(moved.get(task.taskId, task))
+    tasks.extend(delta.added)
+    score = schedule.score if delta.score is None else delta.score
+    return objs.Schedule(scheduleRunId=delta.to_run_id, tasks=tasks, score=score)
@@ -0,0 +1,94 @@
+import logging
+import numpy as np
+from src.ccm.frame import ScheduleFrame
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class ScheduleDiff(object):
+    "The changes between the Schedules of two runs, held as columns of positions into ``a.tasks`` and ``b.tasks``.  A task is identified by its ``taskId``; one that was dropped while another task took over its ``visibilityId`` is also reported as bumped."
+
+
+    def __init__(self, from_run_id, to_run_id, added, dropped, shifted_from, shifted_to, start_shift, end_shift, bumped, bumped_by):
+        """Built by ``diff_schedules``.
+
+        :param from_run_id: The ``scheduleRunId`` of ``a``
+        :param to_run_id: The ``scheduleRunId`` of ``b``
+        :param added: Positions in ``b`` of tasks not in ``a``
+        :param dropped: Positions in ``a`` of tasks not in ``b``
+        :param shifted_from: Positions in ``a`` of tasks whose ``start`` or ``end`` changed
+        :param shifted_to: Positions in ``b`` of the same tasks
+        :param start_shift: How many seconds each shifted task's ``start`` moved
+        :param end_shift: How many seconds each shifted task's ``end`` moved
+        :param bumped: Positions in ``a`` of dropped tasks whose visibility went to another task
+        :param bumped_by: Positions in ``b`` of the task that took each bumped task's visibility
+        """
+        self.from_run_id = from_run_id
+        self.to_run_id = to_run_id
+        self.added = added
+        self.dropped = dropped
+        self.shifted_from = shifted_from
+        self.shifted_to = shifted_to
+        self.start_shift = start_shift
+        self.end_shift = end_shift
+        self.bumped = bumped
+        self.bumped_by = bumped_by
+
+
+    def __len__(self):
+        return len(self.added) + len(self.dropped) + len(self.shifted_from)
+
+
+    def summary(self):
+        """Count each kind of change.
+
+        :rtype: dict
+        """
+        return {
+            'added': len(self.added),
+            'dropped': len(self.dropped),
+            'shifted': len(self.shifted_from),
+            'bumped': len(self.bumped)
+        }
+
+
+def _ids(frame, name):
+    return frame.categories[name][frame.codes[name]]
+
+
+def diff_schedules(a, b) -> ScheduleDiff:
+    """Compare the Schedules of two runs, e.g. before and after ``set_profile`` or ``create_exact_request``.
+
+    The tasks of ``a`` are hashed by ``taskId`` and those of ``b`` looked up against them, and dropped tasks are then looked up by ``visibilityId`` among the tasks of ``b``, so the diff runs in linear time.
+
+    :param a: The Schedule of the earlier run
+    :type a: Schedule or ScheduleFrame
+    :param b: The Schedule of the later run
+    :type b: Schedule or ScheduleFrame
+    :rtype: ScheduleDiff
+    """
+    fa = a if isinstance(a, ScheduleFrame) else ScheduleFrame.from_schedule(a)
+    fb = b if isinstance(b, ScheduleFrame) else ScheduleFrame.from_schedule(b)
+    lookup = {tid: i for i, tid in enumerate(_ids(fa, 'taskId'))}
+    match = np.fromiter((lookup.get(tid, -1) for tid in _ids(fb, 'taskId')), dtype=np.int64, count=len(fb))
+    kept = match >= 0
+    added = np.flatnonzero(~kept)
+    matched = np.zeros(len(fa), dtype=bool)
+    matched[match[kept]] = True
+    dropped = np.flatnonzero(~matched)
+    to = np.flatnonzero(kept)
+    frm = match[to]
+    start_shift = fb.start[to] - fa.start[frm]
+    end_shift = fb.end[to] - fa.end[frm]
+    shifted = (start_shift != 0) | (end_shift != 0)
+    holders = {}
+    for i, vid in enumerate(_ids(fb, 'visibilityId')):
+        holders.setdefault(vid, i)
+    taken = np.fromiter((holders.get(vid, -1) for vid in _ids(fa, 'visibilityId')[dropped]), dtype=np.int64, count=len(dropped))
+    bumped = taken >= 0
+    return ScheduleDiff(fa.schedule_run_id, fb.schedule_run_id, added, dropped, frm[shifted], to[shifted],
+                        start_shift[shifted], end_shift[shifted], dropped[bumped], taken[bumped])
@@ -0,0 +1,308 @@
+import itertools
+import logging
+import os
+from google.protobuf.descriptor import FieldDescriptor
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_ROWS = 65536
+
+FORMATS = {'ipc': '.arrow', 'parquet': '.parquet'}
+
+# The tables that can be exported, and the message type of one row of each
+TABLES = {
+    'tasks': objs.ScheduledTask,
+    'visibilities': objs.Visibility,
+    'groundStations': objs.GroundStationTelemetry,
+    'spacecrafts': objs.SpacecraftTelemetry,
+    'users': objs.UserTelemetry,
+}
+
+TELEMETRY_TABLES = ('groundStations', 'spacecrafts', 'users')
+
+_ARROW_TYPES = {
+    FieldDescriptor.TYPE_DOUBLE: 'float64',
+    FieldDescriptor.TYPE_FLOAT: 'float32',
+    FieldDescriptor.TYPE_INT64: 'int64',
+    FieldDescriptor.TYPE_SINT64: 'int64',
+    FieldDescriptor.TYPE_SFIXED64: 'int64',
+    FieldDescriptor.TYPE_UINT64: 'uint64',
+    FieldDescriptor.TYPE_FIXED64: 'uint64',
+    FieldDescriptor.TYPE_INT32: 'int32',
+    FieldDescriptor.TYPE_SINT32: 'int32',
+    FieldDescriptor.TYPE_SFIXED32: 'int32',
+    FieldDescriptor.TYPE_UINT32: 'uint32',
+    FieldDescriptor.TYPE_FIXED32: 'uint32',
+    FieldDescriptor.TYPE_BOOL: 'bool_',
+    FieldDescriptor.TYPE_STRING: 'string',
+    FieldDescriptor.TYPE_BYTES: 'binary',
+    FieldDescriptor.TYPE_ENUM: 'string',
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise Exception('Exporting to Arrow IPC or Parquet requires pyarrow.  Install it with `pip install ccm-client[arrow]`.')
+    return pyarrow
+
+
+def _is_map(field):
+    return field.message_type is not None and field.message_type.GetOptions().map_entry
+
+
+def _element(field):
+    """A function converting one element of ``field`` to the value Arrow expects: a dict for a message, the name for an enum, the value itself otherwise."""
+    if field.type == FieldDescriptor.TYPE_MESSAGE:
+        getters = [(f.name, _getter(f)) for f in field.message_type.fields]
+        return lambda m: {name: get(m) for name, get in getters}
+    if field.type == FieldDescriptor.TYPE_ENUM:
+        names = {v.number: v.name for v in field.enum_type.values}
+        return names.get
+    return None
+
+
+def _getter(field):
+    """A function reading ``field`` from a message as a Python value Arrow can build a column from."""
+    name = field.name
+    if _is_map(field):
+        value = _element(field.message_type.fields_by_name['value'])
+        if value is None:
+            return lambda m: list(getattr(m, name).items())
+        return lambda m: [(k, value(v)) for k, v in getattr(m, name).items()]
+    element = _element(field)
+    if field.label == FieldDescriptor.LABEL_REPEATED:
+        if element is None:
+            return lambda m: list(getattr(m, name))
+        return lambda m: [element(x) for x in getattr(m, name)]
+    if field.type == FieldDescriptor.TYPE_MESSAGE or field.label == FieldDescriptor.LABEL_OPTIONAL:
+        # Unset optional fields and sub-messages become nulls rather than their defaults
+        convert = element or (lambda v: v)
+        return lambda m: convert(getattr(m, name)) if m.HasField(name) else None
+    if element is None:
+        return lambda m: getattr(m, name)
+    return lambda m: element(getattr(m, name))
+
+
+def _arrow_type(pa, field):
+    if _is_map(field):
+        fields = field.message_type.fields_by_name
+        return pa.map_(_element_type(pa, fields['key']), _element_type(pa, fields['value']))
+    element = _element_type(pa, field)
+    if field.label == FieldDescriptor.LABEL_REPEATED:
+        return pa.list_(element)
+    return element
+
+
+def _element_type(pa, field):
+    if field.type == FieldDescriptor.TYPE_MESSAGE:
+        return pa.struct([_arrow_field(pa, f) for f in field.message_type.fields])
+    return getattr(pa, _ARROW_TYPES[field.type])()
+
+
+def _arrow_field(pa, field):
+    return pa.field(field.name, _arrow_type(pa, field), nullable=field.label != FieldDescriptor.LABEL_REQUIRED)
+
+
+def schema(message_cls, with_schedule_run_id=False):
+    """The Arrow schema of a table with one row per message.  Scalar fields become primitive columns (enums as their names), repeated fields become lists, maps become Arrow maps, and sub-messages become structs.
+
+    :param message_cls: The message type of one row, e.g. ``ScheduledTask``
+    :param with_schedule_run_id: Start with a ``scheduleRunId`` column, so rows of many runs can share one table
+    :type with_schedule_run_id: bool
+    :rtype: pyarrow.Schema
+    """
+    pa = _require_pyarrow()
+    fields = [_arrow_field(pa, f) for f in message_cls.DESCRIPTOR.fields]
+    if with_schedule_run_id:
+        fields.insert(0, pa.field('scheduleRunId', pa.string(), nullable=False))
+    return pa.schema(fields)
+
+
+def column_batches(messages, message_cls, batch_size=DEFAULT_BATCH_ROWS):
+    """Turn messages into columns, ``batch_size`` rows at a time.  ``messages`` is consumed lazily, so it may be a generator over a payload far larger than memory, e.g. the visibilities yielded by ``src.ccm.stream.MessageStream``.
+
+    :param messages: The messages, one per row
+    :param message_cls: Their message type
+    :param batch_size: The most rows per batch
+    :type batch_size: int
+    :return: Yields a dict from field name to a list of column values for each batch
+    :rtype: generator
+    """
+    getters = [(f.name, _getter(f)) for f in message_cls.DESCRIPTOR.fields]
+    messages = iter(messages)
+    while True:
+        batch = list(itertools.islice(messages, batch_size))
+        if not batch:
+            return
+        yield {name: [get(m) for m in batch] for name, get in getters}
+
+
+def record_batches(messages, message_cls, batch_size=DEFAULT_BATCH_ROWS, schedule_run_id=None):
+    """Like ``column_batches``, but yields Arrow RecordBatches of ``schema(message_cls)``.
+
+    :param schedule_run_id: If given, a ``scheduleRunId`` column holding it is added to every batch
+    :type schedule_run_id: string
+    :rtype: generator
+    """
+    pa = _require_pyarrow()
+    batch_schema = schema(message_cls, with_schedule_run_id=schedule_run_id is not None)
+    for columns in column_batches(messages, message_cls, batch_size):
+        n = len(next(iter(columns.values())))
+        if schedule_run_id is not None:
+            columns = dict(scheduleRunId=[schedule_run_id] * n, **columns)
+        arrays = [pa.array(columns[f.name], type=f.type) for f in batch_schema]
+        yield pa.RecordBatch.from_arrays(arrays, schema=batch_schema)
+
+
+def _format_of(path, format):
+    if format is None:
+        format = 'parquet' if str(path).endswith('.parquet') else 'ipc'
+    if format not in FORMATS:
+        raise Exception(f'Unknown export format {format}.  Use one of: {", ".join(FORMATS)}')
+    return format
+
+
+class TableWriter(object):
+    "Streams messages into one Arrow IPC file or Parquet file, a batch at a time, so only ``batch_size`` rows are ever held in memory.  Many calls to ``write`` append to the same table, e.g. the tasks of every schedule run in a day."
+
+
+    def __init__(self, path, message_cls, format=None, batch_size=DEFAULT_BATCH_ROWS, with_schedule_run_id=False, compression=None):
+        """
+        :param path: The file to write
+        :type path: string
+        :param message_cls: The message type of one row, e.g. ``ScheduledTask``
+        :param format: 'ipc' for the Arrow IPC file format, which other processes can memory-map and read without copying, or 'parquet'.  Defaults to 'parquet' for paths ending in .parquet and 'ipc' otherwise.
+        :type format: string
+        :param batch_size: The most rows per record batch (and Parquet row group)
+        :type batch_size: int
+        :param with_schedule_run_id: Add a ``scheduleRunId`` column.  ``write`` must then be given the run id of its messages.
+        :type with_schedule_run_id: bool
+        :param compression: The Parquet compression codec, or the IPC buffer compression ('lz4' or 'zstd').  Defaults to snappy for Parquet and none for IPC.
+        :type compression: string
+        """
+        pa = _require_pyarrow()
+        self.path = path
+        self.message_cls = message_cls
+        self.format = _format_of(path, format)
+        self.batch_size = batch_size
+        self.with_schedule_run_id = with_schedule_run_id
+        self.schema = schema(message_cls, with_schedule_run_id)
+        self.rows = 0
+        if self.format == 'parquet':
+            self._writer = pa.parquet.ParquetWriter(path, self.schema, compression=compression or 'snappy')
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            self._writer = pa.ipc.new_file(path, self.schema, options=options)
+
+
+    def write(self, messages, schedule_run_id=None):
+        """Append messages to the table.
+
+        :param messages: Any iterable of ``message_cls``
+        :param schedule_run_id: The run the messages belong to, if the table has a ``scheduleRunId`` column
+        :type schedule_run_id: string
+        :return: The number of rows written
+        :rtype: int
+        """
+        if self.with_schedule_run_id and schedule_run_id is None:
+            raise Exception(f'{self.path} has a scheduleRunId column, so a schedule_run_id is required')
+        rows = 0
+        for batch in record_batches(messages, self.message_cls, self.batch_size,
+                                    schedule_run_id if self.with_schedule_run_id else None):
+            if self.format == 'parquet':
+                self._writer.write_batch(batch, row_group_size=self.batch_size)
+            else:
+                self._writer.write_batch(batch)
+            rows += batch.num_rows
+        self.rows += rows
+        return rows
+
+
+    def close(self):
+        self._writer.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def export_schedule(schedule: objs.Schedule, path, format=None, batch_size=DEFAULT_BATCH_ROWS):
+    """Write the tasks of a Schedule to a file, with its ``scheduleRunId`` on every row.
+
+    :param schedule: The Schedule to export
+    :type schedule: Schedule
+    :param path: The file to write
+    :type path: string
+    :param format: 'ipc' or 'parquet'.  See ``TableWriter``.
+    :type format: string
+    :return: The number of rows written
+    :rtype: int
+    """
+    with TableWriter(path, objs.ScheduledTask, format, batch_size, with_schedule_run_id=True) as writer:
+        return writer.write(schedule.tasks, schedule.scheduleRunId)
+
+
+def export_visibilities(visibilities, path, format=None, batch_size=DEFAULT_BATCH_ROWS):
+    """Write Visibilities to a file.  To export the visibilities of a ScheduleRequest too large to parse whole, pass ``(v for _, v in MessageStream(f, ScheduleRequest, fields=['visibilities']))``.
+
+    :param visibilities: Any iterable of Visibility
+    :param path: The file to write
+    :type path: string
+    :param format: 'ipc' or 'parquet'.  See ``TableWriter``.
+    :type format: string
+    :return: The number of rows written
+    :rtype: int
+    """
+    with TableWriter(path, objs.Visibility, format, batch_size) as writer:
+        return writer.write(visibilities)
+
+
+def export_telemetry(telemetry: objs.ScheduleTelemetry, directory, format='ipc', batch_size=DEFAULT_BATCH_ROWS):
+    """Write the groundStations, spacecrafts and users of a ScheduleTelemetry to one file each in ``directory``, with its ``scheduleRunId`` on every row.
+
+    :param telemetry: The telemetry of a schedule run
+    :type telemetry: ScheduleTelemetry
+    :param directory: Where to write the files, named after the table and the format, e.g. ``users.parquet``
+    :type directory: string
+    :param format: 'ipc' or 'parquet'.  See ``TableWriter``.
+    :type format: string
+    :return: The path written for each table
+    :rtype: dict
+    """
+    format = _format_of(directory, format)
+    paths = {}
+    for table in TELEMETRY_TABLES:
+        path = os.path.join(directory, table + FORMATS[format])
+        with TableWriter(path, TABLES[table], format, batch_size, with_schedule_run_id=True) as writer:
+            writer.write(getattr(telemetry, table), telemetry.scheduleRunId)
+        paths[table] = path
+    return paths
+
+
+def read_table(path, format=None):
+    """Read an exported table.  Arrow IPC files are memory-mapped, so the columns are read without copying and only the pages touched are loaded.
+
+    :param path: The file to read
+    :type path: string
+    :param format: 'ipc' or 'parquet'.  Defaults to the format suggested by the file name.
+    :type format: string
+    :rtype: pyarrow.Table
+    """
+    pa = _require_pyarrow()
+    if _format_of(path, format) == 'parquet':
+        return pa.parquet.read_table(path, memory_map=True)
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
@@ -0,0 +1,141 @@
+import logging
+import numpy as np
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class VisibilityWindows(object):
+    "An index of Visibility windows per (``noradId``, ``siteId``) pair, used to check Exact Requests locally before submitting them.  The windows of each pair are sorted by start, alongside the running maximum of their ends, so whether a request fits inside any window is answered with one binary search."
+
+
+    def __init__(self, visibilities=()):
+        """
+        :param visibilities: The Visibility objects to index, e.g. ``ConstellationState.visibilities``
+        :type visibilities: iterable
+        """
+        pairs = {}
+        self.visibilities = {}
+        for v in visibilities:
+            starts, ends = pairs.setdefault((v.noradId, v.siteId), ([], []))
+            starts.append(v.startTimestamp)
+            ends.append(v.endTimestamp)
+            self.visibilities[v.visibilityId] = (v.noradId, v.siteId, v.startTimestamp, v.endTimestamp)
+        self._store = None
+        self.windows = {}
+        for pair, (starts, ends) in pairs.items():
+            self._add(pair, np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64))
+
+
+    @classmethod
+    def from_store(cls, store):
+        """Index every window of a ``VisibilityStore``.  The store is already sorted by (``noradId``, ``siteId``, ``startTimestamp``), so each pair is one contiguous run of rows.
+
+        :param store: The store to index
+        :type store: VisibilityStore
+        :rtype: VisibilityWindows
+        """
+        windows = cls()
+        # Windows are looked up by visibilityId only for requests that name one, so the ids are read from the store on first use
+        windows._store = store
+        norad = np.asarray(store.norad)
+        site = np.asarray(store.site)
+        if len(norad) == 0:
+            return windows
+        change = np.flatnonzero((norad[1:] != norad[:-1]) | (site[1:] != site[:-1])) + 1
+        bounds = np.concatenate(([0], change, [len(norad)]))
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            pair = (store.norad_ids[norad[lo]], store.site_ids[site[lo]])
+            windows._add(pair, np.asarray(store.start[lo:hi]), np.asarray(store.end[lo:hi]))
+        return windows
+
+
+    def _add(self, pair, start, end):
+        order = np.argsort(start, kind='stable')
+        start = start[order]
+        end = end[order]
+        self.windows[pair] = (start, end, np.maximum.accumulate(end))
+
+
+    def _visibility(self, visibility_id):
+        """The ``(noradId, siteId, startTimestamp, endTimestamp)`` of one indexed Visibility, or None if it is not indexed."""
+        if self._store is not None and visibility_id not in self.visibilities:
+            store = self._store
+            for row in range(len(store)):
+                self.visibilities[store.visibility_id(row)] = (store.norad_ids[store.norad[row]], store.site_ids[store.site[row]],
+                                                               int(store.start[row]), int(store.end[row]))
+            self._store = None
+        return self.visibilities.get(visibility_id)
+
+
+    def check(self, norad_id, site_id, start_timestamp, end_timestamp=None, min_duration=0, visibility_id=None):
+        """Check whether an Exact Request fits inside a Visibility window of its spacecraft and ground site.
+
+        The request needs ``[start_timestamp, end_timestamp]`` to lie inside one window, and to last at least ``min_duration`` seconds.  Without an ``end_timestamp`` it needs ``min_duration`` seconds from ``start_timestamp``.  With a ``visibility_id`` only that window counts, and it must belong to the same spacecraft and ground site.
+
+        :param norad_id: The NORAD ID of the Spacecraft
+        :type norad_id: string
+        :param site_id: The Ground Site ID
+        :type site_id: string
+        :param start_timestamp: Posix timestamp for the start of the Exact Request
+        :type start_timestamp: int
+        :param end_timestamp: Optional posix timestamp for the end of the Exact Request
+        :type end_timestamp: int
+        :param min_duration: The minimum length of the contact, in seconds
+        :type min_duration: int
+        :param visibility_id: Optional ``visibilityId`` of the one window the request must fit in
+        :type visibility_id: string
+        :return: Whether the request is feasible, and if not the nearest feasible ``(start, end)`` window of the same length (None if there is none)
+        :rtype: tuple
+        """
+        min_duration = min_duration or 0
+        length = max((end_timestamp if end_timestamp is not None else start_timestamp) - start_timestamp, min_duration)
+        if visibility_id:
+            visibility = self._visibility(visibility_id)
+            if visibility is None or visibility[:2] != (norad_id, site_id):
+                return False, None
+            start = np.array([visibility[2]], dtype=np.int64)
+            end = np.array([visibility[3]], dtype=np.int64)
+            max_end = end
+        elif (norad_id, site_id) in self.windows:
+            start, end, max_end = self.windows[(norad_id, site_id)]
+        else:
+            return False, None
+        i = int(np.searchsorted(start, start_timestamp, side='right'))
+        if i > 0 and max_end[i - 1] >= start_timestamp + length:
+            if end_timestamp is None or end_timestamp - start_timestamp >= min_duration:
+                return True, None
+        fits = (end - start) >= length
+        if not fits.any():
+            return False, None
+        candidates = np.clip(start_timestamp, start[fits], end[fits] - length)
+        best = int(candidates[np.argmin(np.abs(candidates - start_timestamp))])
+        return False, (best, best + length)
+
+
+    def check_request(self, request: objs.ExactRequest):
+        """Check an ExactRequest, against only the window of its ``visibilityId`` if it has one.  See ``check``.
+
+        :rtype: tuple
+        """
+        end = request.endTimestamp if request.HasField('endTimestamp') else None
+        visibility_id = request.visibilityId if request.HasField('visibilityId') else None
+        return self.check(request.noradId, request.siteId, request.startTimestamp, end, request.minDuration, visibility_id)
+
+
+def infeasible_response(suggestion):
+    """The response returned in place of submitting an Exact Request that failed the local check."""
+    response = {
+        'success': False,
+        'msg': 'Not available'
+    }
+    if suggestion is not None:
+        response['suggestion'] = {
+            'startTimestamp': suggestion[0],
+            'endTimestamp': suggestion[1]
+        }
+    return response
@@ -0,0 +1,227 @@
+import logging
+import numpy as np
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+CATEGORICAL_COLUMNS = ('taskId', 'userId', 'siteId', 'noradId', 'visibilityId')
+NUMERIC_COLUMNS = ('start', 'end', 'added_at_tier', 'from_exact_request')
+
+
+def encode_categories(values):
+    """Dictionary-encode a sequence of strings.
+
+    :param values: The values to encode
+    :type values: list
+    :return: The integer ``codes`` (one per value) and the distinct ``categories`` in first-seen order
+    :rtype: tuple
+    """
+    lookup = {}
+    codes = np.fromiter((lookup.setdefault(v, len(lookup)) for v in values), dtype=np.int32, count=len(values))
+    categories = np.empty(len(lookup), dtype=object)
+    categories[:] = list(lookup)
+    return codes, categories
+
+
+class ScheduleFrame(object):
+    "A columnar view over ``Schedule.tasks``.  The time and tier fields are held as NumPy arrays, and the identifier fields (``taskId``, ``userId``, ``siteId``, ``noradId`` and ``visibilityId``) are dictionary-encoded as integer ``codes`` into per-column ``categories``, so filters and group-bys run as vectorized array operations instead of loops over ScheduledTask objects."
+
+
+    def __init__(self, start, end, added_at_tier, from_exact_request, codes, categories, schedule_run_id='', score=0.0, has_exact_request=None):
+        """Most callers should use ``ScheduleFrame.from_schedule``.
+
+        :param start: Task start timestamps
+        :type start: numpy.ndarray
+        :param end: Task end timestamps
+        :type end: numpy.ndarray
+        :param added_at_tier: The tier at which each task was added
+        :type added_at_tier: numpy.ndarray
+        :param from_exact_request: True for tasks created by an Exact Request
+        :type from_exact_request: numpy.ndarray
+        :param codes: Integer codes for each of ``CATEGORICAL_COLUMNS``
+        :type codes: dict
+        :param categories: The distinct values each code refers to, for each of ``CATEGORICAL_COLUMNS``
+        :type categories: dict
+        :param schedule_run_id: The ``scheduleRunId`` of the source Schedule
+        :type schedule_run_id: string
+        :param score: The ``score`` of the source Schedule
+        :type score: float
+        :param has_exact_request: Which tasks set ``from_exact_request`` at all.  Defaults to those where it is True.
+        :type has_exact_request: numpy.ndarray
+        """
+        self.start = start
+        self.end = end
+        self.added_at_tier = added_at_tier
+        self.from_exact_request = from_exact_request
+        self.codes = codes
+        self.categories = categories
+        self.schedule_run_id = schedule_run_id
+        self.score = score
+        if has_exact_request is None:
+            has_exact_request = from_exact_request.copy()
+        self._has_exact_request = has_exact_request
+
+
+    @classmethod
+    def from_schedule(cls, schedule: objs.Schedule):
+        """Build a ScheduleFrame from a Schedule in a single pass over its tasks.
+
+        :param schedule: The Schedule to view
+        :type schedule: Schedule
+        :rtype: ScheduleFrame
+        """
+        tasks = schedule.tasks
+        n = len(tasks)
+        start = np.fromiter((t.start for t in tasks), dtype=np.int64, count=n)
+        end = np.fromiter((t.end for t in tasks), dtype=np.int64, count=n)
+        added_at_tier = np.fromiter((t.added_at_tier for t in tasks), dtype=np.int64, count=n)
+        from_exact_request = np.fromiter((t.from_exact_request for t in tasks), dtype=bool, count=n)
+        has_exact_request = np.fromiter((t.HasField('from_exact_request') for t in tasks), dtype=bool, count=n)
+        codes = {}
+        categories = {}
+        for name in CATEGORICAL_COLUMNS:
+            codes[name], categories[name] = encode_categories([getattr(t, name) for t in tasks])
+        return cls(start, end, added_at_tier, from_exact_request, codes, categories,
+                   schedule_run_id=schedule.scheduleRunId, score=schedule.score,
+                   has_exact_request=has_exact_request)
+
+
+    def __len__(self):
+        return len(self.start)
+
+
+    @property
+    def duration(self):
+        """The length of every task, in seconds."""
+        return self.end - self.start
+
+
+    def column(self, name):
+        """Get a column by name, decoding categorical columns back to their string values.
+
+        :param name: One of ``CATEGORICAL_COLUMNS`` or ``NUMERIC_COLUMNS``
+        :type name: string
+        :rtype: numpy.ndarray
+        """
+        if name in self.codes:
+            return self.categories[name][self.codes[name]]
+        if name in NUMERIC_COLUMNS:
+            return getattr(self, name)
+        raise KeyError(name)
+
+
+    def code(self, name, value):
+        """Get the integer code of ``value`` in categorical column ``name``, or -1 if it does not occur."""
+        hits = np.flatnonzero(self.categories[name] == value)
+        return int(hits[0]) if len(hits) else -1
+
+
+    def mask(self, **conditions):
+        """Build a boolean mask selecting the tasks whose categorical columns equal (or, given a list, are one of) the given values.
+
+        For example ``frame.mask(siteId='site-a', noradId=['55555', '44444'])``.
+
+        :rtype: numpy.ndarray
+        """
+        selected = np.ones(len(self), dtype=bool)
+        for name, value in conditions.items():
+            categories = self.categories[name]
+            if isinstance(value, (list, tuple, set, np.ndarray)):
+                wanted = np.flatnonzero(np.isin(categories, list(value)))
+            else:
+                wanted = np.flatnonzero(categories == value)
+            selected &= np.isin(self.codes[name], wanted)
+        return selected
+
+
+    def take(self, indices):
+        """Select tasks by position.  The result shares this frame's categories.
+
+        :param indices: Positions to select
+        :type indices: numpy.ndarray
+        :rtype: ScheduleFrame
+        """
+        return ScheduleFrame(
+            self.start[indices],
+            self.end[indices],
+            self.added_at_tier[indices],
+            self.from_exact_request[indices],
+            {name: c[indices] for name, c in self.codes.items()},
+            self.categories,
+            schedule_run_id=self.schedule_run_id,
+            score=self.score,
+            has_exact_request=self._has_exact_request[indices])
+
+
+    def filter(self, mask=None, **conditions):
+        """Select the tasks where ``mask`` is True and which satisfy ``conditions`` (see ``mask``).
+
+        :param mask: Optional boolean mask, e.g. ``frame.duration > 300``
+        :type mask: numpy.ndarray
+        :rtype: ScheduleFrame
+        """
+        if conditions:
+            cond = self.mask(**conditions)
+            mask = cond if mask is None else (mask & cond)
+        if mask is None:
+            return self
+        return self.take(np.flatnonzero(mask))
+
+
+    def group_indices(self, name):
+        """Group task positions by the categorical column ``name``.
+
+        :param name: One of ``CATEGORICAL_COLUMNS``
+        :type name: string
+        :return: ``order``, the task positions sorted by group, and ``bounds``, where group ``i`` (``categories[name][i]``) occupies ``order[bounds[i]:bounds[i + 1]]``
+        :rtype: tuple
+        """
+        codes = self.codes[name]
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes, minlength=len(self.categories[name]))
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        return order, bounds
+
+
+    def groupby(self, name):
+        """Split the frame into one ScheduleFrame per value of categorical column ``name``, e.g. per ``siteId`` or ``noradId``.
+
+        :param name: One of ``CATEGORICAL_COLUMNS``
+        :type name: string
+        :return: A dictionary from each value to its frame
+        :rtype: dict
+        """
+        order, bounds = self.group_indices(name)
+        groups = {}
+        for i, value in enumerate(self.categories[name]):
+            if bounds[i + 1] > bounds[i]:
+                groups[value] = self.take(order[bounds[i]:bounds[i + 1]])
+        return groups
+
+
+    def to_schedule(self) -> objs.Schedule:
+        """Convert back to a Schedule.
+
+        :rtype: Schedule
+        """
+        schedule = objs.Schedule(scheduleRunId=self.schedule_run_id, score=self.score)
+        columns = [self.column(name).tolist() for name in CATEGORICAL_COLUMNS]
+        rows = zip(*columns, self.start.tolist(), self.end.tolist(), self.added_at_tier.tolist(),
+                   self.from_exact_request.tolist(), self._has_exact_request.tolist())
+        for task_id, user_id, site_id, norad_id, visibility_id, start, end, tier, exact, has_exact in rows:
+            task = schedule.tasks.add(
+                taskId=task_id,
+                userId=user_id,
+                start=start,
+                end=end,
+                visibilityId=visibility_id,
+                noradId=norad_id,
+                siteId=site_id,
+                added_at_tier=tier)
+            if has_exact:
+                task.from_exact_request = exact
+        return schedule
@@ -0,0 +1,170 @@
+import logging
+import numpy as np
+from src import schedule_pb2 as objs
+from src.ccm.frame import ScheduleFrame
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+_INF = np.iinfo(np.int64).max
+_NEG_INF = np.iinfo(np.int64).min
+
+
+class IntervalIndex(object):
+    "A static interval index over half-open ``[start, end)`` intervals.  Intervals are sorted by start and laid out as an implicit binary tree in which every node also records the latest end in its subtree.  A query walks the tree one level at a time with vectorized NumPy operations, pruning subtrees that end too early or start too late.  Reporting k intervals visits O(k log n) nodes in the worst case, and up to O(n) when many intervals that start after the window end after its start as well, since the latest end of a subtree cannot rule those out.  The Python overhead is one vectorized step per tree level either way."
+
+
+    def __init__(self, start, end):
+        """
+        :param start: Interval start times
+        :type start: numpy.ndarray
+        :param end: Interval end times
+        :type end: numpy.ndarray
+        """
+        n = len(start)
+        self.order = np.argsort(start, kind='stable')
+        levels = max(int(n).bit_length(), 1)
+        size = (1 << levels) - 1
+        self.levels = levels - 1
+        self.start = np.full(size, _INF, dtype=np.int64)
+        self.end = np.full(size, _NEG_INF, dtype=np.int64)
+        self.start[:n] = np.asarray(start, dtype=np.int64)[self.order]
+        self.end[:n] = np.asarray(end, dtype=np.int64)[self.order]
+        self.max_end = self.end.copy()
+        for level in range(1, self.levels + 1):
+            step = 1 << (level - 1)
+            nodes = np.arange((1 << level) - 1, size, 1 << (level + 1))
+            self.max_end[nodes] = np.maximum(self.max_end[nodes], np.maximum(self.max_end[nodes - step], self.max_end[nodes + step]))
+
+
+    def __len__(self):
+        return len(self.order)
+
+
+    def overlapping(self, lo, hi):
+        """Find the intervals that overlap ``[lo, hi)``, i.e. those with ``start < hi`` and ``end > lo``.
+
+        :param lo: Start of the query window
+        :type lo: int
+        :param hi: End of the query window
+        :type hi: int
+        :return: Positions (into the arrays given at construction) of the matching intervals, in ascending order
+        :rtype: numpy.ndarray
+        """
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64)
+        found = []
+        frontier = np.array([(1 << self.levels) - 1])
+        for level in range(self.levels, -1, -1):
+            frontier = frontier[self.max_end[frontier] > lo]
+            if len(frontier) == 0:
+                break
+            starts = self.start[frontier]
+            found.append(frontier[(starts < hi) & (self.end[frontier] > lo)])
+            if level == 0:
+                break
+            step = 1 << (level - 1)
+            frontier = np.concatenate((frontier - step, frontier[starts < hi] + step))
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(self.order[np.concatenate(found)])
+
+
+    def at(self, t):
+        """Find the intervals that contain the instant ``t``, i.e. those with ``start <= t < end``.
+
+        :param t: A timestamp
+        :type t: int
+        :return: Positions of the matching intervals, in ascending order
+        :rtype: numpy.ndarray
+        """
+        return self.overlapping(t, t + 1)
+
+
+class ScheduleIndex(object):
+    "An interval index over the tasks of one Schedule, built once and optionally partitioned by ``siteId`` or ``noradId``, for answering \"what is on site-a at time t\" and \"which tasks overlap this window\" without scanning ``Schedule.tasks``."
+
+
+    def __init__(self, schedule: objs.Schedule, by=None, frame=None):
+        """
+        :param schedule: The Schedule to index
+        :type schedule: Schedule
+        :param by: Optional ``siteId`` or ``noradId`` to build one index per value of that column
+        :type by: string
+        :param frame: Optional ScheduleFrame of ``schedule``, if one has already been built
+        :type frame: ScheduleFrame
+        """
+        if by not in (None, 'siteId', 'noradId'):
+            raise ValueError(f'Cannot index by {by}')
+        self.schedule = schedule
+        self.by = by
+        self.frame = ScheduleFrame.from_schedule(schedule) if frame is None else frame
+        self._indexes = {}
+        if by is None:
+            self._indexes[None] = (np.arange(len(self.frame)), IntervalIndex(self.frame.start, self.frame.end))
+        else:
+            order, bounds = self.frame.group_indices(by)
+            for i, key in enumerate(self.frame.categories[by]):
+                positions = order[bounds[i]:bounds[i + 1]]
+                self._indexes[key] = (positions, IntervalIndex(self.frame.start[positions], self.frame.end[positions]))
+
+
+    def keys(self):
+        """The ``siteId`` or ``noradId`` values indexed, if built with ``by``."""
+        return [k for k in self._indexes if k is not None]
+
+
+    def _query(self, key, lo, hi):
+        if self.by is not None and key is None:
+            return np.sort(np.concatenate([self._query(k, lo, hi) for k in self.keys()] or [np.empty(0, dtype=np.int64)]))
+        if key not in self._indexes:
+            return np.empty(0, dtype=np.int64)
+        positions, index = self._indexes[key]
+        return positions[index.overlapping(lo, hi)]
+
+
+    def overlapping(self, lo, hi, key=None):
+        """Find the tasks that overlap the window ``[lo, hi)``.
+
+        :param lo: Start of the window (posix timestamp)
+        :type lo: int
+        :param hi: End of the window (posix timestamp)
+        :type hi: int
+        :param key: Restrict to one ``siteId``/``noradId`` (requires ``by``)
+        :type key: string
+        :return: Positions into ``schedule.tasks``, in ascending order
+        :rtype: numpy.ndarray
+        """
+        return self._query(key, lo, hi)
+
+
+    def at(self, t, key=None):
+        """Find the tasks in progress at the instant ``t``.
+
+        :param t: A posix timestamp
+        :type t: int
+        :param key: Restrict to one ``siteId``/``noradId`` (requires ``by``)
+        :type key: string
+        :return: Positions into ``schedule.tasks``, in ascending order
+        :rtype: numpy.ndarray
+        """
+        return self._query(key, t, t + 1)
+
+
+    def tasks_overlapping(self, lo, hi, key=None):
+        """Like ``overlapping`` but returns the ScheduledTask objects.
+
+        :rtype: list
+        """
+        return [self.schedule.tasks[i] for i in self.overlapping(lo, hi, key)]
+
+
+    def tasks_at(self, t, key=None):
+        """Like ``at`` but returns the ScheduledTask objects.
+
+        :rtype: list
+        """
+        return [self.schedule.tasks[i] for i in self.at(t, key)]
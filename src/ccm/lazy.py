@@ -0,0 +1,50 @@
+import importlib
+import sys
+import threading
+import types
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_lock = threading.Lock()
+
+
+class LazyModule(types.ModuleType):
+    "A stand-in for a module that is imported the first time one of its attributes is used.  Modules that are expensive to import (``requests``, ``google.protobuf.json_format``, the generated ``schedule_pb2``, NumPy) are bound this way so that importing ``src.ccm.api`` and constructing a ``CcmApi`` only pay for what a given process actually calls."
+
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with _lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__['_module'] = module
+        return module
+
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name):
+    """Bind a module without importing it yet.  If it has already been imported, it is returned as is.
+
+    :param name: The absolute module name, e.g. ``google.protobuf.json_format``
+    :type name: string
+    :rtype: module
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
@@ -0,0 +1,239 @@
+import logging
+import numpy as np
+from src import schedule_pb2 as objs
+from src.ccm.frame import ScheduleFrame
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+Objective = objs.UserPreference.Objective
+VisibilityPropertyType = objs.VisibilityProperty.VisibilityPropertyType
+
+SECONDS_PER_DAY = 86400
+
+
+class ContactTable(object):
+    "The tasks of a ScheduleFrame sorted by (``noradId``, ``start``) and assigned to groups, either one group per spacecraft or one per spacecraft per day.  Gaps between consecutive contacts of a spacecraft are precomputed and attributed to the group of the contact that ends them.  Every objective kernel reads from this table and returns one value per group."
+
+
+    def __init__(self, frame: ScheduleFrame, horizon=None, per_day=False, visibilities=None):
+        """
+        :param frame: The tasks to evaluate
+        :type frame: ScheduleFrame
+        :param horizon: Optional ``(start, end)`` posix timestamps of the period being evaluated.  Only tasks starting in ``[start, end)`` are counted.  Defaults to the span of the tasks.
+        :type horizon: tuple
+        :param per_day: If True, group by spacecraft and by day of the horizon rather than by spacecraft alone
+        :type per_day: bool
+        :param visibilities: Optional Visibility objects the tasks were scheduled in.  Needed only by the visibility-based objectives.
+        :type visibilities: list
+        """
+        self.norad_ids = frame.categories['noradId']
+        self.k = len(self.norad_ids)
+        if horizon is None:
+            horizon = (int(frame.start.min()), int(frame.end.max())) if len(frame) else (0, SECONDS_PER_DAY)
+        else:
+            # Tasks starting outside the horizon belong to another period and must not be counted in this one
+            frame = frame.filter((frame.start >= horizon[0]) & (frame.start < horizon[1]))
+        self.horizon = horizon
+        codes = frame.codes['noradId']
+        order = np.lexsort((frame.start, codes))
+        self.codes = codes[order]
+        self.start = frame.start[order]
+        self.end = frame.end[order]
+        span = max(horizon[1] - horizon[0], 1)
+        if per_day:
+            self.ndays = int(-(-span // SECONDS_PER_DAY))
+            day = np.clip((self.start - horizon[0]) // SECONDS_PER_DAY, 0, self.ndays - 1)
+            day_seconds = np.full(self.ndays, SECONDS_PER_DAY, dtype=float)
+            day_seconds[-1] = span - SECONDS_PER_DAY * (self.ndays - 1)
+        else:
+            self.ndays = 1
+            day = np.zeros(len(self.start), dtype=np.int64)
+            day_seconds = np.array([span], dtype=float)
+        self.n_groups = self.k * self.ndays
+        self.group = self.codes * self.ndays + day
+        self.group_seconds = np.tile(day_seconds, self.k)
+        self.days = self.group_seconds / SECONDS_PER_DAY
+        same = self.codes[1:] == self.codes[:-1]
+        self.gap_group = self.group[1:][same]
+        self.gaps = (self.start[1:] - self.end[:-1])[same]
+        first = np.concatenate(([True], ~same)) if len(self.codes) else np.zeros(0, dtype=bool)
+        self.first_group = self.group[first]
+        self.leading = np.maximum(self.start[first] - horizon[0], 0)
+        self.visibility_start = None
+        self.visibility_end = None
+        self.has_band = None
+        if visibilities is not None:
+            self._join_visibilities(frame, order, visibilities)
+
+
+    def _join_visibilities(self, frame, order, visibilities):
+        windows = {}
+        for v in visibilities:
+            has_band = any(p.vtype == VisibilityPropertyType.BAND for p in v.props)
+            windows[v.visibilityId] = (v.startTimestamp, v.endTimestamp, has_band)
+        missing = (np.nan, np.nan, np.nan)
+        found = np.array([windows.get(vid, missing) for vid in frame.categories['visibilityId']], dtype=float).reshape(-1, 3)
+        codes = frame.codes['visibilityId'][order]
+        self.visibility_start = found[codes, 0]
+        self.visibility_end = found[codes, 1]
+        self.has_band = found[codes, 2]
+
+
+    @property
+    def minutes(self):
+        return (self.end - self.start) / 60.0
+
+
+    def count(self):
+        return np.bincount(self.group, minlength=self.n_groups)
+
+
+    def total(self, groups, values):
+        return np.bincount(groups, weights=values, minlength=self.n_groups)
+
+
+    def mean(self, groups, values):
+        values = np.asarray(values, dtype=float)
+        defined = ~np.isnan(values)
+        n = np.bincount(groups[defined], minlength=self.n_groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(n > 0, self.total(groups[defined], values[defined]) / np.maximum(n, 1), np.nan)
+
+
+    def reduce(self, ufunc, groups, values, initial):
+        out = np.full(self.n_groups, initial, dtype=float)
+        ufunc.at(out, groups, values)
+        out[np.bincount(groups, minlength=self.n_groups) == 0] = np.nan
+        return out
+
+
+    def require_visibilities(self, objective):
+        if self.visibility_start is None:
+            raise Exception(f'Objective {Objective.Name(objective)} requires visibilities')
+
+
+def contact_count_per_day(table):
+    return table.count() / table.days
+
+
+def contact_minutes_per_day(table):
+    return table.total(table.group, table.minutes) / table.days
+
+
+def average_minutes_contact_length(table):
+    return table.mean(table.group, table.minutes)
+
+
+def minimum_minutes_contact_length(table):
+    return table.reduce(np.minimum, table.group, table.minutes, np.inf)
+
+
+def average_minutes_between_contacts(table):
+    return table.mean(table.gap_group, table.gaps / 60.0)
+
+
+def maximum_minutes_between_contacts(table):
+    return table.reduce(np.maximum, table.gap_group, table.gaps / 60.0, -np.inf)
+
+
+def minimum_minutes_between_contacts(table):
+    return table.reduce(np.minimum, table.gap_group, table.gaps / 60.0, np.inf)
+
+
+def epoch_time_start(table):
+    return table.reduce(np.minimum, table.group, table.start.astype(float), np.inf)
+
+
+def expected_wait_time(table):
+    # A request arriving uniformly at random waits gap / 2 on average when it lands in a gap of
+    # length gap, so the expectation over the period is sum(gap ** 2) / 2 / period.  Time after
+    # the last contact of the period is not counted, as there is no contact to wait for.
+    waits = np.concatenate((table.gaps, table.leading)).astype(float)
+    groups = np.concatenate((table.gap_group, table.first_group))
+    return table.total(groups, waits ** 2 / 2.0) / table.group_seconds / 60.0
+
+
+def mean_midpoint_within_visibility(table):
+    table.require_visibilities(Objective.MeanMidpointWithinVisibility)
+    midpoint = (table.start + table.end) / 2.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        position = (midpoint - table.visibility_start) / (table.visibility_end - table.visibility_start)
+    return table.mean(table.group, position)
+
+
+def fraction_has_band(table):
+    table.require_visibilities(Objective.FractionHasBand)
+    return table.mean(table.group, table.has_band)
+
+
+KERNELS = {
+    Objective.ContactCountPerDay: contact_count_per_day,
+    Objective.ContactMinutesPerDay: contact_minutes_per_day,
+    Objective.AverageMinutesContactLength: average_minutes_contact_length,
+    Objective.MinimumMinutesContactLength: minimum_minutes_contact_length,
+    Objective.AverageMinutesBetweenContacts: average_minutes_between_contacts,
+    Objective.MaximumMinutesBetweenContacts: maximum_minutes_between_contacts,
+    Objective.MinimumMinutesBetweenContacts: minimum_minutes_between_contacts,
+    Objective.EpochTimeStart: epoch_time_start,
+    Objective.ExpectedWaitTime: expected_wait_time,
+    Objective.MeanMidpointWithinVisibility: mean_midpoint_within_visibility,
+    Objective.FractionHasBand: fraction_has_band,
+}
+
+# Objectives whose value for a spacecraft with no contacts is zero rather than undefined
+ZERO_WHEN_EMPTY = (Objective.ContactCountPerDay, Objective.ContactMinutesPerDay)
+
+
+def compute_objectives(schedule, objectives=None, horizon=None, per_day=False, visibilities=None):
+    """Compute several objective metrics for every spacecraft in a schedule, sharing one sorted ContactTable between them.
+
+    :param schedule: The tasks to evaluate
+    :type schedule: Schedule or ScheduleFrame
+    :param objectives: The metrics to compute.  Defaults to every objective in ``KERNELS`` that the given inputs allow.
+    :type objectives: list
+    :param horizon: Optional ``(start, end)`` posix timestamps of the period being evaluated.  Defaults to the span of the tasks.
+    :type horizon: tuple
+    :param per_day: If True, compute each metric per spacecraft per day of the horizon
+    :type per_day: bool
+    :param visibilities: Optional Visibility objects, needed by MeanMidpointWithinVisibility and FractionHasBand
+    :type visibilities: list
+    :raises Exception: An objective cannot be computed from the given inputs.
+    :return: The ``noradId`` values, and a dictionary from each objective to its values: one per spacecraft, or a (spacecraft, day) array if ``per_day``
+    :rtype: tuple
+    """
+    frame = schedule if isinstance(schedule, ScheduleFrame) else ScheduleFrame.from_schedule(schedule)
+    table = ContactTable(frame, horizon, per_day=per_day, visibilities=visibilities)
+    if objectives is None:
+        objectives = [o for o in KERNELS if visibilities is not None or o not in (Objective.MeanMidpointWithinVisibility, Objective.FractionHasBand)]
+    results = {}
+    for objective in objectives:
+        if objective not in KERNELS:
+            raise Exception(f'Objective {Objective.Name(objective)} cannot be computed locally')
+        values = KERNELS[objective](table)
+        results[objective] = values.reshape(table.k, table.ndays) if per_day else values
+    return table.norad_ids, results
+
+
+def compute_objective(schedule, objective, horizon=None, per_day=False, visibilities=None):
+    """Compute an objective metric for every spacecraft in a schedule.
+
+    :param schedule: The tasks to evaluate
+    :type schedule: Schedule or ScheduleFrame
+    :param objective: The metric to compute
+    :type objective: UserPreference.Objective
+    :param horizon: Optional ``(start, end)`` posix timestamps of the period being evaluated.  Defaults to the span of the tasks.
+    :type horizon: tuple
+    :param per_day: If True, compute the metric per spacecraft per day of the horizon
+    :type per_day: bool
+    :param visibilities: Optional Visibility objects, needed by MeanMidpointWithinVisibility and FractionHasBand
+    :type visibilities: list
+    :raises Exception: The objective cannot be computed from the given inputs.
+    :return: The ``noradId`` values and the metric for each (NaN where it is undefined, e.g. the gap between contacts of a spacecraft with one contact)
+    :rtype: tuple
+    """
+    norad_ids, results = compute_objectives(schedule, [objective], horizon, per_day, visibilities)
+    return norad_ids, results[objective]
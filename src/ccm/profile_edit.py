@@ -0,0 +1,100 @@
+import logging
+from google.protobuf.descriptor import FieldDescriptor
+from src import schedule_pb2 as objs
+from src.ccm.scoring import preference_key
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+
+class ProfileEdit(object):
+    "A batch of changes to one Preference Profile, collected locally and committed together with ``CcmApi.set_preferences`` so the whole batch costs one request and one re-optimization.  Used as a context manager, the batch is committed when the block exits normally and discarded if it raises."
+
+
+    def __init__(self, client, profile_name, prefs):
+        """Built by ``CcmApi.edit_profile``.
+
+        :param client: The client to commit through
+        :type client: CcmApi
+        :param profile_name: The Preference Profile being edited
+        :type profile_name: string
+        :param prefs: The current UserPreferences of the profile
+        :type prefs: list
+        """
+        self.client = client
+        self.profile_name = profile_name
+        self.prefs = [objs.UserPreference.FromString(p.SerializePartialToString()) for p in prefs]
+        # The key of each preference is fixed when it joins the edit, so a removal does not shift the positional keys of the rest
+        self._keys = [preference_key(upref, i) for i, upref in enumerate(self.prefs)]
+        self.result = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self.result is None:
+            self.commit()
+
+
+    def _index(self, key):
+        try:
+            return self._keys.index(key)
+        except ValueError:
+            raise KeyError(f'No preference {key} in {self.profile_name}')
+
+
+    def add(self, upref: objs.UserPreference):
+        """Add a UserPreference to the profile."""
+        self._keys.append(preference_key(upref, len(self.prefs)))
+        self.prefs.append(upref)
+        return self
+
+
+    def remove(self, key):
+        """Remove a UserPreference from the profile.
+
+        :param key: The ``unique_id``, ``label`` or position of the preference, as reported by ``score_profile``
+        :type key: string
+        """
+        i = self._index(key)
+        del self.prefs[i]
+        del self._keys[i]
+        return self
+
+
+    def update(self, key, **params):
+        """Change parameters of a UserPreference in the profile, e.g. ``update('pass-count', mu=6, sigma=2)``.  A repeated field such as ``siteIds`` is replaced by the given values.
+
+        :param key: The ``unique_id``, ``label`` or position of the preference, as reported by ``score_profile``
+        :type key: string
+        """
+        upref = self.prefs[self._index(key)]
+        fields = upref.DESCRIPTOR.fields_by_name
+        for name, value in params.items():
+            field = fields.get(name)
+            if field is None:
+                raise AttributeError(f'UserPreference has no field {name}')
+            if field.label == FieldDescriptor.LABEL_REPEATED:
+                values = getattr(upref, name)
+                del values[:]
+                values.extend(value)
+            elif field.type == FieldDescriptor.TYPE_MESSAGE:
+                getattr(upref, name).CopyFrom(value)
+            else:
+                setattr(upref, name, value)
+        return self
+
+
+    def commit(self):
+        """Send every change to the server in one request.
+
+        :return: The response of ``CcmApi.set_preferences``
+        :rtype: dict
+        """
+        self.result = self.client.set_preferences(self.profile_name, self.prefs)
+        return self.result
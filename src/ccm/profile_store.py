@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import logging
+import threading
+import warnings
+from collections.abc import MutableMapping
+from src.ccm.lazy import lazy_import
+
+sqlite3 = lazy_import('sqlite3')
+objs = lazy_import('src.schedule_pb2')
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = 'default'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (user_id, name)
+);
+CREATE TABLE IF NOT EXISTS preferences (
+    user_id TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (user_id, profile, position)
+);
+CREATE TABLE IF NOT EXISTS current_profile (
+    user_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+"""
+
+
+class MemoryProfileStore(object):
+    "Preference Profiles held in memory for the life of the process.  This is the default store of ``CcmApi``."
+
+
+    def __init__(self):
+        self._profiles = {DEFAULT_PROFILE: []}
+        self._current = DEFAULT_PROFILE
+
+
+    def __contains__(self, profile_name):
+        return profile_name in self._profiles
+
+
+    def names(self):
+        """The names of every stored profile.
+
+        :rtype: list
+        """
+        return list(self._profiles)
+
+
+    def create(self, profile_name):
+        self._profiles.setdefault(profile_name, [])
+
+
+    def delete(self, profile_name):
+        self._profiles.pop(profile_name, None)
+
+
+    def preferences(self, profile_name):
+        """The UserPreferences of a profile, in the order they were added.
+
+        :rtype: list
+        """
+        return list(self._profiles.get(profile_name, []))
+
+
+    def add_preference(self, profile_name, upref: objs.UserPreference):
+        self._profiles[profile_name].append(upref)
+
+
+    def set_preferences(self, profile_name, prefs):
+        """Replace every UserPreference of a profile, creating it if needed."""
+        self._profiles[profile_name] = list(prefs)
+
+
+    def get_current(self):
+        return self._current
+
+
+    def set_current(self, profile_name):
+        self._current = profile_name
+
+
+    def close(self):
+        pass
+
+
+class SqliteProfileStore(object):
+    "Preference Profiles kept in a SQLite database, so they outlive the process and are shared by every worker on the host.  UserPreferences are stored as serialized protobuf bytes.  Opening the store reads nothing but the schema; the preferences of a profile are loaded the first time they are asked for and kept until another connection writes to the database, which ``PRAGMA data_version`` reveals on the next read.  The database runs in WAL mode, so readers in other processes are never blocked by a writer."
+
+
+    def __init__(self, path, user_id):
+        """
+        :param path: The database file.  It is created if it does not exist.
+        :type path: string
+        :param user_id: The account whose profiles to keep.  One database may hold the profiles of several accounts.
+        :type user_id: string
+        """
+        self.path = path
+        self.user_id = user_id
+        self._lock = threading.Lock()
+        self._loaded = {}
+        self._data_version = None
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute('INSERT OR IGNORE INTO profiles (user_id, name) VALUES (?, ?)', (user_id, DEFAULT_PROFILE))
+
+
+    def _query(self, sql, args=()):
+        with self._lock:
+            return self._conn.execute(sql, (self.user_id,) + tuple(args)).fetchall()
+
+
+    def _revalidate(self):
+        """Drop the loaded preferences if another connection has committed since they were read.  Call with ``_lock`` held."""
+        version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        if version != self._data_version:
+            self._loaded.clear()
+            self._data_version = version
+
+
+    def __contains__(self, profile_name):
+        return len(self._query('SELECT 1 FROM profiles WHERE user_id = ? AND name = ?', (profile_name,))) > 0
+
+
+    def names(self):
+        """The names of every stored profile.
+
+        :rtype: list
+        """
+        return [row[0] for row in self._query('SELECT name FROM profiles WHERE user_id = ? ORDER BY rowid')]
+
+
+    def create(self, profile_name):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR IGNORE INTO profiles (user_id, name) VALUES (?, ?)', (self.user_id, profile_name))
+
+
+    def delete(self, profile_name):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM preferences WHERE user_id = ? AND profile = ?', (self.user_id, profile_name))
+            self._conn.execute('DELETE FROM profiles WHERE user_id = ? AND name = ?', (self.user_id, profile_name))
+            self._revalidate()
+            self._loaded.pop(profile_name, None)
+
+
+    def preferences(self, profile_name):
+        """The UserPreferences of a profile, in the order they were added.  They are read from the database on first use and kept in memory until another connection changes the database.
+
+        :rtype: list
+        """
+        with self._lock:
+            self._revalidate()
+            if profile_name not in self._loaded:
+                rows = self._conn.execute('SELECT data FROM preferences WHERE user_id = ? AND profile = ? ORDER BY position', (self.user_id, profile_name)).fetchall()
+                self._loaded[profile_name] = [objs.UserPreference.FromString(row[0]) for row in rows]
+            return list(self._loaded[profile_name])
+
+
+    def add_preference(self, profile_name, upref: objs.UserPreference):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO preferences (user_id, profile, position, data) '
+                'SELECT ?, ?, COALESCE(MAX(position) + 1, 0), ? FROM preferences WHERE user_id = ? AND profile = ?',
+                (self.user_id, profile_name, upref.SerializePartialToString(), self.user_id, profile_name))
+            self._revalidate()
+            if profile_name in self._loaded:
+                self._loaded[profile_name].append(upref)
+
+
+    def set_preferences(self, profile_name, prefs):
+        """Replace every UserPreference of a profile in one transaction, creating it if needed."""
+        prefs = list(prefs)
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR IGNORE INTO profiles (user_id, name) VALUES (?, ?)', (self.user_id, profile_name))
+            self._conn.execute('DELETE FROM preferences WHERE user_id = ? AND profile = ?', (self.user_id, profile_name))
+            self._conn.executemany(
+                'INSERT INTO preferences (user_id, profile, position, data) VALUES (?, ?, ?, ?)',
+                [(self.user_id, profile_name, i, upref.SerializePartialToString()) for i, upref in enumerate(prefs)])
+            self._revalidate()
+            self._loaded[profile_name] = prefs
+
+
+    def get_current(self):
+        rows = self._query('SELECT name FROM current_profile WHERE user_id = ?')
+        return rows[0][0] if rows else DEFAULT_PROFILE
+
+
+    def set_current(self, profile_name):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO current_profile (user_id, name) VALUES (?, ?)', (self.user_id, profile_name))
+
+
+    def close(self):
+        self._conn.close()
+
+
+class ProfileMapping(MutableMapping):
+    "The ``CcmApi.profiles`` dictionary of earlier releases, as a live view of a profile store.  Each profile maps to ``{'prefs': [...]}``, or to ``{}`` while it has no UserPreferences.  Assigning or deleting a profile changes the store (but not the CCM Server) and warns that the ``CcmApi`` methods should be used instead.  The dictionaries it returns are copies, so changing them changes nothing."
+
+
+    def __init__(self, store):
+        self._store = store
+
+
+    def __getitem__(self, profile_name):
+        if profile_name not in self._store:
+            raise KeyError(profile_name)
+        prefs = self._store.preferences(profile_name)
+        return {'prefs': prefs} if prefs else {}
+
+
+    def __setitem__(self, profile_name, profile):
+        warnings.warn('Changing CcmApi.profiles only changes the local store; use create_preference_profile or set_preferences', DeprecationWarning, stacklevel=2)
+        self._store.create(profile_name)
+        self._store.set_preferences(profile_name, profile.get('prefs', []))
+
+
+    def __delitem__(self, profile_name):
+        warnings.warn('Changing CcmApi.profiles only changes the local store; use delete_profile', DeprecationWarning, stacklevel=2)
+        if profile_name not in self._store:
+            raise KeyError(profile_name)
+        self._store.delete(profile_name)
+
+
+    def __contains__(self, profile_name):
+        return profile_name in self._store
+
+
+    def __iter__(self):
+        return iter(self._store.names())
+
+
+    def __len__(self):
+        return len(self._store.names())
@@ -0,0 +1,261 @@
+import logging
+import numpy as np
+from src import schedule_pb2 as objs
+from src.ccm.frame import ScheduleFrame
+from src.ccm.objectives import ContactTable, KERNELS, ZERO_WHEN_EMPTY, Objective
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+ConstraintType = objs.UserPreference.ConstraintType
+
+
+def truncated_gaussian(x, mu, sigma, min=None, max=None):
+    """Utility of ``x`` under a Truncated Gaussian preference: 1 at ``mu``, falling off with ``sigma``, and 0 outside ``[min, max]``.
+
+    All arguments broadcast against each other, so any of them may be arrays.
+
+    :rtype: numpy.ndarray
+    """
+    x = np.asarray(x, dtype=float)
+    u = np.exp(-0.5 * ((x - mu) / sigma) ** 2)
+    if min is not None:
+        u = np.where(x < min, 0.0, u)
+    if max is not None:
+        u = np.where(x > max, 0.0, u)
+    return u
+
+
+def logistic(x, bias, shape):
+    """Utility of ``x`` under a Logistic preference: 0.5 at ``bias``, rising towards 1 with steepness ``shape``.
+
+    All arguments broadcast against each other, so any of them may be arrays.
+
+    :rtype: numpy.ndarray
+    """
+    x = np.asarray(x, dtype=float)
+    return 0.5 * (1.0 + np.tanh(0.5 * shape * (x - bias)))
+
+
+def half_life(x, start, decayBegins, lambdaParam, decayHorizon=None):
+    """Utility of ``x`` under a Decay (HalfLife) preference: 0 below ``start``, 1 up to ``decayBegins``, then ``exp(-lambdaParam * (x - decayBegins))`` until ``decayHorizon``, beyond which it is 0.
+
+    All arguments broadcast against each other, so any of them may be arrays.
+
+    :rtype: numpy.ndarray
+    """
+    x = np.asarray(x, dtype=float)
+    u = np.where(x <= decayBegins, 1.0, np.exp(-lambdaParam * np.maximum(x - decayBegins, 0.0)))
+    u = np.where(x < start, 0.0, u)
+    if decayHorizon is not None:
+        u = np.where(x > decayHorizon, 0.0, u)
+    return u
+
+
+def _optional(upref, name):
+    return getattr(upref, name) if upref.HasField(name) else None
+
+
+def utility(upref: objs.UserPreference, x):
+    """Evaluate the constraint function of ``upref`` at the metric value(s) ``x``.  Undefined (NaN) metric values score 0.
+
+    :param upref: The preference whose ``constraintType`` and parameters to use
+    :type upref: UserPreference
+    :param x: Metric values
+    :type x: numpy.ndarray
+    :rtype: numpy.ndarray
+    """
+    if upref.constraintType == ConstraintType.TruncatedGaussian:
+        u = truncated_gaussian(x, upref.mu, upref.sigma, _optional(upref, 'min'), _optional(upref, 'max'))
+    elif upref.constraintType == ConstraintType.Logistic:
+        u = logistic(x, upref.bias, upref.shape)
+    elif upref.constraintType == ConstraintType.HalfLife:
+        u = half_life(x, upref.start, upref.decayBegins, upref.lambdaParam, _optional(upref, 'decayHorizon'))
+    else:
+        raise Exception(f'Unknown constraint type {upref.constraintType}')
+    return np.nan_to_num(u, nan=0.0)
+
+
+def preference_key(upref: objs.UserPreference, i):
+    """The key under which a preference's score is reported: its ``unique_id``, else its ``label``, else its position in the profile."""
+    return upref.unique_id or upref.label or str(i)
+
+
+def select_tasks(frame: ScheduleFrame, upref: objs.UserPreference) -> ScheduleFrame:
+    """Select the tasks a preference applies to, honouring its ``userId``, ``noradIds``, ``siteIds`` and ``start_time``/``end_time``."""
+    conditions = {}
+    if upref.HasField('userId'):
+        conditions['userId'] = upref.userId
+    if len(upref.noradIds):
+        conditions['noradId'] = list(upref.noradIds)
+    if len(upref.siteIds):
+        conditions['siteId'] = list(upref.siteIds)
+    mask = None
+    if upref.HasField('start_time'):
+        mask = frame.start >= upref.start_time
+    if upref.HasField('end_time'):
+        before = frame.end <= upref.end_time
+        mask = before if mask is None else (mask & before)
+    return frame.filter(mask, **conditions)
+
+
+def preference_horizon(frame: ScheduleFrame, upref: objs.UserPreference, horizon=None):
+    if horizon is None:
+        horizon = (int(frame.start.min()), int(frame.end.max())) if len(frame) else (0, 0)
+    lo = upref.start_time if upref.HasField('start_time') else horizon[0]
+    hi = upref.end_time if upref.HasField('end_time') else horizon[1]
+    return lo, hi
+
+
+def objective_values(frame: ScheduleFrame, upref: objs.UserPreference, horizon=None):
+    """Compute the objective of ``upref`` for each spacecraft it applies to.
+
+    :param frame: The whole schedule
+    :type frame: ScheduleFrame
+    :param upref: The preference
+    :type upref: UserPreference
+    :param horizon: Optional ``(start, end)`` of the evaluated period.  Defaults to the span of ``frame``.
+    :type horizon: tuple
+    :return: The ``noradId`` values and the metric for each
+    :rtype: tuple
+    """
+    if upref.objective not in KERNELS:
+        raise Exception(f'Objective {Objective.Name(upref.objective)} cannot be computed locally')
+    selected = select_tasks(frame, upref)
+    table = ContactTable(selected, preference_horizon(frame, upref, horizon))
+    values = KERNELS[upref.objective](table)
+    if len(upref.noradIds):
+        norad_ids = np.array(list(upref.noradIds), dtype=object)
+        empty = 0.0 if upref.objective in ZERO_WHEN_EMPTY else np.nan
+        lookup = {n: i for i, n in enumerate(table.norad_ids)}
+        values = np.array([values[lookup[n]] if n in lookup else empty for n in norad_ids], dtype=float)
+        return norad_ids, values
+    present = table.count() > 0
+    return table.norad_ids[present], values[present]
+
+
+def score_preference(upref: objs.UserPreference, schedule, horizon=None):
+    """Score one UserPreference against a schedule.  The score is the mean utility over the spacecraft the preference applies to.
+
+    :param upref: The preference to evaluate
+    :type upref: UserPreference
+    :param schedule: The schedule to evaluate it against
+    :type schedule: Schedule or ScheduleFrame
+    :param horizon: Optional ``(start, end)`` posix timestamps of the evaluated period
+    :type horizon: tuple
+    :return: A score between 0 and 1
+    :rtype: float
+    """
+    frame = schedule if isinstance(schedule, ScheduleFrame) else ScheduleFrame.from_schedule(schedule)
+    norad_ids, values = objective_values(frame, upref, horizon)
+    if len(values) == 0:
+        return 0.0
+    return float(utility(upref, values).mean())
+
+
+def score_profile(prefs, schedule, horizon=None):
+    """Score every UserPreference in a profile against a schedule, and combine them weighted by ``weight`` (1 if unset).
+
+    :param prefs: The UserPreference objects in the profile
+    :type prefs: list
+    :param schedule: The schedule to evaluate them against
+    :type schedule: Schedule or ScheduleFrame
+    :param horizon: Optional ``(start, end)`` posix timestamps of the evaluated period
+    :type horizon: tuple
+    :return: A dictionary with ``preferenceScores`` (keyed like ``UserTelemetry.preferenceScores``) and the weighted ``score``
+    :rtype: dict
+    """
+    frame = schedule if isinstance(schedule, ScheduleFrame) else ScheduleFrame.from_schedule(schedule)
+    scores = {}
+    values = []
+    weights = []
+    for i, upref in enumerate(prefs):
+        value = score_preference(upref, frame, horizon)
+        scores[preference_key(upref, i)] = value
+        values.append(value)
+        weights.append(upref.weight if upref.HasField('weight') else 1.0)
+    weights = np.array(weights, dtype=float)
+    total = weights.sum()
+    score = float(np.dot(weights, values) / total) if total > 0 else 0.0
+    return {
+        'preferenceScores': scores,
+        'score': score
+    }
+
+
+SWEEP_PARAMETERS = {
+    ConstraintType.TruncatedGaussian: (('mu', True), ('sigma', True), ('min', False), ('max', False)),
+    ConstraintType.Logistic: (('bias', True), ('shape', True)),
+    ConstraintType.HalfLife: (('start', True), ('decayBegins', True), ('lambdaParam', True), ('decayHorizon', False)),
+}
+
+CONSTRAINT_FUNCTIONS = {
+    ConstraintType.TruncatedGaussian: truncated_gaussian,
+    ConstraintType.Logistic: logistic,
+    ConstraintType.HalfLife: half_life,
+}
+
+
+def sweep_preference(schedule, constraint_type, objective, template=None, horizon=None, grid=True, **params):
+    """Score many candidate parameter sets of one ``constraintType``/``objective`` against the same schedule in a single broadcast evaluation.
+
+    The objective is computed once; only the constraint function is evaluated per candidate.  For example, to tune a Truncated Gaussian::
+
+        scores = sweep_preference(schedule, ConstraintType.TruncatedGaussian, Objective.ContactCountPerDay,
+                                  mu=np.linspace(1, 10, 100), sigma=np.linspace(0.5, 5, 50))
+
+    returns a 100 x 50 grid whose ``[i, j]`` entry equals ``score_preference`` for ``mu[i]``, ``sigma[j]``.
+
+    :param schedule: The schedule to evaluate against
+    :type schedule: Schedule or ScheduleFrame
+    :param constraint_type: TruncatedGaussian, Logistic or HalfLife
+    :type constraint_type: UserPreference.ConstraintType
+    :param objective: The metric the candidates constrain
+    :type objective: UserPreference.Objective
+    :param template: Optional UserPreference supplying the targeting fields (``userId``, ``noradIds``, ``siteIds``, ``start_time``/``end_time``) and any parameter not swept
+    :type template: UserPreference
+    :param horizon: Optional ``(start, end)`` posix timestamps of the evaluated period
+    :type horizon: tuple
+    :param grid: If True, the swept parameters form the axes of an outer-product grid in the order given.  If False, they are broadcast against each other element-wise.
+    :type grid: bool
+    :param params: Arrays of constraint parameters, e.g. ``mu``, ``sigma``, ``bias``, ``shape``.  Scalars are held fixed across the sweep.
+    :raises Exception: A required parameter was neither swept nor set on ``template``.
+    :return: The score of every candidate
+    :rtype: numpy.ndarray
+    """
+    if template is None:
+        template = objs.UserPreference(constraintType=constraint_type, objective=objective, tier=1)
+    else:
+        template = objs.UserPreference.FromString(template.SerializePartialToString())
+        template.constraintType = constraint_type
+        template.objective = objective
+    names = [name for name, required in SWEEP_PARAMETERS[constraint_type]]
+    for name in params:
+        if name not in names:
+            raise Exception(f'{name} is not a parameter of {ConstraintType.Name(constraint_type)}')
+    arrays = {name: np.asarray(value, dtype=float) for name, value in params.items()}
+    axes = [name for name, value in arrays.items() if value.ndim > 0]
+    if grid and axes:
+        for name, value in zip(axes, np.meshgrid(*[arrays[name] for name in axes], indexing='ij')):
+            arrays[name] = value
+    swept = dict(zip(arrays, np.broadcast_arrays(*arrays.values())))
+    frame = schedule if isinstance(schedule, ScheduleFrame) else ScheduleFrame.from_schedule(schedule)
+    norad_ids, values = objective_values(frame, template, horizon)
+    shape = next(iter(swept.values())).shape if swept else ()
+    if len(values) == 0:
+        return np.zeros(shape)
+    args = []
+    for name, required in SWEEP_PARAMETERS[constraint_type]:
+        if name in swept:
+            args.append(swept[name][..., np.newaxis])
+        elif template.HasField(name):
+            args.append(getattr(template, name))
+        elif required:
+            raise Exception(f'{ConstraintType.Name(constraint_type)} requires {name}')
+        else:
+            args.append(None)
+    u = CONSTRAINT_FUNCTIONS[constraint_type](values, *args)
+    return np.nan_to_num(u, nan=0.0).mean(axis=-1)
@@ -0,0 +1,44 @@
+import logging
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+
+def build_session(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False, keep_alive=True, max_retries=0):
+    """Build a ``requests.Session`` backed by a pooled, keep-alive connection adapter.
+
+    A single session can be shared by every ``CcmApi`` method (and by several ``CcmApi`` instances) so that repeated calls to the CCM Server reuse warm TCP+TLS connections rather than paying a new handshake per call.  The underlying ``urllib3`` connection pools are thread safe, so the session may be shared across worker threads.
+
+    :param pool_connections: The number of distinct hosts to keep connection pools for
+    :type pool_connections: int
+    :param pool_maxsize: The maximum number of connections kept open to any one host
+    :type pool_maxsize: int
+    :param pool_block: If True, callers wait for a free connection instead of opening more than ``pool_maxsize`` connections to a host
+    :type pool_block: bool
+    :param keep_alive: If False, every request asks the server to close the connection once it responds
+    :type keep_alive: bool
+    :param max_retries: The number of retries attempted on failed connections
+    :type max_retries: int
+    :return: A configured session
+    :rtype: requests.Session
+    """
+    # requests (and urllib3, certifi, ...) is the bulk of a client's import time, so it is only loaded once a session is needed
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+        max_retries=max_retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
@@ -0,0 +1,332 @@
+import io
+import logging
+from google.protobuf.descriptor import FieldDescriptor
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+WIRETYPE_VARINT = 0
+WIRETYPE_FIXED64 = 1
+WIRETYPE_LENGTH_DELIMITED = 2
+WIRETYPE_FIXED32 = 5
+
+_CHUNK = 1 << 16
+
+MAX_VARINT_SIZE = 10
+
+
+def decode_varint(data, pos=0):
+    """Decode one base-128 varint from a buffer.
+
+    :param data: The buffer, e.g. bytes or a memoryview
+    :param pos: Where the varint starts in ``data``
+    :type pos: int
+    :return: The decoded value, and the position just past it
+    :rtype: tuple
+    """
+    result = 0
+    shift = 0
+    end = len(data)
+    while pos < end:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+    raise EOFError('Truncated varint')
+
+
+def read_varint(stream, allow_eof=False):
+    """Read one base-128 varint from ``stream``.  A ``_Buffered`` stream has the varint decoded straight from its buffer; any other stream is read a byte at a time.
+
+    :param stream: A binary file-like object
+    :param allow_eof: If True, return None instead of raising when the stream is already exhausted
+    :type allow_eof: bool
+    :return: The decoded value, and the raw bytes it was read from
+    :rtype: tuple
+    """
+    if type(stream) is _Buffered:
+        return stream.read_varint(allow_eof)
+    raw = bytearray()
+    result = 0
+    shift = 0
+    while True:
+        b = stream.read(1)
+        if not b:
+            if allow_eof and not raw:
+                return None, None
+            raise EOFError('Truncated varint')
+        raw += b
+        result |= (b[0] & 0x7f) << shift
+        if not b[0] & 0x80:
+            return result, bytes(raw)
+        shift += 7
+
+
+def _read_up_to(stream, n):
+    """Read ``n`` bytes, or fewer only if the stream ends first.  Network and raw streams may return less than asked for by a single ``read``."""
+    data = stream.read(n)
+    if len(data) == n or not data:
+        return data
+    chunks = [data]
+    remaining = n - len(data)
+    while remaining > 0:
+        data = stream.read(remaining)
+        if not data:
+            break
+        chunks.append(data)
+        remaining -= len(data)
+    return b''.join(chunks)
+
+
+def _read_exactly(stream, n):
+    data = _read_up_to(stream, n)
+    if len(data) != n:
+        raise EOFError(f'Expected {n} bytes, got {len(data)}')
+    return data
+
+
+def _skip(stream, n):
+    if stream.seekable():
+        stream.seek(n, io.SEEK_CUR)
+        return
+    while n > 0:
+        data = stream.read(min(n, _CHUNK))
+        if not data:
+            raise EOFError('Truncated message')
+        n -= len(data)
+
+
+class _Bounded(io.RawIOBase):
+    "A read-only window of ``length`` bytes onto another stream."
+
+    def __init__(self, stream, length):
+        self._stream = stream
+        self.remaining = length
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def read(self, n=-1):
+        if n is None or n < 0 or n > self.remaining:
+            n = self.remaining
+        data = _read_up_to(self._stream, n)
+        self.remaining -= len(data)
+        return data
+
+    def drain(self):
+        _skip(self._stream, self.remaining)
+        self.remaining = 0
+
+
+class _Buffered(object):
+    "Reads another stream ``_CHUNK`` bytes at a time so that ``read_varint`` can decode from the buffer instead of making a read call per byte."
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._seekable = stream.seekable()
+        self._buffer = b''
+        self._pos = 0
+
+    def _fill(self, n):
+        """Make at least ``n`` bytes available in the buffer, unless the stream ends first."""
+        buffer = self._buffer[self._pos:]
+        while len(buffer) < n:
+            data = self._stream.read(_CHUNK)
+            if not data:
+                break
+            buffer += data
+        self._buffer = buffer
+        self._pos = 0
+
+    def seekable(self):
+        return self._seekable
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence != io.SEEK_CUR:
+            raise io.UnsupportedOperation('Only relative seeks are supported')
+        available = len(self._buffer) - self._pos
+        if 0 <= offset <= available:
+            self._pos += offset
+        else:
+            self._stream.seek(offset - available, io.SEEK_CUR)
+            self._buffer = b''
+            self._pos = 0
+
+    def read(self, n=-1):
+        available = len(self._buffer) - self._pos
+        if n is None or n < 0 or n > available:
+            data = self._buffer[self._pos:]
+            self._buffer = b''
+            self._pos = 0
+            rest = self._stream.read() if n is None or n < 0 else _read_up_to(self._stream, n - available)
+            return data + rest if data else rest
+        data = self._buffer[self._pos:self._pos + n]
+        self._pos += n
+        return data
+
+    def read_varint(self, allow_eof=False):
+        """See ``read_varint``."""
+        buffer = self._buffer
+        start = self._pos
+        if len(buffer) - start < MAX_VARINT_SIZE:
+            self._fill(MAX_VARINT_SIZE)
+            buffer = self._buffer
+            start = self._pos
+        if start == len(buffer):
+            if allow_eof:
+                return None, None
+            raise EOFError('Truncated varint')
+        b = buffer[start]
+        if b < 0x80:
+            end = start + 1
+            result = b
+        else:
+            result, end = decode_varint(buffer, start)
+        self._pos = end
+        return result, buffer[start:end]
+
+
+def _buffered(stream):
+    """``stream`` read through a ``_Buffered``, which reads ahead of what has been consumed."""
+    return stream if isinstance(stream, _Buffered) else _Buffered(stream)
+
+
+class MessageStream(object):
+    "Walks the top-level fields of a serialized protobuf message (e.g. a ScheduleRequest or ConstellationState) without parsing it whole.  Iterating yields ``(field_name, sub_message)`` for each element of the streamed repeated message fields, one at a time, so memory use depends on the largest element rather than the whole payload.  Every other singular field is collected into ``header``, which is complete once iteration has finished."
+
+
+    def __init__(self, stream, message_cls, fields=None, length=None):
+        """
+        :param stream: A binary file-like object positioned at the start of the message.  Without a ``length`` it is read ahead through a buffer, since the message runs to its end anyway.
+        :param message_cls: The type of the serialized message, e.g. ``ScheduleRequest``
+        :param fields: The names of the repeated message fields to stream, e.g. ``['visibilities']``.  Defaults to all of them.  Repeated message fields not listed are skipped without being parsed.
+        :type fields: list
+        :param length: The size of the message in bytes, if it does not extend to the end of ``stream``
+        :type length: int
+        """
+        self.message_cls = message_cls
+        descriptor = message_cls.DESCRIPTOR
+        repeated = {f.name for f in descriptor.fields if f.label == FieldDescriptor.LABEL_REPEATED and f.type == FieldDescriptor.TYPE_MESSAGE}
+        if fields is None:
+            fields = repeated
+        for name in fields:
+            if name not in repeated:
+                raise ValueError(f'{descriptor.name}.{name} is not a repeated message field')
+        self._streamed = {f.number: (f.name, f.message_type._concrete_class) for f in descriptor.fields if f.name in fields}
+        self._skipped = {f.number for f in descriptor.fields if f.name in repeated and f.name not in fields}
+        # Read through a buffer so that keys and lengths are decoded from it rather than a byte at a time.  A message with a known length is buffered only within its window, so nothing after it is read ahead.
+        self._window = None if length is None else _Bounded(stream, length)
+        self._stream = _buffered(stream if length is None else self._window)
+        self._header = bytearray()
+        self.header = None
+
+
+    def __iter__(self):
+        stream = self._stream
+        while True:
+            key, raw_key = read_varint(stream, allow_eof=True)
+            if key is None:
+                break
+            number = key >> 3
+            wire_type = key & 0x7
+            if wire_type == WIRETYPE_VARINT:
+                value, raw = read_varint(stream)
+                self._header += raw_key + raw
+            elif wire_type == WIRETYPE_FIXED64:
+                self._header += raw_key + _read_exactly(stream, 8)
+            elif wire_type == WIRETYPE_FIXED32:
+                self._header += raw_key + _read_exactly(stream, 4)
+            elif wire_type == WIRETYPE_LENGTH_DELIMITED:
+                size, raw_size = read_varint(stream)
+                if number in self._streamed:
+                    name, cls = self._streamed[number]
+                    yield name, cls.FromString(_read_exactly(stream, size))
+                elif number in self._skipped:
+                    _skip(stream, size)
+                else:
+                    self._header += raw_key + raw_size + _read_exactly(stream, size)
+            else:
+                raise Exception(f'Unsupported wire type {wire_type} for field {number}')
+        header = self.message_cls()
+        header.MergeFromString(bytes(self._header))
+        self.header = header
+
+
+    def drain(self):
+        """Skip whatever has not been read of this message.  Only meaningful for a message with a known ``length``."""
+        if self._window is not None:
+            self._window.drain()
+
+
+def iter_delimited(stream, message_cls):
+    """Read a sequence of varint length-prefixed messages (as written by ``write_delimited``), yielding one parsed message at a time.
+
+    :param stream: A binary file-like object
+    :param message_cls: The type of every message in the sequence
+    :return: A generator of messages
+    """
+    stream = _buffered(stream)
+    while True:
+        size, raw = read_varint(stream, allow_eof=True)
+        if size is None:
+            return
+        yield message_cls.FromString(_read_exactly(stream, size))
+
+
+def iter_delimited_streams(stream, message_cls, fields=None):
+    """Read a sequence of varint length-prefixed messages, yielding a ``MessageStream`` over each so that even the individual messages are never parsed whole.
+
+    Each MessageStream must be consumed (or abandoned) before advancing to the next; anything left unread is skipped.
+
+    :param stream: A binary file-like object
+    :param message_cls: The type of every message in the sequence, e.g. ``ConstellationState``
+    :param fields: The repeated message fields to stream; see ``MessageStream``
+    :type fields: list
+    :return: A generator of MessageStream
+    """
+    stream = _buffered(stream)
+    while True:
+        size, raw = read_varint(stream, allow_eof=True)
+        if size is None:
+            return
+        ms = MessageStream(stream, message_cls, fields=fields, length=size)
+        yield ms
+        ms.drain()
+
+
+def _encode_varint(value):
+    out = bytearray()
+    while True:
+        b = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def write_delimited(stream, messages):
+    """Write messages to ``stream`` as a sequence of varint length-prefixed records.
+
+    :param stream: A binary file-like object
+    :param messages: The messages to write
+    :type messages: iterable
+    :return: The number of messages written
+    :rtype: int
+    """
+    count = 0
+    for message in messages:
+        data = message.SerializePartialToString()
+        stream.write(_encode_varint(len(data)))
+        stream.write(data)
+        count += 1
+    return count
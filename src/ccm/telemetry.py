@@ -0,0 +1,182 @@
+import json
+import logging
+from collections.abc import Sequence
+from google.protobuf.json_format import ParseDict
+from src.ccm import wire
+from src.ccm.stream import decode_varint, WIRETYPE_VARINT, WIRETYPE_FIXED64, WIRETYPE_FIXED32, WIRETYPE_LENGTH_DELIMITED
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+# The repeated sections of ScheduleTelemetry that are decoded only when accessed
+LAZY_FIELDS = ('groundStations', 'spacecrafts', 'users')
+
+_FIXED_SIZES = {WIRETYPE_FIXED64: 8, WIRETYPE_FIXED32: 4}
+
+
+def _walk(data):
+    """Yield ``(field_number, start, value_start, end)`` for each top-level field of a serialized message, where ``data[start:end]`` is the whole field including its key and ``data[value_start:end]`` is its value."""
+    pos = 0
+    while pos < len(data):
+        start = pos
+        key, pos = decode_varint(data, pos)
+        wire_type = key & 0x7
+        value_start = pos
+        if wire_type == WIRETYPE_VARINT:
+            value, end = decode_varint(data, pos)
+        elif wire_type == WIRETYPE_LENGTH_DELIMITED:
+            size, value_start = decode_varint(data, pos)
+            end = value_start + size
+        elif wire_type in _FIXED_SIZES:
+            end = value_start + _FIXED_SIZES[wire_type]
+        else:
+            raise Exception(f'Unsupported wire type {wire_type} for field {key >> 3}')
+        if end > len(data):
+            raise EOFError('Truncated message')
+        pos = end
+        yield key >> 3, start, value_start, end
+
+
+class LazyMessages(Sequence):
+    "A read-only sequence of messages that are each decoded the first time they are accessed and kept afterwards.  Its length is known without decoding anything."
+
+
+    def __init__(self, decode, items):
+        """
+        :param decode: Turns one entry of ``items`` into a message
+        :type decode: function
+        :param items: The undecoded entries, e.g. serialized bytes or JSON dicts
+        :type items: list
+        """
+        self._decode = decode
+        self._items = items
+        self._decoded = [None] * len(items)
+
+
+    def __len__(self):
+        return len(self._items)
+
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        message = self._decoded[i]
+        if message is None:
+            message = self._decoded[i] = self._decode(self._items[i])
+        return message
+
+
+    @property
+    def decoded(self):
+        """How many of the messages have been decoded so far."""
+        return sum(1 for m in self._decoded if m is not None)
+
+
+class TelemetryView(object):
+    "A ScheduleTelemetry whose ``groundStations``, ``spacecrafts`` and ``users`` are decoded entry by entry as they are accessed.  Every other field (``scheduleRunId``, ``system``, ``start``, ``end`` and the totals) is decoded up front and read straight from ``header``, so a dashboard that only needs ``view.system.customerSuccessScoreMean`` never pays for the per-user sections."
+
+
+    def __init__(self, header: objs.ScheduleTelemetry, groundStations, spacecrafts, users):
+        """Most callers should use ``from_bytes``, ``from_dict`` or ``CcmApi.get_schedule_telemetry``.
+
+        :param header: The telemetry without its lazy sections
+        :type header: ScheduleTelemetry
+        :param groundStations: The GroundStationTelemetry entries
+        :type groundStations: LazyMessages
+        :param spacecrafts: The SpacecraftTelemetry entries
+        :type spacecrafts: LazyMessages
+        :param users: The UserTelemetry entries
+        :type users: LazyMessages
+        """
+        self.header = header
+        self.groundStations = groundStations
+        self.spacecrafts = spacecrafts
+        self.users = users
+
+
+    @classmethod
+    def from_bytes(cls, data):
+        """View a serialized ScheduleTelemetry.  The lazy sections are only located, not parsed.
+
+        :param data: The serialized message
+        :type data: bytes
+        :rtype: TelemetryView
+        """
+        fields = objs.ScheduleTelemetry.DESCRIPTOR.fields_by_name
+        lazy = {fields[name].number: [] for name in LAZY_FIELDS}
+        view = memoryview(data)
+        header = bytearray()
+        for number, start, value_start, end in _walk(data):
+            if number in lazy:
+                lazy[number].append(view[value_start:end])
+            else:
+                header += view[start:end]
+        sections = {}
+        for name in LAZY_FIELDS:
+            message_cls = fields[name].message_type._concrete_class
+            sections[name] = LazyMessages(lambda raw, message_cls=message_cls: message_cls.FromString(bytes(raw)), lazy[fields[name].number])
+        return cls(objs.ScheduleTelemetry.FromString(bytes(header)), **sections)
+
+
+    @classmethod
+    def from_dict(cls, body):
+        """View a ScheduleTelemetry already loaded from JSON.  The entries of the lazy sections are only converted to messages when accessed.
+
+        :param body: The telemetry as a JSON dict
+        :type body: dict
+        :rtype: TelemetryView
+        """
+        fields = objs.ScheduleTelemetry.DESCRIPTOR.fields_by_name
+        body = dict(body)
+        sections = {}
+        for name in LAZY_FIELDS:
+            message_cls = fields[name].message_type._concrete_class
+            entries = body.pop(name, None) or []
+            sections[name] = LazyMessages(lambda d, message_cls=message_cls: ParseDict(d, message_cls(), ignore_unknown_fields=True), entries)
+        header = ParseDict(body, objs.ScheduleTelemetry(), ignore_unknown_fields=True)
+        return cls(header, **sections)
+
+
+    @classmethod
+    def from_message(cls, telemetry: objs.ScheduleTelemetry):
+        return cls.from_bytes(telemetry.SerializePartialToString())
+
+
+    @classmethod
+    def from_result(cls, content, content_type):
+        """View the ``telemetry`` of a ScheduleResult response body.  A binary body is walked field by field, so its ``schedule`` is skipped without being decoded.  A JSON body has to be parsed whole, ``schedule`` included, and only the conversion of the telemetry entries to messages is deferred.
+
+        :param content: The raw response body, either binary protobuf or JSON
+        :type content: bytes
+        :param content_type: The response ``Content-Type`` header
+        :type content_type: string
+        :rtype: TelemetryView
+        """
+        if not wire.is_protobuf(content_type):
+            return cls.from_dict(json.loads(content).get('telemetry') or {})
+        number = objs.ScheduleResult.DESCRIPTOR.fields_by_name['telemetry'].number
+        # A message field that occurs more than once is merged, so concatenating every occurrence gives the same result as the parser
+        data = b''.join(content[value_start:end] for n, start, value_start, end in _walk(content) if n == number)
+        return cls.from_bytes(data)
+
+
+    def __getattr__(self, name):
+        if name == 'header':
+            raise AttributeError(name)
+        return getattr(self.header, name)
+
+
+    def to_message(self):
+        """Decode everything into a complete ScheduleTelemetry.
+
+        :rtype: ScheduleTelemetry
+        """
+        telemetry = objs.ScheduleTelemetry()
+        telemetry.CopyFrom(self.header)
+        for name in LAZY_FIELDS:
+            getattr(telemetry, name).extend(getattr(self, name))
+        return telemetry
@@ -0,0 +1,383 @@
+import json
+import logging
+import os
+import threading
+import numpy as np
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+DAY = 86400
+
+# One row per schedule run.  start, end and the totals come from ScheduleTelemetry, everything else from its SystemTelemetry.
+RUN_COLUMNS = (
+    ('start', '<i8'),
+    ('end', '<i8'),
+    ('totalTaskCount', '<i8'),
+    ('totalAllocatedSeconds', '<i8'),
+    ('computeSeconds', '<i8'),
+    ('customerSuccessScoreMean', '<f8'),
+    ('customerSuccessScoreMin', '<f8'),
+    ('customerSuccessScoreLowerQuartile', '<f8'),
+    ('customerSuccessScoreMedian', '<f8'),
+    ('customerSuccessScoreUpperQuartile', '<f8'),
+    ('customerSuccessScoreMax', '<f8'),
+    ('totalDataThroughput', '<f8'),
+)
+
+_TELEMETRY_COLUMNS = ('start', 'end', 'totalTaskCount', 'totalAllocatedSeconds')
+
+# One row per user per schedule run.  ``run`` is the row of the run and ``user`` a code into the user ids.
+USER_COLUMNS = (
+    ('run', '<i8'),
+    ('user', '<i4'),
+    ('score', '<f8'),
+    ('giniScore', '<f8'),
+    ('totalTaskCount', '<i8'),
+    ('totalAllocatedSeconds', '<i8'),
+)
+
+STATS = ('count', 'sum', 'mean', 'std', 'slope')
+
+
+def _read_lines(path):
+    """Read a JSON-lines dictionary, ignoring a final line left incomplete by an interrupted append."""
+    if not os.path.exists(path):
+        return [], 0
+    with open(path, 'rb') as f:
+        data = f.read()
+    size = data.rfind(b'\n') + 1
+    return [json.loads(line) for line in data[:size].splitlines()], size
+
+
+def _truncate(path, size):
+    if os.path.exists(path) and os.path.getsize(path) > size:
+        with open(path, 'r+b') as f:
+            f.truncate(size)
+
+
+def rolling(times, values, window, stat='mean'):
+    """Aggregate ``values`` over a trailing time window ending at each of ``times``, i.e. over every point with a time in ``(times[i] - window, times[i]]``.  Every window is computed at once from running sums, so the cost is linear in the number of points whatever the window.
+
+    :param times: Sorted timestamps, in seconds
+    :type times: numpy.ndarray
+    :param values: One value per timestamp
+    :type values: numpy.ndarray
+    :param window: The window length, in seconds
+    :type window: int
+    :param stat: One of 'count', 'sum', 'mean', 'std' or 'slope'.  'slope' is the least-squares trend of the values, per day (NaN while a window holds fewer than two distinct times).
+    :type stat: string
+    :rtype: numpy.ndarray
+    """
+    if stat not in STATS:
+        raise Exception(f'Unknown statistic {stat}.  Use one of: {", ".join(STATS)}')
+    times = np.asarray(times)
+    values = np.asarray(values, dtype=np.float64)
+    lo = np.searchsorted(times, times - window, side='right')
+    hi = np.arange(1, len(times) + 1)
+    count = hi - lo
+    if stat == 'count':
+        return count
+
+    def windowed(x):
+        sums = np.concatenate(([0.0], np.cumsum(x)))
+        return sums[hi] - sums[lo]
+
+    total = windowed(values)
+    if stat == 'sum':
+        return total
+    mean = total / count
+    if stat == 'mean':
+        return mean
+    if stat == 'std':
+        return np.sqrt(np.maximum(windowed(values * values) / count - mean * mean, 0.0))
+    # Days since the first point keep the running sums of t * t well inside float64 precision
+    t = (times - (times[0] if len(times) else 0)) / DAY
+    st = windowed(t)
+    denom = count * windowed(t * t) - st * st
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (count * windowed(t * values) - st * total) / denom
+    return np.where(denom > 1e-12 * np.maximum(count * count, 1), slope, np.nan)
+
+
+class TelemetryHistory(object):
+    "An append-only, columnar history of ScheduleTelemetry KPIs kept in a directory.  Each column is a flat little-endian file that appends add to and queries memory-map, so trend queries over thousands of runs are NumPy operations on whole columns and never re-parse a ScheduleTelemetry.  A run becomes visible only once its ``scheduleRunId`` is written, which happens last; an append interrupted before that is discarded the next time the history is opened."
+
+
+    def __init__(self, path):
+        """
+        :param path: The directory holding the history.  It is created if it does not exist.
+        :type path: string
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._cache = {}
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta['version'] != FORMAT_VERSION:
+                raise Exception(f'Unsupported telemetry history version {meta["version"]}')
+        else:
+            with open(meta_path, 'w') as f:
+                json.dump({'version': FORMAT_VERSION}, f)
+        self._recover()
+
+
+    def _file(self, table, name):
+        return os.path.join(self.path, f'{table}.{name}.bin')
+
+
+    def _recover(self):
+        """Load the dictionaries and cut every file back to the last complete append."""
+        run_ids, size = _read_lines(os.path.join(self.path, 'run_ids.jsonl'))
+        _truncate(os.path.join(self.path, 'run_ids.jsonl'), size)
+        user_ids, size = _read_lines(os.path.join(self.path, 'user_ids.jsonl'))
+        _truncate(os.path.join(self.path, 'user_ids.jsonl'), size)
+        self._run_ids = run_ids
+        self._run_lookup = {run_id: i for i, run_id in enumerate(run_ids)}
+        self._user_ids = user_ids
+        self._user_lookup = {user_id: i for i, user_id in enumerate(user_ids)}
+        for name, dtype in RUN_COLUMNS:
+            _truncate(self._file('runs', name), len(run_ids) * np.dtype(dtype).itemsize)
+        rows = min(self._file_rows('users', name, dtype) for name, dtype in USER_COLUMNS)
+        run = self._map('users', 'run', '<i8', rows)
+        self._user_rows = int(np.searchsorted(run, len(run_ids)))
+        for name, dtype in USER_COLUMNS:
+            _truncate(self._file('users', name), self._user_rows * np.dtype(dtype).itemsize)
+
+
+    def _file_rows(self, table, name, dtype):
+        path = self._file(table, name)
+        return os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0
+
+
+    def _map(self, table, name, dtype, rows):
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._file(table, name), dtype=dtype, mode='r', shape=(rows,))
+
+
+    def _column(self, table, name):
+        key = (table, name)
+        if key not in self._cache:
+            dtype = dict(RUN_COLUMNS if table == 'runs' else USER_COLUMNS)[name]
+            self._cache[key] = self._map(table, name, dtype, len(self) if table == 'runs' else self._user_rows)
+        return self._cache[key]
+
+
+    def _order(self):
+        """The run rows sorted by ``start``."""
+        if 'order' not in self._cache:
+            self._cache['order'] = np.argsort(self._column('runs', 'start'), kind='stable')
+        return self._cache['order']
+
+
+    def __len__(self):
+        return len(self._run_ids)
+
+
+    def __contains__(self, schedule_run_id):
+        return schedule_run_id in self._run_lookup
+
+
+    @property
+    def user_ids(self):
+        """Every userId seen so far.
+
+        :rtype: list
+        """
+        return list(self._user_ids)
+
+
+    def append(self, telemetry):
+        """Add the KPIs of one schedule run.  A run already in the history is ignored.
+
+        :param telemetry: A ScheduleTelemetry, or the TelemetryView returned by ``CcmApi.get_schedule_telemetry``
+        :return: True if the run was added
+        :rtype: bool
+        """
+        return self.extend([telemetry]) == 1
+
+
+    def extend(self, telemetries):
+        """Add the KPIs of many schedule runs in a single append.  Runs already in the history, or repeated within ``telemetries``, are ignored.
+
+        :param telemetries: ScheduleTelemetry or TelemetryView objects
+        :type telemetries: iterable
+        :return: The number of runs added
+        :rtype: int
+        """
+        with self._lock:
+            run_ids = []
+            seen = set()
+            runs = {name: [] for name, dtype in RUN_COLUMNS}
+            users = {name: [] for name, dtype in USER_COLUMNS}
+            new_users = []
+            new_codes = {}
+            for telemetry in telemetries:
+                run_id = telemetry.scheduleRunId
+                if run_id in self._run_lookup or run_id in seen:
+                    continue
+                seen.add(run_id)
+                row = len(self._run_ids) + len(run_ids)
+                run_ids.append(run_id)
+                for name, dtype in RUN_COLUMNS:
+                    source = telemetry if name in _TELEMETRY_COLUMNS else telemetry.system
+                    runs[name].append(getattr(source, name))
+                for user in telemetry.users:
+                    code = self._user_lookup.get(user.userId, new_codes.get(user.userId))
+                    if code is None:
+                        code = new_codes[user.userId] = len(self._user_ids) + len(new_users)
+                        new_users.append(user.userId)
+                    users['run'].append(row)
+                    users['user'].append(code)
+                    for name in ('score', 'giniScore', 'totalTaskCount', 'totalAllocatedSeconds'):
+                        users[name].append(getattr(user, name))
+            if not run_ids:
+                return 0
+            try:
+                self._append_lines('user_ids.jsonl', new_users)
+                for name, dtype in USER_COLUMNS:
+                    self._append_column('users', name, np.asarray(users[name], dtype=dtype))
+                for name, dtype in RUN_COLUMNS:
+                    self._append_column('runs', name, np.asarray(runs[name], dtype=dtype))
+                self._append_lines('run_ids.jsonl', run_ids)
+            except Exception:
+                self._recover()
+                self._cache = {}
+                raise
+            # New userIds only get their codes once their rows are safely written
+            self._user_ids.extend(new_users)
+            self._user_lookup.update(new_codes)
+            for run_id in run_ids:
+                self._run_lookup[run_id] = len(self._run_ids)
+                self._run_ids.append(run_id)
+            self._user_rows += len(users['run'])
+            self._cache = {}
+            return len(run_ids)
+
+
+    def _append_lines(self, name, values):
+        if values:
+            with open(os.path.join(self.path, name), 'a') as f:
+                f.write(''.join(json.dumps(v) + '\n' for v in values))
+
+
+    def _append_column(self, table, name, array):
+        with open(self._file(table, name), 'ab') as f:
+            f.write(array.tobytes())
+
+
+    def _window(self, start, end):
+        """The run rows overlapping ``[start, end)``, in order of ``start``."""
+        order = self._order()
+        mask = np.ones(len(order), dtype=bool)
+        if start is not None:
+            mask &= self._column('runs', 'end')[order] > start
+        if end is not None:
+            mask &= self._column('runs', 'start')[order] < end
+        return order[mask]
+
+
+    def runs(self, start=None, end=None, columns=None):
+        """The KPIs of every run overlapping ``[start, end)``, in order of run ``start``.
+
+        :param start: Only runs ending after this timestamp
+        :type start: int
+        :param end: Only runs starting before this timestamp
+        :type end: int
+        :param columns: The names from ``RUN_COLUMNS`` to return.  Defaults to all of them.
+        :type columns: list
+        :return: ``scheduleRunId`` and each requested column, as arrays of equal length
+        :rtype: dict
+        """
+        rows = self._window(start, end)
+        result = {'scheduleRunId': np.array(self._run_ids, dtype=object)[rows]}
+        for name in columns or [name for name, dtype in RUN_COLUMNS]:
+            result[name] = np.asarray(self._column('runs', name)[rows])
+        return result
+
+
+    def _user_rows_sorted(self, user_id):
+        """The user table rows of ``user_id``, in order of their run's ``start``, and the run row of each."""
+        code = self._user_lookup.get(user_id)
+        if code is None or code >= len(self._user_ids):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        rows = np.flatnonzero(self._column('users', 'user') == code)
+        run = np.asarray(self._column('users', 'run')[rows])
+        by_start = np.argsort(self._column('runs', 'start')[run], kind='stable')
+        return rows[by_start], run[by_start]
+
+
+    def user(self, user_id, start=None, end=None):
+        """The score, giniScore and totals of one user in every run overlapping ``[start, end)`` that included them, in order of run ``start``.
+
+        :param user_id: The userId
+        :type user_id: string
+        :param start: Only runs ending after this timestamp
+        :type start: int
+        :param end: Only runs starting before this timestamp
+        :type end: int
+        :return: ``scheduleRunId``, the run ``start`` and ``end``, and every user column, as arrays of equal length
+        :rtype: dict
+        """
+        rows, run = self._user_rows_sorted(user_id)
+        mask = np.ones(len(rows), dtype=bool)
+        if start is not None:
+            mask &= self._column('runs', 'end')[run] > start
+        if end is not None:
+            mask &= self._column('runs', 'start')[run] < end
+        rows, run = rows[mask], run[mask]
+        result = {
+            'scheduleRunId': np.array(self._run_ids, dtype=object)[run],
+            'start': np.asarray(self._column('runs', 'start')[run]),
+            'end': np.asarray(self._column('runs', 'end')[run]),
+        }
+        for name, dtype in USER_COLUMNS[2:]:
+            result[name] = np.asarray(self._column('users', name)[rows])
+        return result
+
+
+    def rolling(self, column, window, stat='mean', user_id=None, start=None, end=None):
+        """A trailing rolling-window statistic of a KPI, by run ``start``.  Windows are computed over the whole history, so those at the beginning of ``[start, end)`` still include the runs before it.
+
+        :param column: A name from ``RUN_COLUMNS``, or from ``USER_COLUMNS`` if ``user_id`` is given
+        :type column: string
+        :param window: The window length, in seconds, e.g. ``7 * DAY``
+        :type window: int
+        :param stat: One of 'count', 'sum', 'mean', 'std' or 'slope' (the trend per day).  See ``rolling``.
+        :type stat: string
+        :param user_id: Compute the statistic over this user's runs
+        :type user_id: string
+        :param start: Only report runs ending after this timestamp
+        :type start: int
+        :param end: Only report runs starting before this timestamp
+        :type end: int
+        :return: ``scheduleRunId``, ``start`` and the statistic at each run, as arrays of equal length
+        :rtype: dict
+        """
+        if user_id is None:
+            run = self._order()
+            values = self._column('runs', column)[run]
+        else:
+            rows, run = self._user_rows_sorted(user_id)
+            values = self._column('users', column)[rows]
+        times = np.asarray(self._column('runs', 'start')[run])
+        stats = rolling(times, values, window, stat)
+        mask = np.ones(len(run), dtype=bool)
+        if start is not None:
+            mask &= self._column('runs', 'end')[run] > start
+        if end is not None:
+            mask &= times < end
+        return {
+            'scheduleRunId': np.array(self._run_ids, dtype=object)[run[mask]],
+            'start': times[mask],
+            stat: stats[mask],
+        }
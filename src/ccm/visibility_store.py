@@ -0,0 +1,332 @@
+import itertools
+import json
+import logging
+import os
+import numpy as np
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+VisibilityPropertyType = objs.VisibilityProperty.VisibilityPropertyType
+
+FORMAT_VERSION = 2
+
+# How many visibilities are held in memory at once while writing a store
+CHUNK_ROWS = 65536
+
+
+def _save(path, name, array):
+    np.save(os.path.join(path, f'{name}.npy'), array)
+
+
+def _save_gathered(path, name, column, order, chunk_rows):
+    """Save ``column[order]`` without materializing it, ``chunk_rows`` elements at a time."""
+    if len(order) == 0:
+        _save(path, name, np.empty(0, dtype=column.dtype))
+        return
+    out = np.lib.format.open_memmap(os.path.join(path, f'{name}.npy'), mode='w+', dtype=column.dtype, shape=(len(order),))
+    for i in range(0, len(order), chunk_rows):
+        out[i:i + chunk_rows] = column[order[i:i + chunk_rows]]
+    out.flush()
+    del out
+
+
+class _Spill(object):
+    "Raw, append-only column files that ``write_visibility_store`` fills chunk by chunk before sorting them into the store."
+
+
+    def __init__(self, path):
+        self.path = path
+        self._files = {}
+
+
+    def _file(self, name):
+        return os.path.join(self.path, f'{name}.spill')
+
+
+    def append(self, name, array):
+        f = self._files.get(name)
+        if f is None:
+            f = self._files[name] = open(self._file(name), 'wb')
+        f.write(np.ascontiguousarray(array).tobytes())
+
+
+    def load(self, name, dtype):
+        """Map a spilled column, once every chunk has been appended."""
+        f = self._files.get(name)
+        if f is not None and not f.closed:
+            f.close()
+        if f is None or os.path.getsize(self._file(name)) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode='r')
+
+
+    def remove(self):
+        for name, f in self._files.items():
+            f.close()
+            os.remove(self._file(name))
+        self._files = {}
+
+
+def _save_ids(path, lengths, data, order, chunk_rows):
+    """Save the ``visibilityId`` offsets and bytes columns in ``order``, gathering the bytes ``chunk_rows`` ids at a time."""
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    sorted_lengths = lengths[order]
+    sorted_offsets = np.concatenate(([0], np.cumsum(sorted_lengths)))
+    _save(path, 'id_offsets', sorted_offsets)
+    total = int(sorted_offsets[-1])
+    if total == 0:
+        _save(path, 'id_data', np.empty(0, dtype=np.uint8))
+        return
+    out = np.lib.format.open_memmap(os.path.join(path, 'id_data.npy'), mode='w+', dtype=np.uint8, shape=(total,))
+    for i in range(0, len(order), chunk_rows):
+        rows = order[i:i + chunk_rows]
+        counts = sorted_lengths[i:i + chunk_rows]
+        lo, hi = int(sorted_offsets[i]), int(sorted_offsets[min(i + chunk_rows, len(order))])
+        # Byte j of the chunk comes from its id's start in the input plus its distance from that id's start in the output
+        index = np.repeat(offsets[rows] - (sorted_offsets[i:i + len(rows)] - lo), counts) + np.arange(hi - lo)
+        out[lo:hi] = data[index]
+    out.flush()
+    del out
+
+
+def _write_chunk(spill, chunk, first_row, site_lookup, norad_lookup, prop_lookups):
+    n = len(chunk)
+    spill.append('start', np.fromiter((v.startTimestamp for v in chunk), dtype=np.int64, count=n))
+    spill.append('end', np.fromiter((v.endTimestamp for v in chunk), dtype=np.int64, count=n))
+    spill.append('site', np.fromiter((site_lookup.setdefault(v.siteId, len(site_lookup)) for v in chunk), dtype=np.int32, count=n))
+    spill.append('norad', np.fromiter((norad_lookup.setdefault(v.noradId, len(norad_lookup)) for v in chunk), dtype=np.int32, count=n))
+    ids = [v.visibilityId.encode('utf-8') for v in chunk]
+    spill.append('id_lengths', np.fromiter((len(b) for b in ids), dtype=np.int64, count=n))
+    spill.append('id_data', np.frombuffer(b''.join(ids), dtype=np.uint8))
+    props = {}
+    for row, v in enumerate(chunk, first_row):
+        for pos, p in enumerate(v.props):
+            cols = props.setdefault(p.vtype, ([], [], [], [], []))
+            cols[0].append(row)
+            cols[1].append(pos)
+            cols[2].append(int(p.bval) if p.HasField('bval') else -1)
+            cols[3].append(p.dval if p.HasField('dval') else np.nan)
+            lookup = prop_lookups.setdefault(VisibilityPropertyType.Name(p.vtype), {})
+            cols[4].append(lookup.setdefault(p.sval, len(lookup)) if p.HasField('sval') else -1)
+    for vtype, (rows, pos, bval, dval, sval) in props.items():
+        name = VisibilityPropertyType.Name(vtype)
+        spill.append(f'prop_{name}_rows', np.asarray(rows, dtype=np.int64))
+        spill.append(f'prop_{name}_pos', np.asarray(pos, dtype=np.int32))
+        spill.append(f'prop_{name}_bval', np.asarray(bval, dtype=np.int8))
+        spill.append(f'prop_{name}_dval', np.asarray(dval, dtype=np.float64))
+        spill.append(f'prop_{name}_sval', np.asarray(sval, dtype=np.int32))
+
+
+def write_visibility_store(path, visibilities, chunk_rows=CHUNK_ROWS):
+    """Write Visibilities to an on-disk columnar store at ``path`` (a directory, created if needed).
+
+    Rows are sorted by (``noradId``, ``siteId``, ``startTimestamp``).  Times are fixed-width int64 columns, ``siteId``/``noradId`` are dictionary-encoded int32 codes, ``visibilityId`` is an offsets + bytes column, and ``props`` are split into one sparse table per VisibilityPropertyType.  Visibilities are consumed ``chunk_rows`` at a time and their columns spilled to disk, so only the sort order and per-row offsets are ever held in memory for the whole input.
+
+    :param path: The directory to write
+    :type path: string
+    :param visibilities: Visibility objects, e.g. ``ConstellationState.visibilities`` or the output of a streaming reader
+    :type visibilities: iterable
+    :param chunk_rows: How many visibilities to hold in memory at once
+    :type chunk_rows: int
+    :return: The number of visibilities written
+    :rtype: int
+    """
+    os.makedirs(path, exist_ok=True)
+    spill = _Spill(path)
+    try:
+        site_lookup = {}
+        norad_lookup = {}
+        prop_lookups = {}
+        n = 0
+        visibilities = iter(visibilities)
+        while True:
+            chunk = list(itertools.islice(visibilities, chunk_rows))
+            if not chunk:
+                break
+            _write_chunk(spill, chunk, n, site_lookup, norad_lookup, prop_lookups)
+            n += len(chunk)
+        start = spill.load('start', np.int64)
+        site_codes = spill.load('site', np.int32)
+        norad_codes = spill.load('norad', np.int32)
+        order = np.lexsort((start, site_codes, norad_codes))
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.arange(n)
+        _save_gathered(path, 'start', start, order, chunk_rows)
+        _save_gathered(path, 'end', spill.load('end', np.int64), order, chunk_rows)
+        _save_gathered(path, 'site', site_codes, order, chunk_rows)
+        _save_gathered(path, 'norad', norad_codes, order, chunk_rows)
+        _save_ids(path, spill.load('id_lengths', np.int64), spill.load('id_data', np.uint8), order, chunk_rows)
+        _save(path, 'norad_offsets', np.concatenate(([0], np.cumsum(np.bincount(norad_codes, minlength=len(norad_lookup))))))
+        site_order = np.lexsort((start[order], site_codes[order]))
+        _save(path, 'site_order', site_order)
+        _save(path, 'site_offsets', np.concatenate(([0], np.cumsum(np.bincount(site_codes, minlength=len(site_lookup))))))
+        for name in prop_lookups:
+            rows = rank[spill.load(f'prop_{name}_rows', np.int64)]
+            pos = spill.load(f'prop_{name}_pos', np.int32)
+            by_row = np.lexsort((pos, rows))
+            _save(path, f'prop_{name}_rows', rows[by_row])
+            _save_gathered(path, f'prop_{name}_pos', pos, by_row, chunk_rows)
+            _save_gathered(path, f'prop_{name}_bval', spill.load(f'prop_{name}_bval', np.int8), by_row, chunk_rows)
+            _save_gathered(path, f'prop_{name}_dval', spill.load(f'prop_{name}_dval', np.float64), by_row, chunk_rows)
+            _save_gathered(path, f'prop_{name}_sval', spill.load(f'prop_{name}_sval', np.int32), by_row, chunk_rows)
+    finally:
+        spill.remove()
+    meta = {
+        'version': FORMAT_VERSION,
+        'count': n,
+        'site_ids': list(site_lookup),
+        'norad_ids': list(norad_lookup),
+        'props': {name: list(lookup) for name, lookup in prop_lookups.items()},
+    }
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    return n
+
+
+class VisibilityProps(object):
+    "The sparse column table of one VisibilityPropertyType: the store ``rows`` that carry it (a row carrying it more than once appears once per property) and, per entry, its ``pos`` within ``Visibility.props``, ``bval`` (-1 if unset), ``dval`` (NaN if unset) and ``sval`` codes into ``sval_categories`` (-1 if unset)."
+
+    def __init__(self, rows, pos, bval, dval, sval, sval_categories):
+        self.rows = rows
+        self.pos = pos
+        self.bval = bval
+        self.dval = dval
+        self.sval = sval
+        self.sval_categories = sval_categories
+
+
+class VisibilityStore(object):
+    "A read-only, memory-mapped view of a store written by ``write_visibility_store``.  Columns are mapped rather than read, so any number of worker processes opening the same store share one copy in the page cache, and only the pages a query touches are ever loaded."
+
+
+    def __init__(self, path):
+        """
+        :param path: The directory written by ``write_visibility_store``
+        :type path: string
+        """
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['version'] != FORMAT_VERSION:
+            raise Exception(f'Unsupported visibility store version {meta["version"]}')
+        self.count = meta['count']
+        self.site_ids = np.array(meta['site_ids'], dtype=object)
+        self.norad_ids = np.array(meta['norad_ids'], dtype=object)
+        self._site_lookup = {s: i for i, s in enumerate(meta['site_ids'])}
+        self._norad_lookup = {s: i for i, s in enumerate(meta['norad_ids'])}
+        self._prop_meta = meta['props']
+        self._props = {}
+        self.start = self._load('start')
+        self.end = self._load('end')
+        self.site = self._load('site')
+        self.norad = self._load('norad')
+        self.id_offsets = self._load('id_offsets')
+        self.id_data = self._load('id_data')
+        self.norad_offsets = self._load('norad_offsets')
+        self.site_order = self._load('site_order')
+        self.site_offsets = self._load('site_offsets')
+
+
+    def _load(self, name):
+        return np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+
+
+    def __len__(self):
+        return self.count
+
+
+    def visibility_id(self, row):
+        """The ``visibilityId`` of one row."""
+        return bytes(self.id_data[self.id_offsets[row]:self.id_offsets[row + 1]]).decode('utf-8')
+
+
+    def norad_rows(self, norad_id):
+        """The rows of one spacecraft, as a contiguous slice sorted by (``siteId``, ``startTimestamp``).
+
+        :rtype: slice
+        """
+        i = self._norad_lookup.get(norad_id)
+        if i is None:
+            return slice(0, 0)
+        return slice(int(self.norad_offsets[i]), int(self.norad_offsets[i + 1]))
+
+
+    def site_rows(self, site_id):
+        """The rows of one ground site, sorted by ``startTimestamp``.
+
+        :rtype: numpy.ndarray
+        """
+        i = self._site_lookup.get(site_id)
+        if i is None:
+            return np.empty(0, dtype=np.int64)
+        return self.site_order[self.site_offsets[i]:self.site_offsets[i + 1]]
+
+
+    def pair_rows(self, norad_id, site_id):
+        """The rows of one spacecraft at one ground site, as a contiguous slice sorted by ``startTimestamp``.
+
+        :rtype: slice
+        """
+        rows = self.norad_rows(norad_id)
+        code = self._site_lookup.get(site_id)
+        if code is None or rows.stop == rows.start:
+            return slice(0, 0)
+        sites = self.site[rows]
+        lo = int(np.searchsorted(sites, code, side='left'))
+        hi = int(np.searchsorted(sites, code, side='right'))
+        return slice(rows.start + lo, rows.start + hi)
+
+
+    def props(self, vtype):
+        """The sparse column table of one VisibilityPropertyType, or None if no visibility carries it.
+
+        :param vtype: e.g. ``VisibilityPropertyType.ELEVATION``
+        :type vtype: VisibilityProperty.VisibilityPropertyType
+        :rtype: VisibilityProps
+        """
+        name = VisibilityPropertyType.Name(vtype)
+        if name not in self._prop_meta:
+            return None
+        if name not in self._props:
+            self._props[name] = VisibilityProps(
+                self._load(f'prop_{name}_rows'),
+                self._load(f'prop_{name}_pos'),
+                self._load(f'prop_{name}_bval'),
+                self._load(f'prop_{name}_dval'),
+                self._load(f'prop_{name}_sval'),
+                np.array(self._prop_meta[name], dtype=object))
+        return self._props[name]
+
+
+    def to_visibility(self, row) -> objs.Visibility:
+        """Materialize one row as a Visibility, including its props.
+
+        :rtype: Visibility
+        """
+        v = objs.Visibility(
+            visibilityId=self.visibility_id(row),
+            siteId=self.site_ids[self.site[row]],
+            noradId=self.norad_ids[self.norad[row]],
+            startTimestamp=int(self.start[row]),
+            endTimestamp=int(self.end[row]))
+        entries = []
+        for name in self._prop_meta:
+            vtype = VisibilityPropertyType.Value(name)
+            table = self.props(vtype)
+            lo = int(np.searchsorted(table.rows, row, side='left'))
+            hi = int(np.searchsorted(table.rows, row, side='right'))
+            entries.extend((int(table.pos[i]), vtype, table, i) for i in range(lo, hi))
+        for pos, vtype, table, i in sorted(entries, key=lambda e: e[0]):
+            p = v.props.add(vtype=vtype)
+            if table.bval[i] >= 0:
+                p.bval = bool(table.bval[i])
+            if not np.isnan(table.dval[i]):
+                p.dval = float(table.dval[i])
+            if table.sval[i] >= 0:
+                p.sval = table.sval_categories[table.sval[i]]
+        return v
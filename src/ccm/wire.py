@@ -0,0 +1,77 @@
+import json
+import logging
+from src.ccm.lazy import lazy_import
+
+json_format = lazy_import('google.protobuf.json_format')
+converters = lazy_import('src.ccm.converters')
+
+__author__ = "Kyle Polich"
+__copyright__ = "Atlas Space Operations"
+__license__ = "MIT"
+
+_logger = logging.getLogger(__name__)
+
+JSON = 'json'
+PROTOBUF = 'protobuf'
+
+CONTENT_TYPES = {
+    JSON: 'application/json',
+    PROTOBUF: 'application/x-protobuf',
+}
+
+
+def accept_header(wire_format):
+    """Get the ``Accept`` header value requesting the given wire format.
+
+    :param wire_format: Either ``json`` or ``protobuf``
+    :type wire_format: string
+    :return: A MIME type
+    :rtype: string
+    """
+    if wire_format not in CONTENT_TYPES:
+        raise ValueError(f'Unknown wire format {wire_format}')
+    return CONTENT_TYPES[wire_format]
+
+
+def is_protobuf(content_type):
+    """Check if a response ``Content-Type`` carries binary protobuf.
+
+    :param content_type: The response ``Content-Type`` header, possibly with parameters
+    :type content_type: string
+    :rtype: bool
+    """
+    if not content_type:
+        return False
+    return content_type.split(';')[0].strip() == CONTENT_TYPES[PROTOBUF]
+
+
+def decode_message(message_cls, content, content_type):
+    """Decode a response body into a protobuf message of type ``message_cls``.
+
+    Binary payloads are parsed directly with ``FromString``; anything else is treated as JSON.  The server's ``Content-Type`` decides, so a server that ignores the ``Accept`` header still decodes correctly.
+
+    :param message_cls: A message class from ``schedule_pb2`` such as ``Schedule`` or ``ScheduleResult``
+    :param content: The raw response body
+    :type content: bytes
+    :param content_type: The response ``Content-Type`` header
+    :type content_type: string
+    :return: A message of type ``message_cls``
+    """
+    if is_protobuf(content_type):
+        return message_cls.FromString(content)
+    return json_format.ParseDict(json.loads(content), message_cls(), ignore_unknown_fields=True)
+
+
+def encode_message(message, wire_format):
+    """Encode a protobuf message for the given wire format.  The inverse of ``decode_message``.
+
+    :param message: Any protobuf message
+    :param wire_format: Either ``json`` or ``protobuf``
+    :type wire_format: string
+    :return: The encoded body and its ``Content-Type``
+    :rtype: tuple
+    """
+    if wire_format == PROTOBUF:
+        return message.SerializePartialToString(), CONTENT_TYPES[PROTOBUF]
+    body = json.dumps(converters.message_to_dict(message, preserving_proto_field_name=True))
+    return body.encode('utf-8'), CONTENT_TYPES[JSON]
@@ -7,4 +7,82 @@
     - https://docs.pytest.org/en/stable/writing_plugins.html
 """
 
-# import pytest
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src import schedule_pb2 as objs
+
+
+class StandInServer(object):
+    "A local stand-in for the CCM Server.  Tests register canned responses with ``route`` and inspect ``calls`` afterwards."
+
+    def __init__(self):
+        self.routes = {}
+        self.calls = []
+        self.ports = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            wbufsize = -1
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length) if length else b''
+                server.calls.append((self.command, self.path, dict(self.headers), body))
+                server.ports.append(self.client_address[1])
+                route = server.routes.get((self.command, self.path))
+                if callable(route):
+                    route = route(self.headers, body)
+                status, headers, payload = route or (404, {}, b'')
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = _handle
+            do_POST = _handle
+            do_PUT = _handle
+            do_DELETE = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d/' % self.httpd.server_address[1]
+
+    def route(self, method, path, status=200, headers=None, body=b''):
+        if callable(status):
+            self.routes[(method, path)] = status
+        else:
+            self.routes[(method, path)] = (status, headers or {}, body)
+
+
+@pytest.fixture
+def api_server():
+    server = StandInServer()
+    thread = threading.Thread(target=server.httpd.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+def build_schedule(tasks, run_id='run-1', score=1.0, **defaults):
+    """A Schedule with one ScheduledTask per dict of fields in ``tasks``.  Fields a task leaves out come from ``defaults``, then from a task of user ``u`` for 55555 on site-a, numbered by position."""
+    sch = objs.Schedule(scheduleRunId=run_id, score=score)
+    for i, fields in enumerate(tasks):
+        task = dict(taskId=f't{i}', userId='u', visibilityId=f'v{i}', noradId='55555', siteId='site-a', added_at_tier=1)
+        task.update(defaults)
+        task.update(fields)
+        sch.tasks.add(**task)
+    return sch
+
+
+@pytest.fixture
+def make_schedule():
+    return build_schedule
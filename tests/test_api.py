@@ -1,3 +1,5 @@
+import json
+
 import pytest
 
 from src.ccm.api import CcmApi
@@ -19,6 +21,12 @@ def test_get_api_host():
     assert ca.get_api_host() == 'https://zbikyifgak.execute-api.us-east-1.amazonaws.com/prod/'
 
 
+def test_set_api_host():
+    ca = CcmApi('test', api_host='http://localhost/')
+    ca.api_host = 'http://example.com/'
+    assert ca.get_api_host() == 'http://example.com/'
+
+
 def test_get_schedule_not_exists():
     fake_id = 'does-not-exist'
     ca = CcmApi('test')
@@ -74,6 +82,15 @@ def test_set_profile():
     assert resp['success']
 
 
+def test_set_profile_next_schedule_id(api_server):
+    ca = CcmApi('user', api_host=api_server.url)
+    ca.profile_store.create('ops')
+    api_server.route('PUT', '/current-profile', headers={'Content-Type': 'application/json'}, body=b'{"success": true}')
+    assert ca.set_profile('ops') == {'success': True, 'next_schedule_id': None}
+    api_server.route('PUT', '/current-profile', headers={'Content-Type': 'application/json'}, body=b'{"next_schedule_id": "run-7"}')
+    assert ca.set_profile('ops')['next_schedule_id'] == 'run-7'
+
+
 def test_profile():
     ca = CcmApi('test')
     resp = ca.set_profile('does-not-exist')
@@ -114,3 +131,65 @@ def test_create_exact_request_has_mock():
 
 
 
+
+
+def test_create_exact_requests_mock():
+    ca = CcmApi('test')
+    requests = [objs.ExactRequest(siteId='site', noradId=n, startTimestamp=1000, minDuration=60) for n in ['test', '55555']]
+    resp = ca.create_exact_requests(requests)
+    assert resp['success'] == False
+    assert [r['success'] for r in resp['results']] == [True, False]
+    assert resp['next_schedule_id'] == 'example'
+
+
+def test_create_exact_requests_chunks(api_server):
+    def respond(headers, body):
+        body = json.loads(body)
+        response = {'results': [{'success': True} for r in body['exactRequests']]}
+        if body['final']:
+            response['next_schedule_id'] = 'run-2'
+        return 200, {'Content-Type': 'application/json'}, json.dumps(response).encode()
+    api_server.route('POST', '/exact-requests', respond)
+    ca = CcmApi('user', api_host=api_server.url)
+    requests = [objs.ExactRequest(siteId='site', noradId='55555', startTimestamp=1000 * i, endTimestamp=1000 * i + 600, minDuration=300, visibilityId=f'vis-{i}') for i in range(50)]
+    resp = ca.create_exact_requests(requests, max_payload_bytes=2048)
+    assert resp['success'] == True
+    assert len(resp['results']) == 50
+    assert resp['next_schedule_id'] == 'run-2'
+    bodies = [json.loads(call[3]) for call in api_server.calls]
+    assert len(bodies) > 1
+    assert all(len(call[3]) <= 2048 for call in api_server.calls)
+    assert [b['final'] for b in bodies] == [False] * (len(bodies) - 1) + [True]
+    assert len({b['batchId'] for b in bodies}) == 1
+    assert [r['visibilityId'] for b in bodies for r in b['exactRequests']] == [f'vis-{i}' for i in range(50)]
+
+
+def test_create_exact_requests_stops_on_failure(api_server):
+    def respond(headers, body):
+        body = json.loads(body)
+        if body['final']:
+            return 500, {}, b''
+        response = {'results': [{'success': True} for r in body['exactRequests']]}
+        return 200, {'Content-Type': 'application/json'}, json.dumps(response).encode()
+    api_server.route('POST', '/exact-requests', respond)
+    ca = CcmApi('user', api_host=api_server.url)
+    requests = [objs.ExactRequest(siteId='site', noradId='55555', startTimestamp=1000 * i, endTimestamp=1000 * i + 600) for i in range(50)]
+    resp = ca.create_exact_requests(requests, max_payload_bytes=2048)
+    assert resp['success'] == False
+    assert resp['next_schedule_id'] is None
+    assert not any(r['success'] for r in resp['results'])
+    assert resp['results'][0]['msg'] == 'Batch not committed: HTTP 500'
+
+
+def test_create_exact_requests_result_count_mismatch(api_server):
+    def respond(headers, body):
+        body = json.loads(body)
+        response = {'results': [{'success': True} for r in body['exactRequests'][1:]], 'next_schedule_id': 'run-2'}
+        return 200, {'Content-Type': 'application/json'}, json.dumps(response).encode()
+    api_server.route('POST', '/exact-requests', respond)
+    ca = CcmApi('user', api_host=api_server.url)
+    requests = [objs.ExactRequest(siteId='site', noradId='55555', startTimestamp=1000 * i, endTimestamp=1000 * i + 600) for i in range(50)]
+    resp = ca.create_exact_requests(requests, max_payload_bytes=2048)
+    assert resp['success'] == False
+    assert len(api_server.calls) == 1
+    assert resp['results'][-1]['msg'].startswith('Batch not committed: Expected')
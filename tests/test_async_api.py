@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+
+from src.ccm.async_api import AsyncCcmApi
+from src.ccm.api import CcmApi
+from src.ccm.async_session import AsyncSession
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+def test_async_get_schedule_by_id():
+    async def run():
+        async with AsyncCcmApi('test') as ca:
+            return await ca.get_schedule_by_id('empty')
+    sch = asyncio.run(run())
+    assert type(sch) == objs.Schedule
+
+
+def test_async_profile_round_trip():
+    async def run():
+        async with AsyncCcmApi('test') as ca:
+            resp = await ca.create_preference_profile('temp')
+            assert resp['success']
+            resp = await ca.set_profile('temp')
+            assert resp['success']
+            assert ca.get_current_profile() == 'temp'
+            resp = await ca.delete_profile('temp')
+            assert resp['success']
+    asyncio.run(run())
+
+
+def test_async_bounded_concurrency(api_server):
+    api_server.route('GET', '/', body=b'{}')
+
+    async def run():
+        async with AsyncCcmApi('user', api_host=api_server.url, max_concurrency=4) as ca:
+            return await asyncio.gather(*[ca.get_server_version() for i in range(40)])
+    results = asyncio.run(run())
+    assert len(results) == 40
+    assert len(api_server.calls) == 40
+    assert len(set(api_server.ports)) <= 4
+
+
+def test_async_edit_and_score_profile():
+    upref = objs.UserPreference(userId='test', tier=1, label='count', constraintType=objs.UserPreference.ConstraintType.TruncatedGaussian,
+                                objective=objs.UserPreference.Objective.ContactCountPerDay, mu=4, sigma=1.0)
+    sch = objs.Schedule(scheduleRunId='run-1', score=1.0)
+    for i in range(4):
+        sch.tasks.add(taskId=f't{i}', userId='test', start=i * 6 * 3600, end=i * 6 * 3600 + 600, visibilityId='v',
+                      noradId='55555', siteId='site-a', added_at_tier=1)
+
+    async def run():
+        async with AsyncCcmApi('test') as ca:
+            await ca.create_preference_profile('temp')
+            async with ca.edit_profile('temp') as edit:
+                edit.add(upref)
+            assert edit.result['success']
+            assert [p.label for p in ca.client.profile_store.preferences('temp')] == ['count']
+            return await ca.score_profile(sch, 'temp', horizon=(0, 86400))
+    scores = asyncio.run(run())
+    assert scores['score'] == 1.0
+
+
+def test_async_many_calls_on_one_loop(api_server):
+    api_server.route('GET', '/profiles', headers={'Content-Type': 'application/json'}, body=b'[{"name": "default"}]')
+
+    async def run():
+        async with AsyncCcmApi('user', api_host=api_server.url, max_concurrency=2) as ca:
+            results = await asyncio.gather(*[ca.get_all_profiles() for i in range(500)])
+            # The server's handler threads are the only ones besides the loop's
+            assert [t.name for t in threading.enumerate() if t.name not in server_threads and 'process_request' not in t.name] == []
+            return results
+    server_threads = {t.name for t in threading.enumerate()}
+    results = asyncio.run(run())
+    assert results == [[{'name': 'default'}]] * 500
+    assert len(set(api_server.ports)) <= 2
+
+
+def test_async_leaves_given_client_alone(api_server):
+    body = b'[{"name": "default"}, {"name": "ops"}]'
+    api_server.route('GET', '/profiles', headers={'Content-Type': 'application/json', 'Transfer-Encoding': 'chunked'},
+                     body=b'%x\r\n%s\r\n0\r\n\r\n' % (len(body), body))
+    client = CcmApi('user', api_host=api_server.url)
+    store = client.profile_store
+
+    async def run():
+        async with AsyncSession() as session:
+            ca = AsyncCcmApi('user', client=client, session=session)
+            profiles = await ca.get_all_profiles()
+            await ca.close()
+            # A shared session stays open for its other users
+            assert await AsyncCcmApi('user', client=client, session=session).get_all_profiles() == profiles
+            return profiles
+    assert asyncio.run(run()) == [{'name': 'default'}, {'name': 'ops'}]
+    assert client.profile_store is store
+    assert client._session is None
+
+
+def test_async_create_exact_requests(api_server):
+    def exact_requests(headers, body):
+        n = len(json.loads(body)['exactRequests'])
+        return (200, {'Content-Type': 'application/json'}, json.dumps({'results': [{'success': True}] * n, 'next_schedule_id': 'run-2'}).encode())
+    api_server.route('POST', '/exact-requests', exact_requests)
+    requests = [objs.ExactRequest(noradId='55555', siteId='site-a', startTimestamp=i, endTimestamp=i + 300) for i in range(50)]
+
+    async def run():
+        async with AsyncCcmApi('user', api_host=api_server.url) as ca:
+            return await ca.create_exact_requests(requests, max_payload_bytes=1024)
+    resp = asyncio.run(run())
+    assert resp['success'] and resp['next_schedule_id'] == 'run-2'
+    assert len(api_server.calls) > 1
+    assert [json.loads(c[3])['final'] for c in api_server.calls][-1]
@@ -0,0 +1,54 @@
+import pytest
+
+from src.ccm.buffer import simulate_buffers
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+FillType = objs.BufferFillEvent.FillType
+
+
+def make_spacecraft(capacity, events):
+    return objs.Spacecraft(noradId='55555', bufferCapacity=capacity, downlinkSpeed=2.0, fillEvents=events)
+
+
+def fill(rate, lo, hi, entry=0.0):
+    return objs.BufferFillEvent(fillAmountOnEntry=entry, fillAmountOnExit=0.0, fillAmountPerSecond=rate,
+                                timeLow=lo, timeHigh=hi, ftype=FillType.TIME_WINDOW)
+
+
+def test_fill_and_downlink(make_schedule):
+    sim = simulate_buffers([make_spacecraft(100.0, [fill(1.0, 0, 200)])], make_schedule([dict(start=50, end=100)]), horizon=(0, 300))
+    series = sim.time_series('55555')
+    observed = {o.timestamp: o.percentBufferFill for o in series.observations}
+    assert observed == pytest.approx({0: 0.0, 50: 50.0, 100: 0.0, 200: 100.0, 300: 100.0})
+    assert sim.maximum_cumu_buffer_fill_percent[0] == pytest.approx(100.0)
+    assert not sim.detected_buffer_overflow('55555')
+
+
+def test_overflow(make_schedule):
+    sim = simulate_buffers([make_spacecraft(80.0, [fill(1.0, 0, 200, entry=10.0)])], make_schedule([dict(start=50, end=100)]), horizon=(0, 300))
+    assert sim.detected_buffer_overflow('55555')
+    assert sim.maximum_cumu_buffer_fill_percent[0] == pytest.approx(100.0)
+
+
+def test_flush_and_fleet(make_schedule):
+    flush = objs.BufferFillEvent(fillAmountOnEntry=0.0, fillAmountOnExit=0.0, fillAmountPerSecond=0.0,
+                                 timeLow=150, ftype=FillType.FLUSH_BUFFER)
+    other = objs.Spacecraft(noradId='44444', bufferCapacity=10.0, downlinkSpeed=1.0)
+    sim = simulate_buffers([make_spacecraft(1000.0, [fill(1.0, 0, 200), flush]), other], make_schedule([dict(start=50, end=100)]), horizon=(0, 300))
+    observed = {o.timestamp: o.percentBufferFill for o in sim.time_series('55555').observations}
+    assert observed[150] == 0.0
+    assert observed[200] == pytest.approx(5.0)
+    assert sim.maximum_cumu_buffer_fill_percent[1] == 0.0
+
+
+def test_event_straddling_horizon(make_schedule):
+    events = [fill(1.0, -100, 100, entry=30.0), objs.BufferFillEvent(fillAmountOnEntry=5.0, fillAmountOnExit=20.0, fillAmountPerSecond=0.5,
+                                                                       timeLow=250, timeHigh=400, ftype=FillType.TIME_WINDOW)]
+    sim = simulate_buffers([make_spacecraft(1000.0, events)], make_schedule([dict(start=50, end=100)]), horizon=(0, 300))
+    observed = {o.timestamp: o.percentBufferFill for o in sim.time_series('55555').observations}
+    # The entry amount belongs to before the horizon and the exit amount to after it; only the rates apply inside it
+    assert observed == pytest.approx({0: 0.0, 50: 5.0, 100: 0.0, 250: 0.5, 300: 3.0})
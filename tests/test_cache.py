@@ -0,0 +1,130 @@
+from src.ccm import wire
+from src.ccm.api import CcmApi
+from src.ccm.cache import ScheduleCache
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+TASKS = [dict(start=i, end=i + 1) for i in range(10)]
+
+
+def test_lru_eviction_by_bytes(make_schedule):
+    size = make_schedule(TASKS, 'a').ByteSize()
+    cache = ScheduleCache(max_bytes=2 * size)
+    cache.put('a', make_schedule(TASKS, 'a'))
+    cache.put('b', make_schedule(TASKS, 'b'))
+    assert cache.get('a') is not None
+    cache.put('c', make_schedule(TASKS, 'c'))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert cache.nbytes <= cache.max_bytes
+
+
+def test_disk_tier(tmp_path, make_schedule):
+    cache = ScheduleCache(max_bytes=0, disk_dir=str(tmp_path))
+    cache.put('run/1', make_schedule(TASKS, 'run/1'))
+    assert len(cache) == 0
+    reopened = ScheduleCache(disk_dir=str(tmp_path))
+    assert 'run/1' in reopened
+    assert reopened.get('run/1') == make_schedule(TASKS, 'run/1')
+
+
+def test_get_returns_a_copy(make_schedule):
+    cache = ScheduleCache()
+    schedule = make_schedule(TASKS, 'a')
+    cache.put('a', schedule)
+    schedule.tasks.pop()
+    cached = cache.get('a')
+    cached.tasks.pop()
+    assert cache.get('a') == make_schedule(TASKS, 'a')
+    assert cache.get('a', copy=False) is cache.get('a', copy=False)
+
+
+def test_disk_tier_is_bounded(tmp_path, make_schedule):
+    size = make_schedule(TASKS, 'run-0').ByteSize()
+    cache = ScheduleCache(max_bytes=0, disk_dir=str(tmp_path), max_disk_bytes=2 * size)
+    cache.put('run-0', make_schedule(TASKS, 'run-0'))
+    cache.put('run-1', make_schedule(TASKS, 'run-1'))
+    assert cache.get('run-0') is not None
+    cache.put('run-2', make_schedule(TASKS, 'run-2'))
+    assert len(list(tmp_path.glob('*.pb'))) == 2
+    assert cache.disk_nbytes <= cache.max_disk_bytes
+    assert 'run-1' not in cache
+    assert 'run-0' in cache and 'run-2' in cache
+    ScheduleCache(disk_dir=str(tmp_path), max_disk_bytes=size)
+    assert len(list(tmp_path.glob('*.pb'))) == 1
+
+
+def test_client_caches_by_default(api_server, make_schedule):
+    assert isinstance(CcmApi('user').schedule_cache, ScheduleCache)
+    assert CcmApi('user', schedule_cache=False).schedule_cache is None
+    body, content_type = wire.encode_message(make_schedule(TASKS, 'run-1'), wire.PROTOBUF)
+    api_server.route('GET', '/schedule/run-1', headers={'Content-Type': content_type}, body=body)
+    ca = CcmApi('user', api_host=api_server.url)
+    ca.get_schedule_by_id('run-1').tasks.pop()
+    assert ca.get_schedule_by_id('run-1') == make_schedule(TASKS, 'run-1')
+    assert len(api_server.calls) == 1
+
+
+def test_get_schedule_by_id_uses_cache(api_server, make_schedule):
+    body, content_type = wire.encode_message(make_schedule(TASKS, 'run-1'), wire.PROTOBUF)
+    api_server.route('GET', '/schedule/run-1', headers={'Content-Type': content_type}, body=body)
+    cache = ScheduleCache()
+    ca = CcmApi('user', api_host=api_server.url, schedule_cache=cache)
+    first = ca.get_schedule_by_id('run-1')
+    second = ca.get_schedule_by_id('run-1')
+    assert first == second
+    assert len(api_server.calls) == 1
+    assert cache.hits == 1
+
+
+def test_profiles_revalidate_with_etag(api_server):
+    body = b'[{"name": "default"}, {"name": "recovery_mode"}]'
+
+    def profiles(headers, request_body):
+        if headers.get('If-None-Match') == '"v1"':
+            return (304, {'ETag': '"v1"'}, b'')
+        return (200, {'ETag': '"v1"', 'Content-Type': 'application/json'}, body)
+    api_server.route('GET', '/profiles', profiles)
+    ca = CcmApi('user', api_host=api_server.url)
+    first = ca.get_all_profiles()
+    second = ca.get_all_profiles()
+    assert first == second == [{"name": "default"}, {"name": "recovery_mode"}]
+    assert 'If-None-Match' not in api_server.calls[0][2]
+    assert api_server.calls[1][2]['If-None-Match'] == '"v1"'
+
+
+def test_user_preferences_revalidate_with_last_modified(api_server):
+    stamp = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    body = b'[{"constraintType": "Logistic", "objective": "ContactMinutesPerDay", "tier": 1, "bias": 10, "shape": 2}]'
+
+    def prefs(headers, request_body):
+        if headers.get('If-Modified-Since') == stamp:
+            return (304, {}, b'')
+        return (200, {'Last-Modified': stamp}, body)
+    api_server.route('GET', '/profile/my%20profile/preferences', prefs)
+    ca = CcmApi('user', api_host=api_server.url)
+    first = ca.get_user_preferences('my profile')
+    second = ca.get_user_preferences('my profile')
+    assert first == second
+    assert first[0].bias == 10
+    assert api_server.calls[1][2]['If-Modified-Since'] == stamp
+
+
+def test_not_modified_after_eviction_refetches(api_server):
+    body = b'[{"name": "default"}]'
+    ca = CcmApi('user', api_host=api_server.url)
+
+    def profiles(headers, request_body):
+        if headers.get('If-None-Match') == '"v1"':
+            # The entry is dropped while the conditional request is in flight
+            ca.response_cache.invalidate()
+            return (304, {'ETag': '"v1"'}, b'')
+        return (200, {'ETag': '"v1"', 'Content-Type': 'application/json'}, body)
+    api_server.route('GET', '/profiles', profiles)
+    assert ca.get_all_profiles() == [{"name": "default"}]
+    assert ca.get_all_profiles() == [{"name": "default"}]
+    assert [c[2].get('If-None-Match') for c in api_server.calls] == [None, '"v1"', None]
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from src.ccm.conflicts import find_all_conflicts, find_conflicts
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+def random_tasks(n, seed):
+    rng = np.random.default_rng(seed)
+    tasks = []
+    for i in range(n):
+        start = int(rng.integers(0, 5000))
+        tasks.append(dict(start=start, end=start + int(rng.integers(0, 400)), noradId=str(55550 + i % 5), siteId=f'site-{i % 7}'))
+    return tasks
+
+
+def brute_force(sch, by):
+    pairs = set()
+    tasks = list(sch.tasks)
+    for i, a in enumerate(tasks):
+        for j, b in enumerate(tasks):
+            if i < j and getattr(a, by) == getattr(b, by) and a.start < b.end and b.start < a.end:
+                pairs.add((i, j))
+    return pairs
+
+
+@pytest.mark.parametrize('n', [0, 1, 2, 50, 300])
+@pytest.mark.parametrize('by', ['siteId', 'noradId'])
+def test_matches_brute_force(n, by, make_schedule):
+    sch = make_schedule(random_tasks(n, n))
+    conflicts = find_conflicts(sch, by)
+    found = {tuple(sorted(p)) for p in zip(conflicts.first.tolist(), conflicts.second.tolist())}
+    assert len(found) == len(conflicts)
+    assert found == brute_force(sch, by)
+    for resource, first, second in zip(conflicts.resource, conflicts.first, conflicts.second):
+        assert getattr(sch.tasks[first], by) == resource == getattr(sch.tasks[second], by)
+
+
+def test_grouped_and_overlap(make_schedule):
+    spans = [(0, 100, 'a'), (50, 120, 'a'), (100, 200, 'a'), (0, 500, 'b'), (10, 20, 'c')]
+    sch = make_schedule([dict(start=start, end=end, noradId=str(i), siteId=site) for i, (start, end, site) in enumerate(spans)])
+    conflicts = find_all_conflicts(sch)
+    by_site = conflicts['siteId']
+    grouped = by_site.grouped()
+    assert list(grouped) == ['a']
+    first, second = grouped['a']
+    assert sorted(zip(first.tolist(), second.tolist())) == [(0, 1), (1, 2)]
+    assert sorted(by_site.overlap.tolist()) == [20, 50]
+    assert len(conflicts['noradId']) == 0
@@ -0,0 +1,104 @@
+import math
+import random
+
+import pytest
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.json_format import MessageToDict
+
+from src.ccm import converters
+from src.ccm.converters import get_converter, message_to_dict
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+SPECIAL = [math.nan, math.inf, -math.inf, 0.0, -1.5, 1e300, 0.1]
+
+
+def scalar(field, rng):
+    t = field.type
+    if t == FieldDescriptor.TYPE_STRING:
+        return rng.choice(['', 'a', 'site-1', 'ü'])
+    if t == FieldDescriptor.TYPE_BOOL:
+        return rng.random() < 0.5
+    if t == FieldDescriptor.TYPE_ENUM:
+        return rng.choice(field.enum_type.values).number
+    if t in (FieldDescriptor.TYPE_DOUBLE, FieldDescriptor.TYPE_FLOAT):
+        return rng.choice(SPECIAL + [rng.uniform(-1e6, 1e6)])
+    if t == FieldDescriptor.TYPE_INT64:
+        return rng.choice([0, -1, 2 ** 62, rng.randint(-10 ** 12, 10 ** 12)])
+    return rng.randint(-1000, 1000)
+
+
+def fill(message, rng, depth=0):
+    for field in message.DESCRIPTOR.fields:
+        if rng.random() < 0.2:
+            continue
+        if field.message_type is not None and field.message_type.GetOptions().map_entry:
+            value_field = field.message_type.fields_by_name['value']
+            key_field = field.message_type.fields_by_name['key']
+            container = getattr(message, field.name)
+            for i in range(rng.randint(0, 3)):
+                key = scalar(key_field, rng) if key_field.type != FieldDescriptor.TYPE_STRING else f'k{i}'
+                if value_field.message_type is not None:
+                    fill(container[key], rng, depth + 1)
+                else:
+                    container[key] = scalar(value_field, rng)
+        elif field.label == FieldDescriptor.LABEL_REPEATED:
+            container = getattr(message, field.name)
+            for i in range(rng.randint(0, 3)):
+                if field.message_type is not None:
+                    fill(container.add(), rng, depth + 1)
+                else:
+                    container.append(scalar(field, rng))
+        elif field.message_type is not None:
+            fill(getattr(message, field.name), rng, depth + 1)
+        else:
+            setattr(message, field.name, scalar(field, rng))
+    return message
+
+
+@pytest.mark.parametrize('name', ['Schedule', 'ScheduledTask', 'Visibility', 'UserPreference', 'ScheduleTelemetry'])
+@pytest.mark.parametrize('preserving', [True, False])
+def test_matches_message_to_dict(name, preserving):
+    rng = random.Random(name)
+    for i in range(25):
+        message = fill(getattr(objs, name)(), rng)
+        expected = MessageToDict(message, preserving_proto_field_name=preserving)
+        actual = message_to_dict(message, preserving_proto_field_name=preserving)
+        # NaN != NaN, so compare the repr, which also checks key order
+        assert repr(actual) == repr(expected)
+
+
+def test_unset_submessage_not_reported():
+    telemetry = objs.ScheduleTelemetry(scheduleRunId='r1')
+    telemetry.system  # reading a sub-message does not set it
+    assert message_to_dict(telemetry) == MessageToDict(telemetry) == {'scheduleRunId': 'r1'}
+    assert get_converter(objs.ScheduleTelemetry.DESCRIPTOR) is get_converter(objs.ScheduleTelemetry.DESCRIPTOR)
+
+
+def test_portable_path_matches(monkeypatch):
+    # Runtimes other than pure-python protobuf go through HasField and the field properties
+    monkeypatch.setattr(converters, '_DIRECT', False)
+    monkeypatch.setattr(converters, '_converters', {})
+    rng = random.Random(0)
+    for i in range(25):
+        message = fill(objs.ScheduleTelemetry(), rng)
+        assert repr(message_to_dict(message)) == repr(MessageToDict(message))
+
+
+@pytest.mark.parametrize('name', ['Schedule', 'ScheduleTelemetry'])
+def test_generated_matches_fallback(monkeypatch, name):
+    rng = random.Random(name)
+    messages = [fill(getattr(objs, name)(), rng) for i in range(25)]
+    generated = [repr(message_to_dict(m, preserving_proto_field_name=True)) for m in messages]
+    monkeypatch.setattr(converters, '_FAST', False)
+    assert get_converter(getattr(objs, name).DESCRIPTOR).func is MessageToDict
+    assert [repr(message_to_dict(m, preserving_proto_field_name=True)) for m in messages] == generated
+
+
+def test_fast_path_gated_on_version():
+    assert converters._supported('3.20.3')
+    assert not converters._supported('5.26.1')
+    assert not converters._supported('dev')
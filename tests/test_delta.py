@@ -0,0 +1,88 @@
+import json
+
+from src.ccm import wire
+from src.ccm.api import CcmApi
+from src.ccm.delta import ScheduleDelta, apply_delta, compute_delta
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+def task(tid, start, site='site-a'):
+    return objs.ScheduledTask(taskId=tid, userId='u', start=start, end=start + 60, visibilityId=f'v-{tid}',
+                              noradId='55555', siteId=site, added_at_tier=1)
+
+
+def test_compute_and_apply_delta():
+    old = objs.Schedule(scheduleRunId='r1', score=1.0, tasks=[task('a', 0), task('b', 100), task('c', 200)])
+    new = objs.Schedule(scheduleRunId='r2', score=2.0, tasks=[task('a', 0), task('c', 250), task('d', 300)])
+    delta = compute_delta(old, new)
+    assert [t.taskId for t in delta.added] == ['d']
+    assert delta.removed == ['b']
+    assert [t.taskId for t in delta.moved] == ['c']
+    synced = apply_delta(old, delta)
+    assert synced.scheduleRunId == 'r2'
+    assert sorted(t.taskId for t in synced.tasks) == ['a', 'c', 'd']
+    assert {t.taskId: t for t in synced.tasks} == {t.taskId: t for t in new.tasks}
+
+
+def test_delta_dict_round_trip():
+    old = objs.Schedule(scheduleRunId='r1', score=1.0, tasks=[task('a', 0)])
+    new = objs.Schedule(scheduleRunId='r2', score=1.0, tasks=[task('b', 0)])
+    delta = compute_delta(old, new)
+    again = ScheduleDelta.from_dict(json.loads(json.dumps(delta.to_dict())))
+    assert apply_delta(old, again) == apply_delta(old, delta)
+
+
+def test_sync_schedule_follows_chain(api_server):
+    r1 = objs.Schedule(scheduleRunId='r1', score=1.0, tasks=[task('a', 0), task('b', 100)])
+    r2 = ScheduleDelta('r1', 'r2', added=[task('c', 200)], removed=['a'], score=1.5)
+    r3 = ScheduleDelta('r2', 'r3', moved=[task('b', 150)], score=1.7)
+    api_server.route('GET', '/schedule/r1/delta', body=json.dumps(r2.to_dict()).encode())
+    api_server.route('GET', '/schedule/r2/delta', body=json.dumps(r3.to_dict()).encode())
+    api_server.route('GET', '/schedule/r3/delta', status=204)
+    ca = CcmApi('user', api_host=api_server.url)
+    synced = ca.sync_schedule('r1', schedule=r1)
+    assert synced.scheduleRunId == 'r3'
+    assert synced.score == 1.7
+    assert {t.taskId: t.start for t in synced.tasks} == {'b': 150, 'c': 200}
+
+
+def test_sync_schedule_falls_back_to_full_diff(api_server):
+    r1 = objs.Schedule(scheduleRunId='r1', score=1.0, tasks=[task('a', 0)])
+    r2 = objs.Schedule(scheduleRunId='r2', score=1.0, tasks=[task('a', 0), task('b', 100)])
+    body, content_type = wire.encode_message(r2, wire.PROTOBUF)
+    api_server.route('GET', '/schedule/r2', headers={'Content-Type': content_type}, body=body)
+    ca = CcmApi('user', api_host=api_server.url)
+    assert ca.sync_schedule('r1', schedule=r1, next_run_id='r2') == r2
+
+
+def test_sync_schedule_fallback_fetches_only_next_schedule(api_server):
+    r1 = objs.Schedule(scheduleRunId='r1', score=1.0, tasks=[task('a', 0)])
+    r2 = objs.Schedule(scheduleRunId='r2', score=1.0, tasks=[task('a', 0), task('b', 100)])
+    body, content_type = wire.encode_message(r2, wire.PROTOBUF)
+    api_server.route('GET', '/schedule/r2', headers={'Content-Type': content_type}, body=body)
+    api_server.route('GET', '/schedule/r1/follow', body=b'{"follow_scheduleRunId": "r2"}')
+    api_server.route('GET', '/schedule/r2/follow', body=b'{}')
+    ca = CcmApi('user', api_host=api_server.url)
+    assert ca.sync_schedule('r1', schedule=r1) == r2
+    assert [path for method, path, headers, body in api_server.calls if 'result' in path] == []
+
+
+def test_follow_run_id_reuses_result(api_server):
+    result = objs.ScheduleResult(schedule=objs.Schedule(scheduleRunId='r1', score=1.0), success=True, follow_scheduleRunId='r2')
+    body, content_type = wire.encode_message(result, wire.PROTOBUF)
+    api_server.route('GET', '/schedule/r1/result', headers={'Content-Type': content_type}, body=body)
+    ca = CcmApi('user', api_host=api_server.url)
+    assert ca._get_follow_run_id('r1') == 'r2'
+    assert ca._get_follow_run_id('r1') == 'r2'
+    assert [path for method, path, headers, body in api_server.calls] == ['/schedule/r1/follow', '/schedule/r1/result']
+
+
+def test_delta_ignores_unknown_fields():
+    d = ScheduleDelta('r1', 'r2', added=[task('a', 0)]).to_dict()
+    d['added'][0]['priority'] = 3
+    d['reason'] = 'reoptimized'
+    assert ScheduleDelta.from_dict(d).added == [task('a', 0)]
@@ -0,0 +1,38 @@
+from src.ccm.api import CcmApi
+from src.ccm.diff import diff_schedules
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+def task_fields(tasks):
+    return [dict(taskId=tid, visibilityId=vid, start=start, end=end) for tid, vid, start, end in tasks]
+
+
+def test_diff_schedules(make_schedule):
+    a = make_schedule(task_fields([('t1', 'v1', 0, 100), ('t2', 'v2', 200, 300), ('t3', 'v3', 400, 500), ('t4', 'v4', 600, 700)]), 'r1')
+    b = make_schedule(task_fields([('t2', 'v2', 210, 300), ('t5', 'v3', 400, 450), ('t1', 'v1', 0, 100), ('t6', 'v6', 800, 900)]), 'r2')
+    diff = diff_schedules(a, b)
+    assert (diff.from_run_id, diff.to_run_id) == ('r1', 'r2')
+    assert [b.tasks[i].taskId for i in diff.added] == ['t5', 't6']
+    assert [a.tasks[i].taskId for i in diff.dropped] == ['t3', 't4']
+    assert [a.tasks[i].taskId for i in diff.shifted_from] == ['t2']
+    assert [b.tasks[i].taskId for i in diff.shifted_to] == ['t2']
+    assert list(diff.start_shift) == [10]
+    assert list(diff.end_shift) == [0]
+    assert [a.tasks[i].taskId for i in diff.bumped] == ['t3']
+    assert [b.tasks[i].taskId for i in diff.bumped_by] == ['t5']
+    assert diff.summary() == {'added': 2, 'dropped': 2, 'shifted': 1, 'bumped': 1}
+
+
+def test_diff_identical(make_schedule):
+    a = make_schedule(task_fields([('t1', 'v1', 0, 100)]), 'r1')
+    assert len(diff_schedules(a, a)) == 0
+
+
+def test_api_diff_schedules():
+    ca = CcmApi('test')
+    diff = ca.diff_schedules('empty', 'example')
+    assert len(diff.dropped) == 0
+    assert len(diff.added) == len(ca.get_schedule_by_id('example').tasks)
@@ -0,0 +1,120 @@
+import sys
+
+import pytest
+
+from src.ccm import export
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+def export_tasks(n=10):
+    tasks = [dict(start=100 * i, end=100 * i + 50, noradId='55550', siteId=f'site-{i % 2}', added_at_tier=i % 3) for i in range(n)]
+    for task in tasks[::2]:
+        task['from_exact_request'] = True
+    return tasks
+
+
+def make_telemetry():
+    telemetry = objs.ScheduleTelemetry(scheduleRunId='run-1', start=0, end=86400, totalTaskCount=3, totalAllocatedSeconds=900)
+    gs = telemetry.groundStations.add(siteId='site-0', totalTaskCount=3, totalTaskSeconds=900, numVisibilitiesSeen=4,
+                                      totalVisibilityAvailableSeconds=1200, totalVisibilityScheduledSeconds=900,
+                                      totalCostSpent=1.5, totalRevenue=3.0)
+    gs.overlapStats.add(userId='u', percAcrossUserSats=0.25, percAcrossOtherSats=0.5, totalUserAvailableSeconds=1200,
+                        totalUserOverlappingSelfSeconds=100, totalUserOverlappingOthersSeconds=200)
+    telemetry.spacecrafts.add(noradId='55550', totalTaskCount=3, totalTaskSeconds=900, totalAvailableSeconds=1200,
+                              detectedBufferOverflow=False, maxTimeBetweenContacts=600, meanTimeBetweenContacts=300.0,
+                              giniScore=0.25)
+    user = telemetry.users.add(userId='u', score=0.5, giniScore=0.25, totalTaskCount=3, totalAllocatedSeconds=900)
+    user.preferenceScores['p1'] = 0.5
+    bumped = user.bumpedTasks[7]
+    bumped.taskId, bumped.userId, bumped.start, bumped.end = 't7', 'u', 700, 750
+    bumped.visibilityId, bumped.noradId, bumped.siteId, bumped.added_at_tier = 'v7', '55550', 'site-1', 1
+    return telemetry
+
+
+def test_column_batches(make_schedule):
+    batches = list(export.column_batches(make_schedule(export_tasks(10)).tasks, objs.ScheduledTask, batch_size=4))
+    assert [len(b['taskId']) for b in batches] == [4, 4, 2]
+    assert batches[0]['taskId'] == ['t0', 't1', 't2', 't3']
+    assert batches[0]['from_exact_request'] == [True, None, True, None]
+    assert batches[2]['start'] == [800, 900]
+
+
+def test_column_batches_are_lazy(make_schedule):
+    seen = []
+
+    def tasks():
+        for task in make_schedule(export_tasks(10)).tasks:
+            seen.append(task.taskId)
+            yield task
+
+    batches = export.column_batches(tasks(), objs.ScheduledTask, batch_size=3)
+    next(batches)
+    assert len(seen) == 3
+
+
+def test_nested_columns():
+    vis = objs.Visibility(visibilityId='v', siteId='s', noradId='n', startTimestamp=1, endTimestamp=2)
+    vis.props.add(vtype=objs.VisibilityProperty.ELEVATION, dval=2.5)
+    columns = next(export.column_batches([vis], objs.Visibility))
+    prop = columns['props'][0][0]
+    assert prop['vtype'] == 'ELEVATION'
+    assert prop['dval'] == 2.5
+    assert prop['bval'] is None
+
+    user = next(export.column_batches(make_telemetry().users, objs.UserTelemetry))
+    assert user['preferenceScores'] == [[('p1', 0.5)]]
+    key, task = user['bumpedTasks'][0][0]
+    assert key == 7 and task['taskId'] == 't7' and task['from_exact_request'] is None
+    assert user['expectedWaitGapFillingMethod'] == [None]
+
+
+def test_missing_pyarrow(monkeypatch, tmp_path, make_schedule):
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    with pytest.raises(Exception, match='pip install'):
+        export.export_schedule(make_schedule(export_tasks()), str(tmp_path / 'tasks.arrow'))
+
+
+def test_unknown_format(tmp_path, make_schedule):
+    pytest.importorskip('pyarrow')
+    with pytest.raises(Exception, match='Unknown export format'):
+        export.export_schedule(make_schedule(export_tasks()), str(tmp_path / 'tasks.csv'), format='csv')
+
+
+@pytest.mark.parametrize('format', ['ipc', 'parquet'])
+def test_schedule_round_trip(tmp_path, format, make_schedule):
+    pytest.importorskip('pyarrow')
+    path = str(tmp_path / ('tasks' + export.FORMATS[format]))
+    assert export.export_schedule(make_schedule(export_tasks(10)), path, batch_size=4) == 10
+    table = export.read_table(path)
+    assert table.num_rows == 10
+    assert table.column('scheduleRunId').to_pylist() == ['run-1'] * 10
+    assert table.column('start').to_pylist() == [100 * i for i in range(10)]
+    assert table.column('from_exact_request').to_pylist()[:2] == [True, None]
+
+
+def test_writer_appends_runs(tmp_path, make_schedule):
+    pytest.importorskip('pyarrow')
+    path = str(tmp_path / 'tasks.arrow')
+    with export.TableWriter(path, objs.ScheduledTask, with_schedule_run_id=True, batch_size=3) as writer:
+        writer.write(make_schedule(export_tasks(5)).tasks, 'run-1')
+        writer.write(make_schedule(export_tasks(2)).tasks, 'run-2')
+        with pytest.raises(Exception):
+            writer.write(make_schedule(export_tasks(2)).tasks)
+    table = export.read_table(path)
+    assert table.column('scheduleRunId').to_pylist() == ['run-1'] * 5 + ['run-2'] * 2
+
+
+@pytest.mark.parametrize('format', ['ipc', 'parquet'])
+def test_telemetry_round_trip(tmp_path, format):
+    pytest.importorskip('pyarrow')
+    paths = export.export_telemetry(make_telemetry(), str(tmp_path), format=format)
+    assert sorted(paths) == sorted(export.TELEMETRY_TABLES)
+    users = export.read_table(paths['users']).to_pylist()
+    assert users[0]['scheduleRunId'] == 'run-1'
+    assert users[0]['preferenceScores'] == [('p1', 0.5)]
+    stations = export.read_table(paths['groundStations']).to_pylist()
+    assert stations[0]['overlapStats'][0]['totalUserOverlappingOthersSeconds'] == 200
@@ -0,0 +1,72 @@
+from src.ccm.api import CcmApi
+from src.ccm.feasibility import VisibilityWindows
+from src.ccm.visibility_store import VisibilityStore, write_visibility_store
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+def make_visibilities():
+    return [
+        objs.Visibility(visibilityId='v1', siteId='site', noradId='test', startTimestamp=1000, endTimestamp=1600),
+        objs.Visibility(visibilityId='v2', siteId='site', noradId='test', startTimestamp=5000, endTimestamp=5300),
+        objs.Visibility(visibilityId='v3', siteId='site', noradId='test', startTimestamp=9000, endTimestamp=10000),
+        objs.Visibility(visibilityId='v4', siteId='other', noradId='test', startTimestamp=0, endTimestamp=100000),
+    ]
+
+
+def test_check():
+    windows = VisibilityWindows(make_visibilities())
+    assert windows.check('test', 'site', 1100, 1500) == (True, None)
+    assert windows.check('test', 'site', 1100, min_duration=500) == (True, None)
+    # Runs past the end of the first window; the nearest window that fits starts it earlier
+    assert windows.check('test', 'site', 1200, 1700) == (False, (1100, 1600))
+    # Too long for v2; v1 ends nearer than v3 begins
+    assert windows.check('test', 'site', 5000, 5400) == (False, (1200, 1600))
+    # Shorter than its own minDuration
+    assert windows.check('test', 'site', 1100, 1150, min_duration=300) == (False, (1100, 1400))
+    assert windows.check('test', 'site', 0, 2000) == (False, None)
+    assert windows.check('test', 'missing', 1100, 1500) == (False, None)
+
+
+def test_from_store(tmp_path):
+    write_visibility_store(str(tmp_path), make_visibilities())
+    windows = VisibilityWindows.from_store(VisibilityStore(str(tmp_path)))
+    assert windows.check('test', 'site', 9100, 9900) == (True, None)
+    assert windows.check('test', 'site', 1200, 1700) == (False, (1100, 1600))
+    assert windows.check('test', 'other', 50000, 60000) == (True, None)
+
+
+def test_create_exact_request_preflight():
+    ca = CcmApi('test', visibility_windows=VisibilityWindows(make_visibilities()))
+    resp = ca.create_exact_request('test', 'site', 1200, 1700)
+    assert resp == {'success': False, 'msg': 'Not available', 'suggestion': {'startTimestamp': 1100, 'endTimestamp': 1600}}
+    assert ca.create_exact_request('test', 'site', 1200, 1500)['success'] == True
+    assert ca.create_exact_request('test', 'site', 1200, 1700, preflight=False)['success'] == True
+    requests = [
+        objs.ExactRequest(siteId='site', noradId='test', startTimestamp=1200, endTimestamp=1500, minDuration=60),
+        objs.ExactRequest(siteId='site', noradId='test', startTimestamp=5100, minDuration=600),
+    ]
+    resp = ca.create_exact_requests(requests)
+    assert [r['success'] for r in resp['results']] == [True, False]
+    assert resp['results'][1]['suggestion'] == {'startTimestamp': 9000, 'endTimestamp': 9600}
+    assert resp['next_schedule_id'] == 'example'
+
+
+def test_check_request_visibility_id(tmp_path):
+    write_visibility_store(str(tmp_path), make_visibilities())
+    for windows in (VisibilityWindows(make_visibilities()), VisibilityWindows.from_store(VisibilityStore(str(tmp_path)))):
+        request = objs.ExactRequest(siteId='site', noradId='test', startTimestamp=9100, endTimestamp=9500)
+        assert windows.check_request(request) == (True, None)
+        # Fits v3, but not the window it names
+        request.visibilityId = 'v1'
+        assert windows.check_request(request) == (False, (1200, 1600))
+        request.visibilityId = 'v3'
+        assert windows.check_request(request) == (True, None)
+        # v4 is a window of another ground site
+        request.visibilityId = 'v4'
+        assert windows.check_request(request) == (False, None)
+        request.visibilityId = 'missing'
+        assert windows.check_request(request) == (False, None)
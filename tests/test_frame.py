@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.ccm.frame import ScheduleFrame
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+def frame_tasks():
+    tasks = [dict(start=100 * i, end=100 * i + 10 * (i + 1), noradId=str(55550 + i % 3), siteId=f'site-{i % 2}', added_at_tier=i % 2)
+             for i in range(12)]
+    for i in range(0, 12, 4):
+        tasks[i]['from_exact_request'] = i % 8 == 0
+    return tasks
+
+
+def test_round_trip(make_schedule):
+    sch = make_schedule(frame_tasks())
+    frame = ScheduleFrame.from_schedule(sch)
+    assert len(frame) == 12
+    assert frame.to_schedule() == sch
+
+
+def test_dictionary_encoding(make_schedule):
+    frame = ScheduleFrame.from_schedule(make_schedule(frame_tasks()))
+    assert list(frame.categories['siteId']) == ['site-0', 'site-1']
+    assert frame.codes['siteId'].dtype == np.int32
+    assert list(frame.column('siteId')[:3]) == ['site-0', 'site-1', 'site-0']
+    assert frame.code('noradId', '55551') == 1
+    assert frame.code('noradId', 'nope') == -1
+
+
+def test_filter(make_schedule):
+    frame = ScheduleFrame.from_schedule(make_schedule(frame_tasks()))
+    sub = frame.filter(frame.duration > 50, siteId='site-1', noradId=['55550', '55551'])
+    assert list(sub.column('taskId')) == ['t7', 't9']
+    assert all(sub.duration > 50)
+
+
+def test_groupby(make_schedule):
+    frame = ScheduleFrame.from_schedule(make_schedule(frame_tasks()))
+    groups = frame.groupby('noradId')
+    assert sorted(groups) == ['55550', '55551', '55552']
+    assert sum(len(g) for g in groups.values()) == len(frame)
+    assert list(groups['55552'].column('taskId')) == ['t2', 't5', 't8', 't11']
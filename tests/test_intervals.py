@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from src.ccm.api import CcmApi
+from src.ccm.intervals import IntervalIndex, ScheduleIndex
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+@pytest.mark.parametrize('n', [0, 1, 2, 3, 7, 8, 100, 1000])
+def test_interval_index_matches_scan(n):
+    rng = np.random.default_rng(n)
+    start = rng.integers(0, 10000, n)
+    end = start + rng.integers(1, 2000, n)
+    index = IntervalIndex(start, end)
+    for lo in rng.integers(-100, 12000, 25):
+        hi = lo + int(rng.integers(1, 500))
+        expected = np.flatnonzero((start < hi) & (end > lo))
+        assert list(index.overlapping(lo, hi)) == list(expected)
+        expected = np.flatnonzero((start <= lo) & (end > lo))
+        assert list(index.at(lo)) == list(expected)
+
+
+TASKS = [dict(start=100 * i, end=100 * i + 150, noradId=str(55550 + i % 2), siteId=f'site-{i % 3}') for i in range(20)]
+
+
+def test_schedule_index_by_site(make_schedule):
+    sch = make_schedule(TASKS)
+    index = ScheduleIndex(sch, by='siteId')
+    assert sorted(index.keys()) == ['site-0', 'site-1', 'site-2']
+    assert [t.taskId for t in index.tasks_at(420)] == ['t3', 't4']
+    assert [t.taskId for t in index.tasks_at(420, key='site-1')] == ['t4']
+    assert list(index.overlapping(0, 250, key='site-0')) == [0]
+    assert len(index.at(420, key='site-9')) == 0
+
+
+def test_get_schedule_index():
+    ca = CcmApi('test')
+    index = ca.get_schedule_index('example', by='noradId')
+    t = index.schedule.tasks[0].start
+    assert index.schedule.tasks[0] in index.tasks_at(t, key='55555')
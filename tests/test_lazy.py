@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+
+from src.ccm.lazy import LazyModule, lazy_import
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ['requests', 'numpy', 'argparse', 'dotenv', 'sqlite3', 'src.schedule_pb2', 'google.protobuf.json_format']
+
+CHECK = '''
+import json, sys
+from src.ccm.api import CcmApi
+ca = CcmApi('test', api_host='http://localhost/')
+ca.get_current_profile()
+print(json.dumps([m for m in %r if m in sys.modules]))
+ca.get_schedule_by_id('example')
+print(json.dumps([m for m in %r if m in sys.modules]))
+'''
+
+
+def test_api_defers_heavy_imports():
+    script = CHECK % (HEAVY, HEAVY)
+    # Keep pytest-cov out of the child, as coverage itself imports sqlite3
+    env = {k: v for k, v in os.environ.items() if not k.startswith('COV_CORE')}
+    out = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    before, after = [json.loads(line) for line in out.splitlines()]
+    assert before == []
+    assert 'src.schedule_pb2' in after
+
+
+def test_lazy_import():
+    module = lazy_import('this_module_does_not_exist_yet')
+    assert isinstance(module, LazyModule)
+    assert lazy_import('os') is os
+    assert lazy_import('json').dumps is json.dumps
+    assert LazyModule('json').loads('[1]') == [1]
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from src.ccm.objectives import compute_objective, compute_objectives
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+Objective = objs.UserPreference.Objective
+DAY = 86400
+
+
+# Day 0: contacts at 0h and 12h.  Day 1: one contact at 30h.  All 10 minutes long.
+TASKS = [dict(start=s, end=s + 600) for s in [0, 12 * 3600, 30 * 3600]]
+
+
+def test_per_day(make_schedule):
+    norad_ids, results = compute_objectives(make_schedule(TASKS), horizon=(0, 2 * DAY), per_day=True)
+    assert list(norad_ids) == ['55555']
+    assert results[Objective.ContactCountPerDay].shape == (1, 2)
+    assert list(results[Objective.ContactCountPerDay][0]) == [2, 1]
+    assert list(results[Objective.ContactMinutesPerDay][0]) == [20, 10]
+    gaps = results[Objective.MaximumMinutesBetweenContacts][0]
+    assert list(gaps) == [12 * 60 - 10, 18 * 60 - 10]
+    assert np.isnan(results[Objective.MinimumMinutesContactLength]).sum() == 0
+
+
+def test_expected_wait_time(make_schedule):
+    norad_ids, values = compute_objective(make_schedule(TASKS), Objective.ExpectedWaitTime, horizon=(0, 2 * DAY))
+    gaps = np.array([12 * 3600 - 600, 18 * 3600 - 600], dtype=float)
+    assert values[0] == pytest.approx((gaps ** 2 / 2).sum() / (2 * DAY) / 60)
+
+
+def test_horizon_drops_tasks_outside_it(make_schedule):
+    norad_ids, values = compute_objective(make_schedule(TASKS), Objective.ContactCountPerDay, horizon=(0, DAY))
+    assert list(values) == [2]
+    norad_ids, values = compute_objective(make_schedule(TASKS), Objective.ExpectedWaitTime, horizon=(0, DAY))
+    assert values[0] == pytest.approx((12 * 3600 - 600) ** 2 / 2 / DAY / 60)
+    norad_ids, results = compute_objectives(make_schedule(TASKS), horizon=(DAY, 2 * DAY), per_day=True)
+    assert list(results[Objective.ContactCountPerDay][0]) == [1]
+    assert list(results[Objective.ContactMinutesPerDay][0]) == [10]
+    norad_ids, values = compute_objective(make_schedule(TASKS), Objective.ContactCountPerDay, horizon=(2 * DAY, 3 * DAY))
+    assert list(norad_ids) == ['55555'] and list(values) == [0]
+
+
+def test_visibility_objectives(make_schedule):
+    band = objs.VisibilityProperty(vtype=objs.VisibilityProperty.VisibilityPropertyType.BAND, sval='S')
+    visibilities = [
+        objs.Visibility(visibilityId='v0', siteId='site-a', noradId='55555', startTimestamp=0, endTimestamp=600, props=[band]),
+        objs.Visibility(visibilityId='v1', siteId='site-a', noradId='55555', startTimestamp=12 * 3600 - 600, endTimestamp=12 * 3600 + 600),
+    ]
+    sch = make_schedule(TASKS)
+    norad_ids, values = compute_objective(sch, Objective.MeanMidpointWithinVisibility, visibilities=visibilities)
+    assert values[0] == pytest.approx((0.5 + 0.75) / 2)
+    norad_ids, values = compute_objective(sch, Objective.FractionHasBand, visibilities=visibilities)
+    assert values[0] == pytest.approx(0.5)
+    with pytest.raises(Exception):
+        compute_objective(sch, Objective.FractionHasBand)
+
+
+def test_unsupported_objective(make_schedule):
+    with pytest.raises(Exception):
+        compute_objective(make_schedule(TASKS), Objective.AoiLatency)
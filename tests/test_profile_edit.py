@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from src.ccm.api import CcmApi
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+ConstraintType = objs.UserPreference.ConstraintType
+Objective = objs.UserPreference.Objective
+
+
+def make_preference(label, mu):
+    return objs.UserPreference(userId='test', tier=1, label=label, constraintType=ConstraintType.TruncatedGaussian,
+                               objective=Objective.ContactCountPerDay, mu=mu, sigma=1.0)
+
+
+def test_edit_profile_commits_once(api_server):
+    api_server.route('POST', '/profile/ops', body=b'{"success": true}')
+    api_server.route('PUT', '/profile/ops/preferences', headers={'Content-Type': 'application/json'}, body=b'{"success": true, "next_schedule_id": "run-3"}')
+    ca = CcmApi('user', api_host=api_server.url)
+    ca.create_preference_profile('ops')
+    with ca.edit_profile('ops') as edit:
+        for i in range(50):
+            edit.add(make_preference(f'p{i}', i))
+        edit.remove('p0')
+        edit.update('p1', mu=11.0, sigma=3.0)
+    assert edit.result == {'success': True, 'next_schedule_id': 'run-3'}
+    puts = [c for c in api_server.calls if c[0] == 'PUT']
+    assert len(puts) == 1
+    sent = json.loads(puts[0][3])
+    assert len(sent) == 49
+    assert (sent[0]['label'], sent[0]['mu'], sent[0]['sigma']) == ('p1', 11.0, 3.0)
+    assert [p.label for p in ca.profile_store.preferences('ops')] == [f'p{i}' for i in range(1, 50)]
+
+
+def test_edit_profile_discarded_on_error():
+    ca = CcmApi('test')
+    ca.create_preference_profile('temp')
+    ca.add_preference_to_profile('temp', make_preference('keep', 1))
+    with pytest.raises(KeyError):
+        with ca.edit_profile('temp') as edit:
+            edit.add(make_preference('new', 2))
+            edit.remove('missing')
+    assert edit.result is None
+    assert [p.label for p in ca.profile_store.preferences('temp')] == ['keep']
+    with pytest.raises(Exception):
+        ca.edit_profile('does-not-exist')
+
+
+def test_edit_profile_keys_survive_removal():
+    ca = CcmApi('test')
+    ca.create_preference_profile('positional')
+    for mu in (1, 2, 3):
+        ca.add_preference_to_profile('positional', objs.UserPreference(userId='test', tier=1, constraintType=ConstraintType.TruncatedGaussian,
+                                                                       objective=Objective.ContactCountPerDay, mu=mu, sigma=1.0))
+    with ca.edit_profile('positional') as edit:
+        edit.remove('0')
+        edit.update('2', mu=30.0)
+        with pytest.raises(KeyError):
+            edit.update('0', mu=10.0)
+    assert [p.mu for p in ca.profile_store.preferences('positional')] == [2.0, 30.0]
+
+
+def test_edit_profile_updates_repeated_field():
+    ca = CcmApi('test')
+    ca.create_preference_profile('sites')
+    upref = make_preference('by-site', 1)
+    upref.siteIds.extend(['site-a', 'site-b'])
+    ca.add_preference_to_profile('sites', upref)
+    with ca.edit_profile('sites') as edit:
+        edit.update('by-site', siteIds=['site-c'], mu=4.0)
+    prefs = ca.profile_store.preferences('sites')
+    assert list(prefs[0].siteIds) == ['site-c']
+    assert prefs[0].mu == 4.0
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from src.ccm.api import CcmApi
+from src.ccm.profile_store import SqliteProfileStore
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+ConstraintType = objs.UserPreference.ConstraintType
+Objective = objs.UserPreference.Objective
+
+
+def make_preference(mu):
+    return objs.UserPreference(userId='test', tier=1, constraintType=ConstraintType.TruncatedGaussian,
+                               objective=Objective.ContactCountPerDay, mu=mu, sigma=1.0)
+
+
+def test_sqlite_store(tmp_path):
+    path = str(tmp_path / 'profiles.db')
+    store = SqliteProfileStore(path, 'user-a')
+    assert store.names() == ['default']
+    store.create('ops')
+    store.add_preference('ops', make_preference(1))
+    store.add_preference('ops', make_preference(2))
+    store.set_current('ops')
+    SqliteProfileStore(path, 'user-b').create('other')
+    store.close()
+    reopened = SqliteProfileStore(path, 'user-a')
+    assert reopened.names() == ['default', 'ops']
+    assert reopened.get_current() == 'ops'
+    assert [p.mu for p in reopened.preferences('ops')] == [1, 2]
+    reopened.set_preferences('ops', [make_preference(3)])
+    assert [p.mu for p in SqliteProfileStore(path, 'user-a').preferences('ops')] == [3]
+    reopened.delete('ops')
+    assert 'ops' not in SqliteProfileStore(path, 'user-a')
+    assert SqliteProfileStore(path, 'user-b').names() == ['default', 'other']
+
+
+def test_sqlite_store_sees_other_writers(tmp_path):
+    path = str(tmp_path / 'profiles.db')
+    worker_a = SqliteProfileStore(path, 'user-a')
+    worker_b = SqliteProfileStore(path, 'user-a')
+    worker_a.create('ops')
+    worker_a.add_preference('ops', make_preference(1))
+    assert [p.mu for p in worker_b.preferences('ops')] == [1]
+    worker_a.add_preference('ops', make_preference(2))
+    assert [p.mu for p in worker_b.preferences('ops')] == [1, 2]
+    worker_b.set_preferences('ops', [make_preference(3)])
+    assert [p.mu for p in worker_a.preferences('ops')] == [3]
+    worker_a.add_preference('ops', make_preference(4))
+    assert [p.mu for p in worker_a.preferences('ops')] == [3, 4]
+
+
+def test_profiles_property():
+    ca = CcmApi('test')
+    ca.create_preference_profile('temp')
+    ca.add_preference_to_profile('temp', make_preference(5))
+    assert list(ca.profiles) == ['default', 'temp']
+    assert [p.mu for p in ca.profiles['temp']['prefs']] == [5]
+    assert ca.profiles['default'] == {}
+    with pytest.warns(DeprecationWarning):
+        ca.profiles['other'] = {'prefs': [make_preference(6)]}
+    assert [p.mu for p in ca.profile_store.preferences('other')] == [6]
+    with pytest.warns(DeprecationWarning):
+        del ca.profiles['temp']
+    assert 'temp' not in ca.profile_store
+
+
+def test_profiles_survive_client(tmp_path):
+    path = str(tmp_path / 'profiles.db')
+    ca = CcmApi('test', profile_store=SqliteProfileStore(path, 'test'))
+    assert ca.create_preference_profile('temp')['success']
+    assert ca.add_preference_to_profile('temp', make_preference(5))['success']
+    assert ca.set_profile('temp')['success']
+    ca.close()
+    ca = CcmApi('test', profile_store=SqliteProfileStore(path, 'test'))
+    assert ca.get_current_profile() == 'temp'
+    assert not ca.create_preference_profile('temp')['success']
+    assert [p.mu for p in ca.profile_store.preferences('temp')] == [5]
+
+
+def test_write_through(api_server, tmp_path):
+    api_server.route('POST', '/profile/ops%20team', body=b'{"success": true}')
+    api_server.route('POST', '/profile/ops%20team/preferences', body=b'{"success": true}')
+    api_server.route('PUT', '/current-profile', headers={'Content-Type': 'application/json'}, body=b'{"success": true, "next_schedule_id": "run-9"}')
+    api_server.route('DELETE', '/profile/ops%20team', status=500)
+    ca = CcmApi('user', api_host=api_server.url, profile_store=SqliteProfileStore(str(tmp_path / 'profiles.db'), 'user'))
+    assert ca.create_preference_profile('ops team')['success']
+    assert ca.add_preference_to_profile('ops team', make_preference(4))['success']
+    assert ca.set_profile('ops team') == {'success': True, 'next_schedule_id': 'run-9'}
+    resp = ca.delete_profile('ops team')
+    assert resp == {'success': False, 'msg': 'HTTP 500'}
+    assert 'ops team' in ca.profile_store
+    assert [c[:2] for c in api_server.calls] == [('POST', '/profile/ops%20team'), ('POST', '/profile/ops%20team/preferences'),
+                                                 ('PUT', '/current-profile'), ('DELETE', '/profile/ops%20team')]
+    assert json.loads(api_server.calls[1][3])['mu'] == 4
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from src.ccm.api import CcmApi
+from src.ccm import scoring
+from src.ccm.objectives import compute_objective
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+Objective = objs.UserPreference.Objective
+ConstraintType = objs.UserPreference.ConstraintType
+DAY = 86400
+
+
+def scoring_tasks():
+    # 55555 gets 4 ten-minute contacts per day, 44444 gets 2 twenty-minute contacts per day, over 2 days
+    tasks = []
+    for day in range(2):
+        for i in range(4):
+            s = day * DAY + i * 6 * 3600
+            tasks.append(dict(taskId=f'a{day}{i}', start=s, end=s + 600, noradId='55555', siteId='site-a'))
+        for i in range(2):
+            s = day * DAY + i * 12 * 3600 + 60
+            tasks.append(dict(taskId=f'b{day}{i}', start=s, end=s + 1200, noradId='44444', siteId='site-b'))
+    return tasks
+
+
+def test_compute_objective(make_schedule):
+    sch = make_schedule(scoring_tasks(), userId='test', visibilityId='v')
+    horizon = (0, 2 * DAY)
+    norad_ids, values = compute_objective(sch, Objective.ContactCountPerDay, horizon)
+    assert dict(zip(norad_ids, values)) == {'55555': 4.0, '44444': 2.0}
+    norad_ids, values = compute_objective(sch, Objective.ContactMinutesPerDay, horizon)
+    assert dict(zip(norad_ids, values)) == {'55555': 40.0, '44444': 40.0}
+    norad_ids, values = compute_objective(sch, Objective.MaximumMinutesBetweenContacts, horizon)
+    assert dict(zip(norad_ids, values)) == {'55555': 6 * 60 - 10, '44444': 12 * 60 - 20}
+
+
+def test_compute_objective_shorter_horizon(make_schedule):
+    norad_ids, values = compute_objective(make_schedule(scoring_tasks(), userId='test', visibilityId='v'), Objective.ContactCountPerDay, (0, DAY))
+    assert dict(zip(norad_ids, values)) == {'55555': 4.0, '44444': 2.0}
+    ca = CcmApi('test')
+    upref = ca.generate_user_preference(ConstraintType.TruncatedGaussian, Objective.ContactCountPerDay, mu=4, sigma=1)
+    upref.noradIds.append('55555')
+    assert scoring.score_preference(upref, make_schedule(scoring_tasks(), userId='test', visibilityId='v'), horizon=(0, DAY)) == pytest.approx(1.0)
+
+
+def test_constraint_functions():
+    assert scoring.truncated_gaussian(5, mu=5, sigma=2) == 1.0
+    assert scoring.truncated_gaussian(25, mu=5, sigma=2, max=20) == 0.0
+    assert scoring.logistic(10, bias=10, shape=2) == 0.5
+    assert list(scoring.half_life([-1, 3, 5, 30], start=0, decayBegins=5, lambdaParam=1, decayHorizon=20)) == [0, 1, 1, 0]
+
+
+def test_score_preference(make_schedule):
+    ca = CcmApi('test')
+    upref = ca.generate_user_preference(ConstraintType.TruncatedGaussian, Objective.ContactCountPerDay, mu=4, sigma=1)
+    upref.noradIds.append('55555')
+    assert scoring.score_preference(upref, make_schedule(scoring_tasks(), userId='test', visibilityId='v'), horizon=(0, 2 * DAY)) == pytest.approx(1.0)
+
+
+def test_score_profile_weighted(make_schedule):
+    ca = CcmApi('test')
+    ca.create_preference_profile('p')
+    up1 = ca.generate_user_preference(ConstraintType.TruncatedGaussian, Objective.ContactCountPerDay, mu=3, sigma=1, weight=3)
+    up1.label = 'count'
+    up2 = ca.generate_user_preference(ConstraintType.Logistic, Objective.ContactMinutesPerDay, bias=40, shape=1, weight=1)
+    up2.label = 'minutes'
+    ca.add_preference_to_profile('p', up1)
+    ca.add_preference_to_profile('p', up2)
+    result = ca.score_profile(make_schedule(scoring_tasks(), userId='test', visibilityId='v'), 'p', horizon=(0, 2 * DAY))
+    expected_count = np.mean(np.exp(-0.5 * np.array([1.0, 1.0]) ** 2))
+    assert result['preferenceScores']['count'] == pytest.approx(expected_count)
+    assert result['preferenceScores']['minutes'] == pytest.approx(0.5)
+    assert result['score'] == pytest.approx((3 * expected_count + 0.5) / 4)
+
+
+def test_sweep_matches_score_preference(make_schedule):
+    sch = make_schedule(scoring_tasks(), userId='test', visibilityId='v')
+    horizon = (0, 2 * DAY)
+    mu = np.linspace(1, 8, 15)
+    sigma = np.array([0.5, 1.0, 2.0])
+    grid = scoring.sweep_preference(sch, ConstraintType.TruncatedGaussian, Objective.ContactCountPerDay,
+                                    horizon=horizon, mu=mu, sigma=sigma, max=6)
+    assert grid.shape == (15, 3)
+    for i in [0, 7, 14]:
+        for j in range(3):
+            upref = objs.UserPreference(constraintType=ConstraintType.TruncatedGaussian, objective=Objective.ContactCountPerDay,
+                                        tier=1, mu=mu[i], sigma=sigma[j], max=6)
+            assert grid[i, j] == pytest.approx(scoring.score_preference(upref, sch, horizon))
+
+
+def test_sweep_elementwise_with_template(make_schedule):
+    template = objs.UserPreference(constraintType=ConstraintType.Logistic, objective=Objective.ContactMinutesPerDay,
+                                   tier=1, shape=1.0, noradIds=['44444'])
+    bias = np.array([30.0, 40.0, 50.0])
+    scores = scoring.sweep_preference(make_schedule(scoring_tasks(), userId='test', visibilityId='v'), ConstraintType.Logistic, Objective.ContactMinutesPerDay,
+                                      template=template, horizon=(0, 2 * DAY), grid=False, bias=bias)
+    assert scores.shape == (3,)
+    assert scores[1] == pytest.approx(0.5)
+    with pytest.raises(Exception):
+        scoring.sweep_preference(make_schedule(scoring_tasks(), userId='test', visibilityId='v'), ConstraintType.Logistic, Objective.ContactMinutesPerDay, bias=bias)
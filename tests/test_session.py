@@ -0,0 +1,43 @@
+import threading
+
+from src.ccm.api import CcmApi
+from src.ccm.session import build_session
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+def test_build_session_pool_settings():
+    session = build_session(pool_connections=3, pool_maxsize=7, pool_block=True)
+    adapter = session.get_adapter('https://example.com/')
+    assert adapter._pool_connections == 3
+    assert adapter._pool_maxsize == 7
+    assert adapter._pool_block
+
+
+def test_build_session_no_keep_alive():
+    session = build_session(keep_alive=False)
+    assert session.headers['Connection'] == 'close'
+
+
+def test_server_version_reuses_connection(api_server):
+    api_server.route('GET', '/', body=b'{}')
+    with CcmApi('user', api_host=api_server.url) as ca:
+        for i in range(5):
+            assert 'version' in ca.get_server_version()
+    assert len(api_server.calls) == 5
+    assert len(set(api_server.ports)) == 1
+
+
+def test_session_shared_across_threads(api_server):
+    api_server.route('GET', '/', body=b'{}')
+    ca = CcmApi('user', api_host=api_server.url, pool_maxsize=2, pool_block=True)
+    threads = [threading.Thread(target=ca.get_server_version) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ca.close()
+    assert len(api_server.calls) == 8
+    assert len(set(api_server.ports)) <= 2
@@ -0,0 +1,128 @@
+import io
+import itertools
+
+import pytest
+
+from src.ccm import stream as stream_module
+from src.ccm.stream import MessageStream, _buffered, _encode_varint, _read_exactly, decode_varint, iter_delimited, iter_delimited_streams, read_varint, write_delimited
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+def make_request():
+    request = objs.ScheduleRequest(startTimestamp=1000, endTimestamp=90000, currentTime=500)
+    request.criteria.SetInParent()
+    for i in range(20):
+        request.visibilities.add(visibilityId=f'vis-{i}', siteId=f'site-{i % 3}', noradId=str(55550 + i % 4),
+                                 startTimestamp=1000 + 100 * i, endTimestamp=1050 + 100 * i)
+    for i in range(3):
+        request.users.add(userId=f'user-{i}')
+    return request
+
+
+class Unseekable(io.RawIOBase):
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        return self._data.read(n)
+
+
+def test_streams_repeated_fields_and_header():
+    request = make_request()
+    stream = MessageStream(io.BytesIO(request.SerializePartialToString()), objs.ScheduleRequest)
+    seen = list(stream)
+    assert [m for name, m in seen if name == 'visibilities'] == list(request.visibilities)
+    assert [m for name, m in seen if name == 'users'] == list(request.users)
+    assert stream.header.startTimestamp == 1000
+    assert stream.header.currentTime == 500
+    assert stream.header.HasField('criteria')
+    assert len(stream.header.visibilities) == 0
+
+
+def test_skips_unrequested_fields_without_seeking():
+    request = make_request()
+    stream = MessageStream(Unseekable(request.SerializePartialToString()), objs.ScheduleRequest, fields=['users'])
+    assert [m.userId for name, m in stream] == ['user-0', 'user-1', 'user-2']
+    assert stream.header.endTimestamp == 90000
+
+
+def test_delimited_sequence():
+    states = [objs.ConstellationState(online=True, startTimestamp=i, endTimestamp=i + 10) for i in range(4)]
+    for i, state in enumerate(states):
+        for j in range(i):
+            state.visibilities.add(visibilityId=f'vis-{i}-{j}', siteId='s', noradId='n', startTimestamp=j, endTimestamp=j + 1)
+    buffer = io.BytesIO()
+    assert write_delimited(buffer, states) == 4
+    buffer.seek(0)
+    assert list(iter_delimited(buffer, objs.ConstellationState)) == states
+    buffer.seek(0)
+    ids = []
+    for ms in iter_delimited_streams(buffer, objs.ConstellationState):
+        ids.append([v.visibilityId for name, v in ms])
+        assert ms.header.startTimestamp == len(ids) - 1
+    assert ids == [[f'vis-{i}-{j}' for j in range(i)] for i in range(4)]
+    buffer.seek(0)
+    # Abandoned streams are skipped over
+    assert len(list(iter_delimited_streams(buffer, objs.ConstellationState))) == 4
+
+
+def test_read_varint_from_buffer(monkeypatch):
+    # A tiny buffer puts most varints across its boundary
+    monkeypatch.setattr(stream_module, '_CHUNK', 3)
+    values = [0, 1, 127, 128, 300, 2 ** 35 + 7, 2 ** 63 - 1] * 5
+    data = b''.join(_encode_varint(v) for v in values)
+    stream = _buffered(Unseekable(data + b'tail'))
+    decoded = [read_varint(stream) for _ in values]
+    assert [v for v, raw in decoded] == values
+    assert b''.join(raw for v, raw in decoded) == data
+    assert stream.read(2) == b'ta' and stream.read() == b'il'
+    assert read_varint(stream, allow_eof=True) == (None, None)
+    assert decode_varint(data, len(_encode_varint(0))) == (1, 2)
+    with pytest.raises(EOFError):
+        read_varint(_buffered(io.BytesIO(b'\x80\x80')))
+
+
+def test_bounded_message_does_not_read_ahead():
+    request = make_request()
+    data = request.SerializePartialToString()
+    source = Unseekable(data + b'trailer')
+    stream = MessageStream(source, objs.ScheduleRequest, fields=['users'], length=len(data))
+    assert len(list(stream)) == 3
+    assert source.read() == b'trailer'
+    del stream
+    assert not source.closed
+
+
+class Trickle(Unseekable):
+    "Returns 1 to 3 bytes per read, like a slow socket."
+
+    def __init__(self, data):
+        super().__init__(data)
+        self._sizes = itertools.cycle([1, 3, 2])
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            return self._data.read()
+        return self._data.read(min(n, next(self._sizes)))
+
+
+def test_short_reads():
+    request = make_request()
+    stream = MessageStream(Trickle(request.SerializePartialToString()), objs.ScheduleRequest)
+    assert [m for name, m in stream if name == 'visibilities'] == list(request.visibilities)
+    assert stream.header.endTimestamp == 90000
+    states = [objs.ConstellationState(online=True, startTimestamp=i, endTimestamp=i + 10, visibilities=request.visibilities[:i]) for i in range(4)]
+    buffer = io.BytesIO()
+    write_delimited(buffer, states)
+    assert list(iter_delimited(Trickle(buffer.getvalue()), objs.ConstellationState)) == states
+    ids = [[v.visibilityId for name, v in ms] for ms in iter_delimited_streams(Trickle(buffer.getvalue()), objs.ConstellationState)]
+    assert ids == [[v.visibilityId for v in state.visibilities] for state in states]
+    assert _read_exactly(Trickle(b'0123456789'), 8) == b'01234567'
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from src.ccm import wire
+from src.ccm.api import CcmApi
+from src.ccm.async_api import AsyncCcmApi
+from src.ccm.telemetry import TelemetryView
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+def make_telemetry(n=5):
+    telemetry = objs.ScheduleTelemetry(scheduleRunId='run-1', start=0, end=86400, totalTaskCount=n, totalAllocatedSeconds=300 * n)
+    telemetry.system.computeSeconds = 12
+    telemetry.system.customerSuccessScoreMean = 0.75
+    telemetry.system.customerSuccessScoreMeanTrend = 'up'
+    telemetry.system.totalDataThroughput = 2.5
+    for i in range(n):
+        telemetry.groundStations.add(siteId=f'site-{i}', totalTaskCount=i, totalTaskSeconds=300 * i, numVisibilitiesSeen=i,
+                                     totalVisibilityAvailableSeconds=600 * i, totalVisibilityScheduledSeconds=300 * i,
+                                     totalCostSpent=1.0, totalRevenue=2.0)
+        telemetry.spacecrafts.add(noradId=str(55550 + i), totalTaskCount=i, totalTaskSeconds=300 * i, totalAvailableSeconds=600 * i,
+                                  detectedBufferOverflow=False, maxTimeBetweenContacts=60, meanTimeBetweenContacts=30.0, giniScore=0.5)
+        user = telemetry.users.add(userId=f'u{i}', score=i / n, giniScore=0.25, totalTaskCount=i, totalAllocatedSeconds=300 * i)
+        user.preferenceScores['p'] = 0.5
+    return telemetry
+
+
+def test_lazy_sections():
+    telemetry = make_telemetry()
+    view = TelemetryView.from_message(telemetry)
+    assert view.scheduleRunId == 'run-1'
+    assert view.system.customerSuccessScoreMean == 0.75
+    assert view.totalTaskCount == 5
+    assert len(view.users) == 5
+    assert view.users.decoded == 0
+    assert view.users[3].userId == 'u3'
+    assert view.users.decoded == 1
+    assert [g.siteId for g in view.groundStations[1:3]] == ['site-1', 'site-2']
+    assert view.spacecrafts.decoded == 0
+    assert view.to_message() == telemetry
+
+
+@pytest.mark.parametrize('wire_format', [wire.JSON, wire.PROTOBUF])
+def test_from_result(wire_format):
+    telemetry = make_telemetry()
+    result = objs.ScheduleResult(schedule=objs.Schedule(scheduleRunId='run-1', score=1.0), telemetry=telemetry, success=True)
+    body, content_type = wire.encode_message(result, wire_format)
+    view = TelemetryView.from_result(body, content_type)
+    assert view.system.customerSuccessScoreMeanTrend == 'up'
+    assert view.users.decoded == 0
+    assert view.to_message() == telemetry
+
+
+@pytest.mark.parametrize('wire_format', [wire.JSON, wire.PROTOBUF])
+def test_get_schedule_telemetry(api_server, wire_format):
+    telemetry = make_telemetry()
+    body, content_type = wire.encode_message(objs.ScheduleResult(telemetry=telemetry, success=True), wire_format)
+    api_server.route('GET', '/schedule/run-1/result', headers={'Content-Type': content_type}, body=body)
+    ca = CcmApi('user', api_host=api_server.url, wire_format=wire_format)
+    view = ca.get_schedule_telemetry('run-1')
+    assert api_server.calls[0][2]['Accept'].startswith(wire.CONTENT_TYPES[wire.PROTOBUF])
+    assert view.system.customerSuccessScoreMean == 0.75
+    assert view.users[0] == telemetry.users[0]
+    with pytest.raises(Exception):
+        ca.get_schedule_telemetry('does-not-exist')
+
+
+def test_async_get_schedule_telemetry():
+    async def run():
+        async with AsyncCcmApi('test') as ca:
+            return await ca.get_schedule_telemetry('empty')
+    view = asyncio.run(run())
+    assert len(view.users) == 0
+    assert type(view.to_message()) == objs.ScheduleTelemetry
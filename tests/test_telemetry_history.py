@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from src.ccm.telemetry import TelemetryView
+from src.ccm.telemetry_history import DAY, TelemetryHistory, rolling
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+def make_telemetry(i, start=None):
+    start = i * DAY if start is None else start
+    telemetry = objs.ScheduleTelemetry(scheduleRunId=f'run-{i}', start=start, end=start + DAY, totalTaskCount=10 + i,
+                                       totalAllocatedSeconds=3000 + i)
+    system = telemetry.system
+    system.computeSeconds = 60 + i
+    system.customerSuccessScoreMean = 0.5 + 0.01 * i
+    system.customerSuccessScoreMin = 0.1
+    system.customerSuccessScoreLowerQuartile = 0.3
+    system.customerSuccessScoreMedian = 0.5
+    system.customerSuccessScoreUpperQuartile = 0.7
+    system.customerSuccessScoreMax = 0.9
+    system.totalDataThroughput = 100.0 * i
+    telemetry.users.add(userId='alice', score=0.1 * (i % 5), giniScore=0.2, totalTaskCount=i, totalAllocatedSeconds=300 * i)
+    if i % 2 == 0:
+        telemetry.users.add(userId='bob', score=0.5, giniScore=0.3, totalTaskCount=1, totalAllocatedSeconds=300)
+    return telemetry
+
+
+def test_append_and_reopen(tmp_path):
+    history = TelemetryHistory(str(tmp_path))
+    assert history.append(make_telemetry(0))
+    assert not history.append(make_telemetry(0))
+    assert history.extend([make_telemetry(i) for i in (2, 1, 2)]) == 2
+    assert len(history) == 3 and 'run-1' in history
+
+    history = TelemetryHistory(str(tmp_path))
+    assert len(history) == 3
+    runs = history.runs()
+    assert list(runs['scheduleRunId']) == ['run-0', 'run-1', 'run-2']
+    assert list(runs['computeSeconds']) == [60, 61, 62]
+    assert runs['customerSuccessScoreMean'][2] == pytest.approx(0.52)
+    assert history.user_ids == ['alice', 'bob']
+
+
+def test_time_range(tmp_path):
+    history = TelemetryHistory(str(tmp_path))
+    history.extend(make_telemetry(i) for i in range(10))
+    runs = history.runs(start=3 * DAY, end=6 * DAY, columns=['totalDataThroughput'])
+    assert list(runs['scheduleRunId']) == ['run-3', 'run-4', 'run-5']
+    assert list(runs) == ['scheduleRunId', 'totalDataThroughput']
+    bob = history.user('bob', start=3 * DAY)
+    assert list(bob['scheduleRunId']) == ['run-4', 'run-6', 'run-8']
+    assert list(bob['totalAllocatedSeconds']) == [300] * 3
+    assert len(history.user('nobody')['score']) == 0
+
+
+def test_rolling_matches_brute_force():
+    rng = np.random.default_rng(0)
+    times = np.sort(rng.integers(0, 100 * DAY, 500))
+    values = rng.random(500)
+    window = 7 * DAY
+    for stat in ('count', 'sum', 'mean', 'std'):
+        expected = []
+        for t in times:
+            v = values[(times > t - window) & (times <= t)]
+            expected.append({'count': len(v), 'sum': v.sum(), 'mean': v.mean(), 'std': v.std()}[stat])
+        assert np.allclose(rolling(times, values, window, stat), expected)
+
+
+def test_rolling_slope():
+    times = np.arange(20) * DAY
+    slope = rolling(times, 3.0 + 0.25 * np.arange(20), 5 * DAY, 'slope')
+    assert np.isnan(slope[0])
+    assert np.allclose(slope[1:], 0.25)
+    with pytest.raises(Exception):
+        rolling(times, times, DAY, 'median')
+
+
+def test_rolling_history(tmp_path):
+    history = TelemetryHistory(str(tmp_path))
+    history.extend(make_telemetry(i) for i in reversed(range(10)))
+    trend = history.rolling('customerSuccessScoreMean', 3 * DAY, start=5 * DAY)
+    assert list(trend['scheduleRunId']) == ['run-5', 'run-6', 'run-7', 'run-8', 'run-9']
+    assert np.allclose(trend['mean'], [0.5 + 0.01 * (i - 1) for i in range(5, 10)])
+    alice = history.rolling('score', 2 * DAY, stat='sum', user_id='alice')
+    assert np.allclose(alice['sum'], [0.0, 0.1, 0.3, 0.5, 0.7, 0.4, 0.1, 0.3, 0.5, 0.7])
+
+
+def test_interrupted_append_is_discarded(tmp_path):
+    history = TelemetryHistory(str(tmp_path))
+    history.extend(make_telemetry(i) for i in range(3))
+    with open(tmp_path / 'users.score.bin', 'ab') as f:
+        f.write(np.zeros(3, dtype='<f8').tobytes())
+    with open(tmp_path / 'runs.start.bin', 'ab') as f:
+        f.write(b'\x01\x02')
+    with open(tmp_path / 'run_ids.jsonl', 'a') as f:
+        f.write('"run-')
+    history = TelemetryHistory(str(tmp_path))
+    assert len(history) == 3
+    assert history.append(make_telemetry(3))
+    history = TelemetryHistory(str(tmp_path))
+    assert list(history.runs()['start']) == [0, DAY, 2 * DAY, 3 * DAY]
+    assert list(history.user('alice')['totalTaskCount']) == [0, 1, 2, 3]
+
+
+def test_append_view(tmp_path):
+    history = TelemetryHistory(str(tmp_path))
+    assert history.append(TelemetryView.from_message(make_telemetry(4)))
+    assert list(history.user('bob')['scheduleRunId']) == ['run-4']
+
+
+def test_failed_extend_leaves_users_alone(tmp_path):
+    history = TelemetryHistory(str(tmp_path))
+    history.extend(make_telemetry(i) for i in range(2))
+
+    def telemetries():
+        telemetry = make_telemetry(2)
+        telemetry.users.add(userId='carol', score=0.4)
+        yield telemetry
+        raise IOError('source went away')
+    with pytest.raises(IOError):
+        history.extend(telemetries())
+    assert history.user_ids == ['alice', 'bob']
+    assert len(history.user('carol')['scheduleRunId']) == 0
+    telemetry = make_telemetry(3)
+    telemetry.users.add(userId='carol', score=0.4)
+    assert history.append(telemetry)
+    assert list(history.user('carol')['scheduleRunId']) == ['run-3']
+    history = TelemetryHistory(str(tmp_path))
+    assert history.user_ids == ['alice', 'bob', 'carol']
+    assert list(history.user('carol')['scheduleRunId']) == ['run-3']
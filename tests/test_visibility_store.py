@@ -0,0 +1,79 @@
+import numpy as np
+
+from src.ccm.visibility_store import VisibilityStore, write_visibility_store
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+VisibilityPropertyType = objs.VisibilityProperty.VisibilityPropertyType
+
+
+def make_visibilities():
+    visibilities = []
+    for i in range(30):
+        v = objs.Visibility(visibilityId=f'vis-{i}', siteId=f'site-{i % 3}', noradId=str(55550 + i % 4),
+                            startTimestamp=1000 * (30 - i), endTimestamp=1000 * (30 - i) + 400)
+        if i % 2 == 0:
+            v.props.add(vtype=VisibilityPropertyType.ELEVATION, dval=float(i))
+        if i % 5 == 0:
+            v.props.add(vtype=VisibilityPropertyType.BAND, sval='S' if i % 10 else 'X')
+        visibilities.append(v)
+    return visibilities
+
+
+def test_round_trip(tmp_path):
+    visibilities = make_visibilities()
+    assert write_visibility_store(str(tmp_path), visibilities) == 30
+    store = VisibilityStore(str(tmp_path))
+    assert len(store) == 30
+    assert isinstance(store.start, np.memmap)
+    restored = {store.visibility_id(r): store.to_visibility(r) for r in range(len(store))}
+    assert restored == {v.visibilityId: v for v in visibilities}
+
+
+def test_offset_indexes(tmp_path):
+    visibilities = make_visibilities()
+    write_visibility_store(str(tmp_path), visibilities)
+    store = VisibilityStore(str(tmp_path))
+    rows = store.pair_rows('55551', 'site-1')
+    expected = sorted((v.startTimestamp, v.visibilityId) for v in visibilities if v.noradId == '55551' and v.siteId == 'site-1')
+    assert [(int(store.start[r]), store.visibility_id(r)) for r in range(rows.start, rows.stop)] == expected
+    rows = store.site_rows('site-2')
+    assert list(store.start[rows]) == sorted(v.startTimestamp for v in visibilities if v.siteId == 'site-2')
+    assert store.pair_rows('nope', 'site-1') == slice(0, 0)
+
+
+def test_props_columns(tmp_path):
+    write_visibility_store(str(tmp_path), make_visibilities())
+    store = VisibilityStore(str(tmp_path))
+    band = store.props(VisibilityPropertyType.BAND)
+    assert sorted(band.sval_categories[band.sval]) == ['S', 'S', 'S', 'X', 'X', 'X']
+    elevation = store.props(VisibilityPropertyType.ELEVATION)
+    assert len(elevation.rows) == 15
+    assert store.props(VisibilityPropertyType.WEATHER) is None
+
+
+def test_several_props_per_vtype(tmp_path):
+    visibilities = make_visibilities()
+    for i, v in enumerate(visibilities):
+        v.props.add(vtype=VisibilityPropertyType.ELEVATION, dval=100.0 + i)
+        if i % 3 == 0:
+            v.props.add(vtype=VisibilityPropertyType.BAND, sval='Ka', bval=True)
+            v.props.add(vtype=VisibilityPropertyType.ELEVATION, dval=-1.0)
+    assert write_visibility_store(str(tmp_path), iter(visibilities), chunk_rows=7) == 30
+    store = VisibilityStore(str(tmp_path))
+    restored = {store.visibility_id(r): store.to_visibility(r) for r in range(len(store))}
+    assert restored == {v.visibilityId: v for v in visibilities}
+    elevation = store.props(VisibilityPropertyType.ELEVATION)
+    assert len(elevation.rows) == 15 + 30 + 10
+    assert list(elevation.rows) == sorted(elevation.rows)
+
+
+def test_empty_store(tmp_path):
+    assert write_visibility_store(str(tmp_path), []) == 0
+    store = VisibilityStore(str(tmp_path))
+    assert len(store) == 0
+    assert store.pair_rows('55550', 'site-0') == slice(0, 0)
+    assert not list(tmp_path.glob('*.spill'))
@@ -0,0 +1,40 @@
+import pytest
+
+from src.ccm import wire
+from src.ccm.api import CcmApi
+from src import schedule_pb2 as objs
+
+__author__ = "Kyle Polich"
+__copyright__ = "Kyle Polich"
+__license__ = "MIT"
+
+
+TASKS = [dict(start=100 * i, end=100 * i + 50) for i in range(3)]
+
+
+@pytest.mark.parametrize('wire_format', [wire.JSON, wire.PROTOBUF])
+def test_encode_decode_round_trip(wire_format, make_schedule):
+    sch = make_schedule(TASKS)
+    body, content_type = wire.encode_message(sch, wire_format)
+    assert wire.decode_message(objs.Schedule, body, content_type) == sch
+
+
+def test_unknown_wire_format():
+    with pytest.raises(ValueError):
+        CcmApi('test', wire_format='xml')
+
+
+@pytest.mark.parametrize('wire_format', [wire.JSON, wire.PROTOBUF])
+def test_get_schedule_by_id_wire_format(api_server, wire_format, make_schedule):
+    sch = make_schedule(TASKS)
+    body, content_type = wire.encode_message(sch, wire_format)
+    api_server.route('GET', '/schedule/run-1', headers={'Content-Type': content_type}, body=body)
+    ca = CcmApi('user', api_host=api_server.url, wire_format=wire_format)
+    assert ca.get_schedule_by_id('run-1') == sch
+    assert api_server.calls[0][2]['Accept'] == wire.CONTENT_TYPES[wire_format]
+
+
+def test_get_schedule_result_not_exists(api_server):
+    ca = CcmApi('user', api_host=api_server.url, wire_format=wire.PROTOBUF)
+    with pytest.raises(Exception):
+        ca.get_schedule_result('does-not-exist')